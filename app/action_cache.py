@@ -0,0 +1,107 @@
+# Andrew Bogdan
+# Feasible Game 3
+# action_cache.py
+"""
+	Compiles the action scripts once so that doing a turn never has to touch the disk.
+"""
+
+# Imports
+import os
+
+# Classes
+class ActionCache(object):
+	"""
+	A cache of compiled action scripts, keyed by action id
+
+	Scripts are only checked against their files' mtimes when refresh is called.
+
+	ActionCache.__init__(self, path_from_id)
+	ActionCache._compile(self, id_)
+	ActionCache.get(self, id_)
+	ActionCache.refresh(self)
+	ActionCache.warm(self, root)
+
+	ActionCache._codes
+	ActionCache._path_from_id
+	ActionCache.hits
+	ActionCache.misses
+	"""
+
+	def __init__(self, path_from_id):
+		"""Initialize the ActionCache with the function that turns ids into paths."""
+
+		self._codes = {}
+		self._path_from_id = path_from_id
+
+		self.hits = 0
+		self.misses = 0
+
+	def _compile(self, id_):
+		"""Read and compile the action script for id_, storing it with its mtime."""
+
+		path = self._path_from_id(id_)
+
+		with open(path, 'r') as action_file:
+
+			source = action_file.read()
+
+		self._codes[id_] = (compile(source, path, "exec"), path, os.path.getmtime(path))
+
+		return self._codes[id_][0]
+
+	def get(self, id_):
+		"""Get the code object of an action, compiling it if it hasn't been yet."""
+
+		try:
+
+			code = self._codes[id_][0]
+
+		except KeyError:
+
+			self.misses += 1
+			return self._compile(id_)
+
+		self.hits += 1
+		return code
+
+	def refresh(self):
+		"""Recompile every cached action whose file has changed and forget the ones which are gone."""
+
+		for id_ in list(self._codes):
+
+			path = self._codes[id_][1]
+
+			try:
+
+				mtime = os.path.getmtime(path)
+
+			except OSError:
+
+				# The file was deleted, so the action doesn't exist anymore
+				del self._codes[id_]
+				continue
+
+			if mtime != self._codes[id_][2]:
+
+				self._compile(id_)
+
+	def warm(self, root):
+		"""Compile every action script of every datapack under root."""
+
+		for datapack in sorted(os.listdir(root)):
+
+			action_dir = os.path.join(root, datapack, "action")
+
+			if not os.path.isdir(action_dir):
+
+				continue
+
+			for name in sorted(os.listdir(action_dir)):
+
+				if name.startswith('.') or name.endswith((".pyc", ".pyo")):
+
+					continue
+
+				if os.path.isfile(os.path.join(action_dir, name)):
+
+					self._compile(':'.join((datapack, "action", name)))
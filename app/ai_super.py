@@ -4,11 +4,43 @@ class AI(object):
 
 	This class is not for instantiation
 
+	AI.find_path(map_, mob, goal)
 	AI.get_next_turn(map_, mob)
+	AI.get_next_turns(map_, mobs)
+	AI.prepare_turns(map_, mobs)
 	"""
 
+	@staticmethod
+	def find_path(map_, mob, goal):
+		"""Get the tiles of a path from the mob to goal, an (x, y) on its layer, or None if there isn't one."""
+
+		permeability = int(mob.quanta["default:quanta:_permeability"])
+
+		return map_.pathfinder(mob.coords[2], permeability).find_path(mob.coords, goal)
+
 	@staticmethod
 	def get_next_turn(map_, mob):
 		"""Get the next action of the mob."""
 
 		return None
+
+	@classmethod
+	def get_next_turns(cls, map_, mobs):
+		"""
+		Get the next actions of every mob with this AI at once, in the same order as mobs.
+
+		By default each mob gets its own get_next_turn; override this to share work between them.
+		"""
+
+		return [cls.get_next_turn(map_, mob) for mob in mobs]
+
+	@classmethod
+	def prepare_turns(cls, map_, mobs):
+		"""
+		Work out whatever the mobs with this AI share before they decide their next turns, so
+		that workers forked to decide them all start with it.
+
+		By default there's nothing to share; override this along with get_next_turns.
+		"""
+
+		pass
@@ -0,0 +1,183 @@
+# Andrew Bogdan
+# Feasible Game 3
+# autosave.py
+"""
+	Autosaving, which saves the State every so often without stopping the game to do it.
+
+	Between turns the game forks, and the child process writes its copy of the State as an
+	indexed save and exits. The fork is the snapshot: the child sees the State exactly as it
+	was between those turns, and the operating system only copies the pages either process
+	changes afterwards. Where there's no fork, the State is saved in the game's process
+	instead, which stops the game for as long as the save takes.
+
+	A child can't print what went wrong without scribbling over the screen, so it sends its
+	traceback back through a pipe instead, for the game to tell the player about.
+"""
+
+# Imports
+import os
+import time
+import traceback
+
+import indexed
+
+# Constants
+# The most of a child's traceback sent back, well under what a pipe holds
+PIPE_BYTES = 4096
+
+# Classes
+class Autosave(object):
+	"""
+	Saves a State in the background every interval seconds
+
+	Autosave.__init__(self, path, interval=60)
+	Autosave._reap(self, block=False)
+	Autosave._start(self, state)
+	Autosave.finish(self)
+	Autosave.save(self, state)
+	Autosave.tick(self, state)
+
+	Autosave._last
+	Autosave._pid
+	Autosave._read_fd
+	Autosave.errors
+	Autosave.failures
+	Autosave.interval
+	Autosave.path
+	Autosave.pauses
+	Autosave.saves
+	"""
+
+	def __init__(self, path, interval=60):
+		"""Initialize the Autosave, making the save's directory if it doesn't exist."""
+
+		# The tracebacks of the saves which failed, for the game to take
+		self.errors = []
+
+		self.failures = 0
+		self.interval = interval
+		self.path = path
+		self.saves = 0
+
+		# How long each save stopped the game for, in seconds
+		self.pauses = []
+
+		if not os.path.isdir(os.path.dirname(os.path.abspath(path))):
+
+			os.makedirs(os.path.dirname(os.path.abspath(path)))
+
+		self._last = time.time()
+		self._pid = None
+		self._read_fd = None
+
+	def _reap(self, block=False):
+		"""Count the save in progress if it's done; return whether one is still in progress."""
+
+		if self._pid is None:
+
+			return False
+
+		pid, status = os.waitpid(self._pid, 0 if block else os.WNOHANG)
+
+		if pid == 0:
+
+			return True
+
+		# The child is gone, so whatever it had to say is all in the pipe
+		with os.fdopen(self._read_fd, 'rb') as pipe:
+
+			error = pipe.read()
+
+		if status == 0:
+
+			self.saves += 1
+
+		else:
+
+			self.failures += 1
+			self.errors.append(error or "The autosave exited with status %d\n" % status)
+
+		self._pid = None
+		self._read_fd = None
+
+		return False
+
+	def _start(self, state):
+		"""Start saving state in the background."""
+
+		if hasattr(os, "fork"):
+
+			read_fd, write_fd = os.pipe()
+			pid = os.fork()
+
+			if pid == 0:
+
+				# The child only saves; os._exit keeps it from running anything of the game's
+				os.close(read_fd)
+
+				try:
+
+					# The game goes on writing the save the Map streams from
+					if isinstance(state.map._chunk_store, indexed.IndexedStore):
+
+						state.map._chunk_store.freeze()
+
+					indexed.save_indexed(state, self.path)
+
+				except:
+
+					# The end of it, which fits in the pipe without the game reading it yet
+					os.write(write_fd, traceback.format_exc()[-PIPE_BYTES:])
+					os._exit(1)
+
+				os._exit(0)
+
+			os.close(write_fd)
+
+			self._pid = pid
+			self._read_fd = read_fd
+
+		else:
+
+			self.save(state)
+
+	def finish(self):
+		"""Wait for the save in progress, if there is one."""
+
+		self._reap(block=True)
+
+	def save(self, state):
+		"""Save state in the game's process, waiting for it; return whether it saved."""
+
+		try:
+
+			indexed.save_indexed(state, self.path)
+
+		except Exception:
+
+			self.failures += 1
+			self.errors.append(traceback.format_exc())
+
+			return False
+
+		self.saves += 1
+
+		return True
+
+	def tick(self, state):
+		"""
+		Start saving state if the last save started interval seconds ago and is done.
+
+		This should only be called between turns, so that the State is whole.
+		"""
+
+		start = time.time()
+
+		if self._reap() or start - self._last < self.interval:
+
+			return
+
+		self._start(state)
+		self._last = time.time()
+
+		self.pauses.append(self._last - start)
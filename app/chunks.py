@@ -0,0 +1,163 @@
+# Andrew Bogdan
+# Feasible Game 3
+# chunks.py
+"""
+	Chunked saves, which keep every chunk of the map in its own file so that a Map can load
+	them as they're needed and write them back when they're not.
+
+	A chunked save is a directory with state.json (the State without its map's tiles),
+	prototypes.json (the map's NonMob templates) and chunks/<x>_<y>.json (each chunk, like
+	Map.save_chunk makes it).
+"""
+
+# Imports
+import json
+import os
+
+from decoder import Decoder
+from mirec_miskuf_json import json_loads_str
+
+from state import *
+
+# Classes
+class ChunkStore(object):
+	"""
+	The files of a chunked save, which a Map streams its chunks through
+
+	ChunkStore.__init__(self, path)
+	ChunkStore._chunk_path(self, key)
+	ChunkStore.read(self, key)
+	ChunkStore.read_prototypes(self)
+	ChunkStore.write(self, key, saved_chunk, prototypes)
+	ChunkStore.write_prototypes(self, prototypes)
+
+	ChunkStore._decoder
+	ChunkStore._prototype_ids
+	ChunkStore.path
+	"""
+
+	def __init__(self, path):
+		"""Initialize the ChunkStore, making its directories if they don't exist."""
+
+		self._decoder = Decoder()
+		self._prototype_ids = None
+		self.path = path
+
+		if not os.path.isdir(os.path.join(path, "chunks")):
+
+			os.makedirs(os.path.join(path, "chunks"))
+
+	def _chunk_path(self, key):
+		"""Get the path of a chunk's file."""
+
+		return os.path.join(self.path, "chunks", str(key[0]) + '_' + str(key[1]) + ".json")
+
+	def read(self, key):
+		"""Read a saved chunk."""
+
+		with open(self._chunk_path(key), 'r') as chunk_file:
+
+			return self._decoder.load(chunk_file)
+
+	def read_prototypes(self):
+		"""Read the saved NonMob templates."""
+
+		with open(os.path.join(self.path, "prototypes.json"), 'r') as prototypes_file:
+
+			prototypes = self._decoder.load(prototypes_file)
+
+		self._prototype_ids = set(prototypes)
+
+		return prototypes
+
+	def write(self, key, saved_chunk, prototypes):
+		"""
+		Write a saved chunk.
+
+		The templates are written too if there are new ones, so the chunk never refers to a
+		prototype that isn't saved.
+		"""
+
+		if set(prototypes.templates) != self._prototype_ids:
+
+			self.write_prototypes(prototypes)
+
+		_write_atomic(self._chunk_path(key), json.dumps(saved_chunk, separators=(",", ":")))
+
+	def write_prototypes(self, prototypes):
+		"""Write the NonMob templates of a Prototypes."""
+
+		_write_atomic(os.path.join(self.path, "prototypes.json"), json.dumps(prototypes.to_dict(), separators=(",", ":")))
+
+		self._prototype_ids = set(prototypes.templates)
+
+# Functions
+def load_chunked(path):
+	"""Load the State of a chunked save; its chunks are only loaded as the Map uses them."""
+
+	with open(os.path.join(path, "state.json"), 'r') as state_file:
+
+		saved_state = json_loads_str(state_file.read())
+
+	chunk_store = ChunkStore(path)
+	saved_map = saved_state["map_"]
+
+	map_ = Map(	prototypes=chunk_store.read_prototypes(),
+				size=saved_map["size"],
+				depth=saved_map["depth"],
+				chunk_size=saved_map["chunk_size"],
+				chunk_store=chunk_store)
+
+	return State(map_, saved_state["index_stack"], saved_state["message_log"])
+
+def save_chunked(state, path):
+	"""
+	Save a State as a chunked save.
+
+	Saving a Map back to the save it streams from only writes its changed chunks; saving
+	anything else writes every chunk.
+	"""
+
+	map_ = state.map
+	chunk_store = ChunkStore(path)
+
+	if map_._chunk_store is not None and os.path.abspath(map_._chunk_store.path) == os.path.abspath(path):
+
+		chunk_store = map_._chunk_store
+		keys = [key for key in map_._chunks if key in map_._dirty_chunks]
+
+	else:
+
+		keys = map_.chunk_keys()
+
+	for key in keys:
+
+		chunk_store.write(key, map_.save_chunk(key), map_.prototypes)
+
+		if chunk_store is map_._chunk_store:
+
+			map_._dirty_chunks.discard(key)
+
+	chunk_store.write_prototypes(map_.prototypes)
+
+	# The State itself, with only the shape of the Map
+	saved_state = {	"_type": "State",
+					"index_stack": state.saved_index_stack(),
+					"map_": {	"_type": "Map",
+								"chunk_size": map_.chunk_size,
+								"depth": map_.depth,
+								"size": list(map_._size)},
+					"message_log": state.message_log}
+
+	_write_atomic(os.path.join(path, "state.json"), json.dumps(saved_state, indent=4, separators=(",", ": "), sort_keys=True))
+
+def _write_atomic(path, text):
+	"""Write text to a file by way of a temporary file, so the file is never half-written."""
+
+	temp_path = path + ".tmp"
+
+	with open(temp_path, 'w') as temp_file:
+
+		temp_file.write(text)
+
+	os.rename(temp_path, path)
@@ -0,0 +1,141 @@
+# Andrew Bogdan
+# Feasible Game 3
+# decoder.py
+"""
+	A JSON decoder for saves which builds the State as the JSON is parsed, in one pass.
+
+	Every object of the save goes through Decoder._object_hook exactly once, right after its
+	members are parsed. Strings come out as str, one str for each distinct string, and the
+	objects whose "_type" can be built from their members alone are built right there. Tiles
+	and NonMobs are left saved, since the Map packs them into its terrain instead of loading
+	them, and so are the Figments and Coagulates inside entities, which belong to whichever
+	entity they're in.
+"""
+
+# Imports
+import gc
+import json
+import time
+
+from state import *
+
+# Constants
+MEGABYTE = 1024.0 * 1024.0
+
+# Classes
+class Decoder(object):
+	"""
+	Decodes saves, keeping track of how fast it's been going
+
+	Decoder.__init__(self)
+	Decoder._clean(self, value)
+	Decoder._object_hook(self, saved_pairs)
+	Decoder._str(self, text)
+	Decoder.load(self, file_)
+	Decoder.loads(self, text)
+	Decoder.throughput(self)
+
+	Decoder._builders
+	Decoder._decoder
+	Decoder._strings
+	Decoder.bytes_decoded
+	Decoder.seconds
+	"""
+
+	def __init__(self):
+		"""Initialize the Decoder."""
+
+		self._builders = {	"Map": Map,
+							"Mob": Mob,
+							"State": State}
+		self._decoder = json.JSONDecoder(object_pairs_hook=self._object_hook)
+		self._strings = {}
+
+		self.bytes_decoded = 0
+		self.seconds = 0.0
+
+	def _clean(self, value):
+		"""Turn the unicode strings of a member into str, going into lists but not objects."""
+
+		if type(value) == unicode:
+
+			return self._str(value)
+
+		elif type(value) == list:
+
+			return [self._clean(item) for item in value]
+
+		# Objects have already been through the hook
+		return value
+
+	def _object_hook(self, saved_pairs):
+		"""Clean a freshly parsed object and build it if its "_type" can be built."""
+
+		saved_state = {}
+
+		for key, value in saved_pairs:
+
+			saved_state[self._str(key)] = self._clean(value)
+
+		try:
+
+			builder = self._builders[saved_state["_type"]]
+
+		except KeyError:
+
+			return saved_state
+
+		del saved_state["_type"]
+
+		return builder(**saved_state)
+
+	def _str(self, text):
+		"""Get text as a str, sharing one str between every copy of the same text."""
+
+		try:
+
+			return self._strings[text]
+
+		except KeyError:
+
+			self._strings[text] = text.encode('utf-8')
+			return self._strings[text]
+
+	def load(self, file_):
+		"""Decode a save from a file."""
+
+		return self.loads(file_.read())
+
+	def loads(self, text):
+		"""Decode a save from a string."""
+
+		# Nothing made while decoding is garbage yet, so don't let the collector keep looking
+		collecting = gc.isenabled()
+		gc.disable()
+
+		start = time.time()
+
+		try:
+
+			decoded = self._clean(self._decoder.decode(text))
+
+		finally:
+
+			self.seconds += time.time() - start
+
+			if collecting:
+
+				gc.enable()
+
+		self.bytes_decoded += len(text)
+
+		return decoded
+
+	def throughput(self):
+		"""Get how many megabytes a second the Decoder has decoded so far."""
+
+		if self.seconds == 0:
+
+			return 0.0
+
+		return self.bytes_decoded / MEGABYTE / self.seconds
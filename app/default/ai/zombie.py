@@ -1,5 +1,3 @@
-import random
-
 from ...ai_super import AI
 
 DIR_NORTH = 0
@@ -20,66 +18,133 @@ DIR_ACTION = {	(0, -1): DIR_NORTH,
 				(-1, 0): DIR_WEST,
 				(-1, -1): DIR_NORTHWEST}
 
+# How far a zombie can see the player from
+VIEW_DISTANCE = 12
+
+# How many steps away a zombie can smell the player from, even through walls
+SCENT_DISTANCE = 4
+
+# How many steps around walls a zombie will go after a player it has found
+CHASE_DISTANCE = 32
+
 class DefAI(AI):
 	"""
 	The AI for a basic zombie
 
+	Every zombie on a layer shares one flow field out from the players, so each only has to
+	look at its neighbours to find the way to the nearest one, walls and all. A zombie only
+	gives chase to a player it can see or smell. A player it can see but which is too far
+	around the walls for the field gets a path of its own.
+
+	Fields of view are cast symmetrically, so seeing goes both ways. Rather than every zombie
+	looking around, each player near enough to be seen looks out once a turn and the zombies
+	check whether they're in sight.
+
+	DefAI._chase(map_, mob, permeability, field, targets)
+	DefAI._detour(map_, mob, permeability, targets)
+	DefAI._sees(map_, mob, permeability, target)
 	DefAI.get_next_turn(map_, mob)
+	DefAI.get_next_turns(map_, mobs)
+	DefAI.prepare_turns(map_, mobs)
 
 	Also includes some members froma AI 
 	"""
 
 	@staticmethod
-	def get_next_turn(map_, mob):
-		"""Get the next action of the mob."""
+	def _chase(map_, mob, permeability, field, targets):
+		"""Get the next action of the mob from the field out from the players, at targets."""
+
+		distance = field.distance(mob.coords[0], mob.coords[1])
+
+		if distance is None:
 
-		# *** DEBUG ***
-		view_distance = 3	# Note that this is two-sided
-		offset = (0, 0)
-		found_flag = False
+			return DefAI._detour(map_, mob, permeability, targets)
 
-		for x_dif in range(-view_distance, view_distance):
-			for y_dif in range(-view_distance, view_distance):
+		elif distance <= 1:
 
-				try:
-					tile = map_.grid[mob.coords[0] + x_dif][mob.coords[1] + y_dif]
-					entity = tile.layers[mob.coords[2]][int(mob.quanta["default:quanta:_permeability"])]
+			return [mob.actions["default:action:zombie_bite"]]
 
-					if entity.id == "default:mob:player":
+		if distance > SCENT_DISTANCE and not any(DefAI._sees(map_, mob, permeability, target) for target in targets):
 
-						offset = (x_dif, y_dif)
-						found_flag = True
+			return [mob.actions["default:action:wait"]]
 
-				except IndexError: continue
-				except KeyError: continue
+		step = field.downhill(mob.coords[0], mob.coords[1])
 
-		try:
+		if step is None:
 
-			direction_x = offset[0] / abs(offset[0])
+			return [mob.actions["default:action:wait"]]
 
-		except ZeroDivisionError:
+		return [mob.actions["default:action:walk"], DIR_ACTION[step]]
 
-			direction_x = 0
+	@staticmethod
+	def _detour(map_, mob, permeability, targets):
+		"""Get the next action of the mob toward the nearest of targets it can see, the long way around."""
 
-		try:
+		def distance(target):
 
-			direction_y = offset[1] / abs(offset[1])
+			return max(abs(target[0] - mob.coords[0]), abs(target[1] - mob.coords[1]))
 
-		except ZeroDivisionError:
+		for target in sorted(targets, key=distance):
 
-			direction_y = 0
+			if DefAI._sees(map_, mob, permeability, target):
 
-		direction = (direction_x, direction_y)
+				path = DefAI.find_path(map_, mob, target)
 
-		if direction == (0, 0) and found_flag:
+				if path:
 
-			return [mob.actions["default:action:zombie_bite"]]
+					return [mob.actions["default:action:walk"], DIR_ACTION[(path[0][0] - mob.coords[0], path[0][1] - mob.coords[1])]]
 
-		elif direction == (0, 0) and not found_flag:
+		return [mob.actions["default:action:wait"]]
 
-			return [mob.actions["default:action:wait"]]
+	@staticmethod
+	def _sees(map_, mob, permeability, target):
+		"""Return whether the mob can see target, the (x, y) of a player on its layer."""
+
+		# Most players are too far away to bother looking
+		if max(abs(target[0] - mob.coords[0]), abs(target[1] - mob.coords[1])) > VIEW_DISTANCE:
+
+			return False
+
+		return (mob.coords[0], mob.coords[1]) in map_.visible(target[0], target[1], mob.coords[2], permeability, VIEW_DISTANCE)
+
+	@staticmethod
+	def get_next_turn(map_, mob):
+		"""Get the next action of the mob."""
+
+		permeability = int(mob.quanta["default:quanta:_permeability"])
+		field = map_.flow_field("default:mob:player", mob.coords[2], permeability, CHASE_DISTANCE)
+
+		return DefAI._chase(map_, mob, permeability, field, set(field.targets))
+
+	@staticmethod
+	def get_next_turns(map_, mobs):
+		"""Get the next actions of the mobs, looking up each field and its players only once."""
+
+		fields = {}
+		turns = []
+
+		for mob in mobs:
+
+			permeability = int(mob.quanta["default:quanta:_permeability"])
+			key = (mob.coords[2], permeability)
+
+			if key not in fields:
+
+				field = map_.flow_field("default:mob:player", mob.coords[2], permeability, CHASE_DISTANCE)
+				fields[key] = (field, set(field.targets))
+
+			turns.append(DefAI._chase(map_, mob, permeability, fields[key][0], fields[key][1]))
+
+		return turns
+
+	@staticmethod
+	def prepare_turns(map_, mobs):
+		"""Work out the field out from the players and what each of them can see, for every layer and permeability of the mobs."""
+
+		for key in set([(mob.coords[2], int(mob.quanta["default:quanta:_permeability"])) for mob in mobs]):
+
+			field = map_.flow_field("default:mob:player", key[0], key[1], CHASE_DISTANCE)
 
-		else:
+			for target in field.targets:
 
-			return [mob.actions["default:action:walk"], DIR_ACTION[direction]]
-		# *** DEBUG ***
\ No newline at end of file
+				map_.visible(target[0], target[1], key[0], key[1], VIEW_DISTANCE)
@@ -0,0 +1,171 @@
+# Andrew Bogdan
+# Feasible Game 3
+# flow.py
+"""
+	Flow fields, which hold how many steps each tile near some targets is from the nearest of
+	them, so that any number of mobs chasing the targets share one search.
+"""
+
+# Imports
+from array import array
+from collections import deque
+
+from terrain import numpy
+
+# Constants
+# The steps a mob can take, in the order ties between them are broken
+STEPS = ((0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1))
+
+# Classes
+class FlowField(object):
+	"""
+	The distances of the walkable tiles in bounds from the nearest target, up to radius steps
+
+	FlowField.__init__(self, walkable, bounds, targets, radius)
+	FlowField._search(self, walkable, targets)
+	FlowField._search_numpy(self, walkable, targets)
+	FlowField.distance(self, x, y)
+	FlowField.downhill(self, x, y)
+
+	FlowField._distances
+	FlowField.bounds
+	FlowField.radius
+	FlowField.targets
+	"""
+
+	def __init__(self, walkable, bounds, targets, radius):
+		"""
+		Initialize the FlowField with a breadth-first search out from the targets, (x, y)s
+		inside bounds, through the tiles walkable says can be walked through.
+
+		walkable is what Map.walkable gives for bounds: a NumPy array by x and y if NumPy is
+		available, or a flat bytearray by x then y if not.
+		"""
+
+		self.bounds = tuple(bounds)
+		self.radius = radius
+		self.targets = list(targets)
+
+		if numpy is not None:
+
+			self._search_numpy(walkable, targets)
+
+		else:
+
+			self._search(walkable, targets)
+
+	def _search(self, walkable, targets):
+		"""Fill in the distances one tile at a time."""
+
+		height = self.bounds[3] - self.bounds[1]
+
+		self._distances = array('i', [-1]) * len(walkable)
+		frontier = deque()
+
+		for target in targets:
+
+			index = (target[0] - self.bounds[0]) * height + target[1] - self.bounds[1]
+
+			if self._distances[index] == -1:
+
+				self._distances[index] = 0
+				frontier.append((target[0] - self.bounds[0], target[1] - self.bounds[1]))
+
+		width = self.bounds[2] - self.bounds[0]
+
+		while frontier:
+
+			x_val, y_val = frontier.popleft()
+			distance = self._distances[x_val * height + y_val] + 1
+
+			if distance > self.radius:
+
+				continue
+
+			for step in STEPS:
+
+				next_x = x_val + step[0]
+				next_y = y_val + step[1]
+
+				if 0 <= next_x < width and 0 <= next_y < height:
+
+					index = next_x * height + next_y
+
+					if self._distances[index] == -1 and walkable[index]:
+
+						self._distances[index] = distance
+						frontier.append((next_x, next_y))
+
+	def _search_numpy(self, walkable, targets):
+		"""Fill in the distances a whole ring of tiles at a time."""
+
+		self._distances = numpy.empty(walkable.shape, dtype=numpy.int32)
+		self._distances.fill(-1)
+
+		frontier = numpy.zeros(walkable.shape, dtype=bool)
+
+		for target in targets:
+
+			frontier[target[0] - self.bounds[0], target[1] - self.bounds[1]] = True
+
+		self._distances[frontier] = 0
+		reached = frontier.copy()
+
+		for distance in range(1, self.radius + 1):
+
+			# Every tile a step away from the frontier, found by shifting it each way
+			padded = numpy.zeros((walkable.shape[0] + 2, walkable.shape[1] + 2), dtype=bool)
+			padded[1:-1, 1:-1] = frontier
+
+			grown = numpy.zeros(walkable.shape, dtype=bool)
+
+			for step in STEPS:
+
+				grown |= padded[1 - step[0]:padded.shape[0] - 1 - step[0], 1 - step[1]:padded.shape[1] - 1 - step[1]]
+
+			frontier = grown & walkable & ~reached
+
+			if not frontier.any():
+
+				break
+
+			self._distances[frontier] = distance
+			reached |= frontier
+
+	def distance(self, x, y):
+		"""Get how many steps x, y is from the nearest target, or None if it isn't reached."""
+
+		if not (self.bounds[0] <= x < self.bounds[2] and self.bounds[1] <= y < self.bounds[3]):
+
+			return None
+
+		if numpy is not None:
+
+			distance = self._distances.item(x - self.bounds[0], y - self.bounds[1])
+
+		else:
+
+			distance = self._distances[(x - self.bounds[0]) * (self.bounds[3] - self.bounds[1]) + y - self.bounds[1]]
+
+		if distance == -1:
+
+			return None
+
+		return distance
+
+	def downhill(self, x, y):
+		"""Get the step from x, y to the neighbour nearest a target, or None if none is nearer."""
+
+		best = self.distance(x, y)
+		best_step = None
+
+		for step in STEPS:
+
+			distance = self.distance(x + step[0], y + step[1])
+
+			if distance is not None and (best is None or distance < best):
+
+				best = distance
+				best_step = step
+
+		return best_step
@@ -0,0 +1,85 @@
+# Andrew Bogdan
+# Feasible Game 3
+# fov.py
+"""
+	Field of view, which works out what can be seen from a tile with symmetric shadowcasting:
+	each of the four quadrants around it is scanned row by row outwards, and every opaque
+	tile casts a shadow that the rows behind it aren't scanned in.
+
+	A clear tile is only seen if its center is inside the slopes being scanned, not just some
+	of it, so one clear tile can see another exactly when the other can see it. That's what
+	lets a crowd check whether each of them is in sight of a player instead of each looking
+	around itself. Slopes are kept as fractions of whole numbers, so nothing is lost to
+	rounding either way.
+"""
+
+# Constants
+# How a quadrant's depth and column turn into x and y: x = depth * a + column * b, y = depth * c + column * d
+_QUADRANTS = (	(0, 1, -1, 0),
+				(1, 0, 0, 1),
+				(0, 1, 1, 0),
+				(-1, 0, 0, 1))
+
+# Functions
+def _scan(seen, clear, bounds, origin, radius, depth, start, end, quadrant):
+	"""
+	Scan a quadrant from the row depth away outwards, between the slopes start and end, each
+	a (numerator, denominator) with a positive denominator.
+	"""
+
+	height = bounds[3] - bounds[1]
+
+	while depth <= radius:
+
+		# The columns whose centers are between the slopes, rounding ties outwards
+		first = (2 * depth * start[0] + start[1]) // (2 * start[1])
+		last = -((end[1] - 2 * depth * end[0]) // (2 * end[1]))
+
+		previous = None
+
+		for column in range(first, last + 1):
+
+			x_val = origin[0] + depth * quadrant[0] + column * quadrant[1]
+			y_val = origin[1] + depth * quadrant[2] + column * quadrant[3]
+
+			inside = bounds[0] <= x_val < bounds[2] and bounds[1] <= y_val < bounds[3]
+			opaque = not inside or not clear[(x_val - bounds[0]) * height + y_val - bounds[1]]
+
+			# Clear tiles only count if their centers are between the slopes
+			if inside and column * column + depth * depth <= radius * radius and (opaque or (column * start[1] >= depth * start[0] and column * end[1] <= depth * end[0])):
+
+				seen.add((x_val, y_val))
+
+			if previous is True and not opaque:
+
+				# The shadow ends at the left edge of this tile
+				start = (2 * column - 1, 2 * depth)
+
+			elif previous is False and opaque:
+
+				# Everything behind this tile is in its shadow, so scan around it
+				_scan(seen, clear, bounds, origin, radius, depth + 1, start, (2 * column - 1, 2 * depth), quadrant)
+
+			previous = opaque
+
+		if previous is not False:
+
+			# The row ended in shadow, or had no tiles at all
+			return
+
+		depth += 1
+
+def shadowcast(clear, bounds, origin, radius):
+	"""
+	Get the set of (x, y) which can be seen from origin within radius, through the tiles in
+	bounds which clear, a flat bytearray by x then y like Map.walkable makes, says are clear.
+	Opaque tiles can be seen themselves; nothing outside bounds can.
+	"""
+
+	seen = set([tuple(origin[:2])])
+
+	for quadrant in _QUADRANTS:
+
+		_scan(seen, clear, bounds, origin, radius, 1, (-1, 1), (1, 1), quadrant)
+
+	return seen
@@ -8,8 +8,15 @@
 # Imports
 import os
 
-from mirec_miskuf_json import json_loads_str
-
+from collections import OrderedDict
+
+from action_cache import ActionCache
+from autosave import Autosave
+from chunks import load_chunked
+from decoder import Decoder
+from indexed import load_indexed
+from journal import Journal
+from parallel import AIPool
 from state import *
 from constants import *
 
@@ -21,6 +28,9 @@ for var in default.ai.__all__:
 
 	ai[var] = vars(default.ai)[var]
 
+# The AI class of each AI ID, so IDs are only parsed once
+_AI_CLASSES = {}
+
 # Classes
 class Game(object):
 	"""
@@ -34,6 +44,7 @@ class Game(object):
 	Game.__init__(self, app, options)
 	Game._act_move(self, mob, direction)
 	Game._build_controls(self)
+	Game._decide(self, mobs)
 	Game._deref_index(self)
 	Game._do_action(self, mob, action, *args)
 	Game._io_coag_back(self)
@@ -64,17 +75,24 @@ class Game(object):
 	Game._mod_move(self, mob, to_coords)
 	Game._mod_prompt_input(self, input)
 	Game._mod_set_next_turn(self, mob, action)
+	Game._mod_unshare(self, entity, attr)
 	Game._pend_co_do_action(self, *args)
 	Game._prompt_start(self, pend_func, prompts, allow_exit=False)
 	Game._prompt_back(self)
+	Game._record(self, *record)
+	Game._replay(self, record)
 	Game._stop(self)
 	Game._turn(self)
 	Game.eval_control_string(self, string)
 	Game.eval_echo(self, char)
 	Game.loop(self)
 
+	Game._actions
+	Game._ai_pool
 	Game._app
+	Game._autosave
 	Game._controls
+	Game._journal
 	Game._state
 	"""
 
@@ -84,13 +102,70 @@ class Game(object):
 		# Initialize variables
 		self._app = app		
 
+		# Compile the actions up front so turns don't read any files
+		self._actions = ActionCache(_path_from_id)
+		self._actions.warm(os.path.dirname(__file__))
+
+		self._ai_pool = None
+		self._autosave = None
+		self._journal = None
 		self._state = None
+
+		if "parallel_ai" in options:
+
+			self._ai_pool = AIPool(	options["parallel_ai"]["workers"],
+									options["parallel_ai"]["minimum"])
+
+		# A journal left by the last game means it crashed or couldn't save, so that's where to pick up from
+		journal = None
+		recovered = False
+
+		if "journal" in options:
+
+			journal = Journal(	os.path.join(os.path.dirname(__file__), options["journal"]["path"]),
+								options["journal"]["checkpoint_turns"])
+			recovered = journal.has_checkpoint()
+
+		if recovered:
+
+			self._state, records = journal.recover()
+			self._build_controls()
+
+			for record in records:
+
+				self._replay(record)
+
 		# *** DEBUG ***
+		chunked_path = os.path.join(	os.path.dirname(__file__),
+										"debug/state")
+		indexed_path = os.path.join(	os.path.dirname(__file__),
+										"debug/state.fg3")
 		path = os.path.join(	os.path.dirname(__file__), 
 								"debug/state.json")
-		with open(path, 'r') as state_file:
 
-			self._state = load_if_dict(json_loads_str(state_file.read()))
+		# The autosave is only loaded if it's newer than the indexed save
+		indexed_paths = [indexed_path]
+
+		if "autosave" in options:
+
+			indexed_paths.append(os.path.join(os.path.dirname(__file__), options["autosave"]["path"]))
+
+		indexed_paths = [save_path for save_path in indexed_paths if os.path.isfile(save_path)]
+
+		if self._state is None and indexed_paths:
+
+			# An indexed save only loads the chunks around the player up front
+			self._state = load_indexed(max(indexed_paths, key=os.path.getmtime))
+
+		elif self._state is None and os.path.isdir(chunked_path):
+
+			# A chunked save streams its chunks in as they're needed
+			self._state = load_chunked(chunked_path)
+
+		elif self._state is None:
+			with open(path, 'r') as state_file:
+
+				self._state = Decoder().load(state_file)
 
 		#path = os.path.join(	os.path.dirname(__file__), 
 		#						"debug/state2.json")
@@ -103,11 +178,23 @@ class Game(object):
 		# Build controls
 		self._build_controls()
 
-		# Give mobs their first turn
-		for mob in self._state.map.get_mobs():
+		# Give mobs their first turn, unless the journal already gave them one
+		mobs = [mob for mob in self._state.map.get_mobs() if not recovered or mob.next_turn == None]
+
+		for mob, next_turn in zip(mobs, self._decide(mobs)):
+
+			self._mod_set_next_turn(mob, next_turn)
+
+		# Journal everything from here on
+		if journal is not None:
 
-			ai_type = mob.ai.split(':')[-1]
-			self._mod_set_next_turn(mob, ai[ai_type].DefAI.get_next_turn(self._state.map, mob))
+			journal.checkpoint(self._state)
+			self._journal = journal
+
+		if "autosave" in options:
+
+			self._autosave = Autosave(	os.path.join(os.path.dirname(__file__), options["autosave"]["path"]),
+										options["autosave"]["interval"])
 
 	def _act_move(self, mob, direction):
 		"""
@@ -256,6 +343,55 @@ class Game(object):
 
 			self._controls = pmt_direction_controls
 
+	def _decide(self, mobs):
+		"""
+		Get the next turns of mobs from their AIs, in the same order as mobs.
+
+		Every mob decides from the Map as it is now, so with an AIPool they can decide in
+		parallel; nothing changes until the turns are set. The mobs with each AI decide
+		together, so the AI can share its work between them. What they share is worked out
+		before the AIPool forks, so every worker starts with it instead of working it out.
+		"""
+
+		def group(mobs):
+
+			groups = OrderedDict()
+
+			for index, mob in enumerate(mobs):
+
+				groups.setdefault(_ai_from_id(mob.ai), []).append(index)
+
+			return groups
+
+		def decide(mobs):
+
+			groups = group(mobs)
+			turns = [None] * len(mobs)
+
+			for ai_class, indices in groups.items():
+				for index, turn in zip(indices, ai_class.get_next_turns(self._state.map, [mobs[index] for index in indices])):
+
+					turns[index] = turn
+
+			return turns
+
+		if self._ai_pool is None:
+
+			return decide(mobs)
+
+		for ai_class, indices in group(mobs).items():
+
+			ai_class.prepare_turns(self._state.map, [mobs[index] for index in indices])
+
+		turns = self._ai_pool.decide(decide, mobs)
+
+		# Tell the player about workers which failed, with the line saying what went wrong
+		while self._ai_pool.errors:
+
+			self._mod_console_post_message("AI worker failed: " + self._ai_pool.errors.pop(0).strip().splitlines()[-1])
+
+		return turns
+
 	def _deref_index(self, index):
 		"""
 		Get whatever is at the end of the given index.
@@ -284,12 +420,14 @@ class Game(object):
 			return coag
 
 	def _do_action(self, mob, action, *args):
-		"""Change state based on which action is performed by what mob."""
+		"""
+		Change state based on which action is performed by what mob.
 
-		path = _path_from_id(action.id)
-		action_file = open(path, 'r')
-		exec(action_file.read())
-		pass
+		The action scripts come compiled from Game._actions; call Game._actions.refresh()
+		from the console to pick up edited scripts.
+		"""
+
+		exec(self._actions.get(action.id))
 
 	def _io_coag_back(self):
 		"""Go back into the parent of the current coagulate."""
@@ -364,29 +502,25 @@ class Game(object):
 		"""Prepare to move the player character north."""
 		
 		player = self._state.index_stack[-1][1]
-		ai_type = player.ai.split(':')[-1]
-		self._mod_set_next_turn(player, ai[ai_type].DefAI.get_move(player, DIR_NORTH))
+		self._mod_set_next_turn(player, _ai_from_id(player.ai).get_move(player, DIR_NORTH))
 
 	def _io_move_west(self):
 		"""Prepare to move the player character west."""
 
 		player = self._state.index_stack[-1][1]
-		ai_type = player.ai.split(':')[-1]
-		self._mod_set_next_turn(player, ai[ai_type].DefAI.get_move(player, DIR_WEST))
+		self._mod_set_next_turn(player, _ai_from_id(player.ai).get_move(player, DIR_WEST))
 
 	def _io_move_south(self):
 		"""Prepare to move the player character south."""
 
 		player = self._state.index_stack[-1][1]
-		ai_type = player.ai.split(':')[-1]
-		self._mod_set_next_turn(player, ai[ai_type].DefAI.get_move(player, DIR_SOUTH))
+		self._mod_set_next_turn(player, _ai_from_id(player.ai).get_move(player, DIR_SOUTH))
 
 	def _io_move_east(self):
 		"""Prepare to move the player character east."""
 
 		player = self._state.index_stack[-1][1]
-		ai_type = player.ai.split(':')[-1]
-		self._mod_set_next_turn(player, ai[ai_type].DefAI.get_move(player, DIR_EAST))
+		self._mod_set_next_turn(player, _ai_from_id(player.ai).get_move(player, DIR_EAST))
 
 	def _io_pause(self):
 		"""Pause the game."""
@@ -423,20 +557,29 @@ class Game(object):
 
 		self._state.message_log[-1] = self._state.message_log[-1] + char
 
+		self._record("console_add_char", char)
+
 	def _mod_console_new_message(self):
 		"""Begin a new message in the console."""
 
 		self._state.message_log.append("> ")
 
+		self._record("console_new_message")
+
 	def _mod_console_post_message(self, message):
 
 		self._state.message_log.append(message)
 
+		self._record("console_post_message", message)
+
 	def _mod_console_run_message(self):
 		"""Run the current console message."""
 
 		self._state.message_log[-1] = self._state.message_log[-1][2:]
 
+		# Only the message is journaled; whatever running it changes journals itself
+		self._record("console_run_message", self._state.message_log[-1])
+
 		try:
 
 			exec(self._state.message_log[-1])
@@ -464,6 +607,7 @@ class Game(object):
 
 			self._state.index_stack[-1][index] = to_value
 
+		self._record("index_stack", self._state.saved_index_stack())
 		self._build_controls()
 
 	def _mod_index_pop(self):
@@ -471,6 +615,7 @@ class Game(object):
 
 		index = self._state.index_stack.pop()
 
+		self._record("index_stack", self._state.saved_index_stack())
 		self._build_controls()
 
 		return index
@@ -480,6 +625,7 @@ class Game(object):
 
 		self._state.index_stack.append(index)
 
+		self._record("index_stack", self._state.saved_index_stack())
 		self._build_controls()
 
 	def _mod_move(self, entity, to_coords):
@@ -528,6 +674,33 @@ class Game(object):
 
 		to_layers[to_coords[2]][int(entity.quanta["default:quanta:_permeability"])] = entity
 
+		# Keep the map's mob registry and entity index in sync
+		if type(entity) == Mob:
+
+			del self._state.map.mob_coords[tuple(entity.coords)]
+			self._state.map.mob_coords[tuple(to_coords)] = entity
+
+		entity_coords = self._state.map.entities.setdefault(entity.id, {})
+		entity_coords.pop(tuple(entity.coords), None)
+		entity_coords[tuple(to_coords)] = entity
+
+		self._record("move", list(entity.coords), int(entity.quanta["default:quanta:_permeability"]), list(to_coords))
+
+		# The tiles' saved dicts don't have the right entities anymore, and neither do their chunks' saved copies
+		self._state.map.grid[entity.coords[0]][entity.coords[1]]._dirty()
+		self._state.map.grid[to_coords[0]][to_coords[1]]._dirty()
+		self._state.map.tile_changed(entity.coords[0], entity.coords[1])
+		self._state.map.tile_changed(to_coords[0], to_coords[1])
+
+		# Fields leading to the entity, or around it if it's terrain, lead somewhere else now
+		self._state.map.forget_flow_fields(entity)
+
+		# Terrain moving changes where paths can go
+		if type(entity) != Mob:
+
+			self._state.map.terrain_changed(entity.coords[0], entity.coords[1])
+			self._state.map.terrain_changed(to_coords[0], to_coords[1])
+
 		# Fix entity.coords
 		entity.coords = to_coords
 
@@ -563,7 +736,42 @@ class Game(object):
 		"""Set the next turn of the mob."""
 
 		mob.next_turn = action
+		mob._dirty()
+		self._state.map.tile_changed(mob.coords[0], mob.coords[1])
+
+		if action == None:
+
+			self._record("set_next_turn", list(mob.coords), None)
+
+		else:
+
+			self._record("set_next_turn", list(mob.coords), [action[0].id] + list(action[1:]))
+
+		# Keep track of the mobs which are still deciding
+		if action == None:
+
+			self._state.map.pending_mobs[mob] = None
+
+		else:
+
+			self._state.map.pending_mobs.pop(mob, None)
 	
+	def _mod_unshare(self, entity, attr):
+		"""
+		Give a NonMob its own copy of its template's inventory, knowledge or status, and return it.
+
+		Call this before changing any of them on a NonMob, since templates are shared.
+		"""
+
+		coords = list(entity.coords)
+		permeability = int(entity.quanta["default:quanta:_permeability"])
+
+		coag = self._state.map.unshare(coords, permeability, attr)
+
+		self._record("unshare", coords, permeability, attr)
+
+		return coag
+
 	def _pend_co_do_action(self, *args):
 		"""Finish Game.co_do_action after all information has been prompted."""
 
@@ -636,8 +844,75 @@ class Game(object):
 
 				self._mod_index_pop()
 
+	def _record(self, *record):
+		"""Log a change to the state in the journal, if there is one, so Game._replay can redo it."""
+
+		if self._journal is not None:
+
+			self._journal.record(list(record))
+
+	def _replay(self, record):
+		"""Redo a change to the state logged by Game._record."""
+
+		if record[0] == "move":
+
+			from_coords = record[1]
+			entity = self._state.map.grid[from_coords[0]][from_coords[1]].layers[from_coords[2]][record[2]]
+
+			self._mod_move(entity, record[3])
+
+		elif record[0] == "set_next_turn":
+
+			mob = self._state.map.get_mob(record[1])
+			action = record[2]
+
+			# Actions are logged by id
+			if action != None:
+
+				action = [mob.actions[action[0]]] + action[1:]
+
+			self._mod_set_next_turn(mob, action)
+
+		elif record[0] == "unshare":
+
+			self._state.map.unshare(record[1], record[2], record[3])
+
+		elif record[0] == "index_stack":
+
+			self._state.load_index_stack(record[1])
+			self._build_controls()
+
+		elif record[0] == "console_run_message":
+
+			# Whatever running the message did is in the records after it
+			self._state.message_log[-1] = record[1]
+
+		else:
+
+			getattr(self, "_mod_" + record[0])(*record[1:])
+
 	def _stop(self):
 
+		saved = False
+
+		# Don't leave a save half-done, then save everything played since it started
+		if self._autosave is not None:
+
+			self._autosave.finish()
+			saved = self._autosave.save(self._state)
+
+		if self._journal is not None:
+
+			if saved:
+
+				# Stopping cleanly with everything saved means there's nothing to recover next time
+				self._journal.clear()
+
+			else:
+
+				# With nothing else holding what was played, the next game recovers it
+				self._journal.close()
+
 		self._app.stop()
 
 	def _turn(self):
@@ -651,10 +926,29 @@ class Game(object):
 			self._mod_set_next_turn(mob, None)
 
 		# Reset/decide the actions for all the next turns
-		for mob in self._state.map.get_mobs():
+		mobs = self._state.map.get_mobs()
+
+		for mob, next_turn in zip(mobs, self._decide(mobs)):
 
-			ai_type = mob.ai.split(':')[-1]
-			self._mod_set_next_turn(mob, ai[ai_type].DefAI.get_next_turn(self._state.map, mob))
+			self._mod_set_next_turn(mob, next_turn)
+
+		# Pack the tiles that mobs left back into the terrain and let go of idle chunks
+		self._state.map.compact()
+		self._state.map.update_chunks()
+
+		if self._journal is not None:
+
+			self._journal.end_turn(self._state)
+
+		# Between turns is the only time the State is whole enough to save
+		if self._autosave is not None:
+
+			self._autosave.tick(self._state)
+
+			# Tell the player about saves which failed, with the line saying what went wrong
+			while self._autosave.errors:
+
+				self._mod_console_post_message("Autosave failed: " + self._autosave.errors.pop(0).strip().splitlines()[-1])
 
 	def eval_control_string(self, string):
 		"""
@@ -689,18 +983,38 @@ class Game(object):
 	def loop(self):
 		"""Perform a main game loop."""
 
-		will_do_turn = True
+		# Give the mobs which were loaded with a chunk their first turn, all at once; deciding
+		# can load more chunks, so go again until no more mobs are fresh
+		while self._state.map.fresh_mobs:
+
+			mobs = [mob for mob in self._state.map.fresh_mobs if mob.next_turn == None]
+			self._state.map.fresh_mobs.clear()
 
-		for mob in self._state.map.get_mobs():
-			if mob.next_turn == None:	# This uses "== None" because __nonzero__ isn't implemented for Action
+			for mob, next_turn in zip(mobs, self._decide(mobs)):
 
-				will_do_turn = False
+				self._mod_set_next_turn(mob, next_turn)
 
-		if will_do_turn:
+		# Only do the turn once no mob is left deciding
+		if not self._state.map.pending_mobs:
 
 			self._turn()
 
 # Functions
+def _ai_from_id(id_):
+	"""Get the AI class of an AI's ID."""
+
+	try:
+
+		return _AI_CLASSES[id_]
+
+	except KeyError:
+
+		pass
+
+	_AI_CLASSES[id_] = ai[id_.split(':')[-1]].DefAI
+
+	return _AI_CLASSES[id_]
+
 def _path_from_id(id_):
 	"""Get a path to a file based on its ID."""
 
@@ -0,0 +1,396 @@
+# Andrew Bogdan
+# Feasible Game 3
+# indexed.py
+"""
+	Indexed saves, which keep a whole State in one file with a small header and an index of
+	where every chunk is, so a save can be listed or partly loaded without reading all of it.
+
+	An indexed save is MAGIC, the length of the header and the header, a JSON dict of what a
+	save list shows (the map's shape, how many mobs there are, the turn and where the player
+	is). Then comes the index, an (offset, length) for the rest of the State, one for the
+	map's templates and one for each chunk in Map.chunk_keys order, so any chunk's entry is
+	found without searching. Then come those blobs, each compact JSON, with the chunks like
+	Map.save_chunk makes them. The rest of the State holds how many mobs each chunk has too.
+
+	Chunks are read through a memory map of the file. A chunk written back while the game
+	is played is appended to the file and its index entry is pointed at it; saving the
+	State again with save_indexed leaves the old copies out. The chunks a Map streaming from
+	an indexed save hasn't loaded are copied from it as they are, without being loaded.
+
+	A child forked to save the State shares the file and its memory map with the game, which
+	goes on pointing index entries at blobs past the end of the child's map. So the child
+	freezes its store first, keeping its own copy of the index; old blobs are never written
+	over, so the entries it copied stay good.
+"""
+
+# Imports
+import json
+import mmap
+import os
+import struct
+
+from decoder import Decoder
+from state import *
+
+# Constants
+MAGIC = "FG3INDX\x01"
+
+SAVE_EXTENSION = ".fg3"
+
+_ENTRY = struct.Struct("<QI")
+_UINT = struct.Struct("<I")
+
+# The index entries before the chunks'
+_ENTRY_STATE = 0
+_ENTRY_PROTOTYPES = 1
+_ENTRY_CHUNKS = 2
+
+# Classes
+class IndexedStore(object):
+	"""
+	The file of an indexed save, which a Map streams its chunks through
+
+	IndexedStore.__init__(self, path)
+	IndexedStore._append(self, entry, text)
+	IndexedStore._entry(self, entry)
+	IndexedStore._index(self, key)
+	IndexedStore._map(self)
+	IndexedStore._read(self, entry)
+	IndexedStore.chunk_mobs(self)
+	IndexedStore.close(self)
+	IndexedStore.freeze(self)
+	IndexedStore.read(self, key)
+	IndexedStore.read_blob(self, key)
+	IndexedStore.read_prototypes(self)
+	IndexedStore.read_state(self)
+	IndexedStore.write(self, key, saved_chunk, prototypes)
+
+	IndexedStore._chunk_columns
+	IndexedStore._chunk_mobs
+	IndexedStore._decoder
+	IndexedStore._file
+	IndexedStore._frozen_index
+	IndexedStore._index_offset
+	IndexedStore._mmap
+	IndexedStore._prototype_ids
+	IndexedStore.header
+	IndexedStore.path
+	"""
+
+	def __init__(self, path):
+		"""Initialize the IndexedStore, reading the header of the save."""
+
+		self._chunk_mobs = None
+		self._decoder = Decoder()
+		self._file = open(path, 'r+b')
+		self._frozen_index = None
+		self._mmap = None
+		self._prototype_ids = None
+		self.path = path
+
+		self.header = _read_header(self._file)
+		self._index_offset = self._file.tell()
+
+		# How many chunks a column of chunks has, to find a chunk's place in the index
+		self._chunk_columns = -(-self.header["size"][1] // self.header["chunk_size"])
+
+		self._map()
+
+	def _append(self, entry, text):
+		"""Append a blob to the end of the file and point an index entry at it."""
+
+		self._file.seek(0, os.SEEK_END)
+		offset = self._file.tell()
+		self._file.write(text)
+
+		# The blob is whole before anything points at it
+		self._file.flush()
+		self._file.seek(self._index_offset + entry * _ENTRY.size)
+		self._file.write(_ENTRY.pack(offset, len(text)))
+		self._file.flush()
+
+		self._map()
+
+	def _entry(self, entry):
+		"""Get the (offset, length) of the blob an index entry points at."""
+
+		if self._frozen_index is not None:
+
+			return _ENTRY.unpack_from(self._frozen_index, entry * _ENTRY.size)
+
+		return _ENTRY.unpack_from(self._mmap, self._index_offset + entry * _ENTRY.size)
+
+	def _map(self):
+		"""Map the whole file into memory again, since it might have grown."""
+
+		if self._mmap is not None:
+
+			self._mmap.close()
+
+		self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+	def _read(self, entry):
+		"""Read and decode the blob an index entry points at."""
+
+		offset, length = self._entry(entry)
+
+		return self._decoder.loads(self._mmap[offset:offset + length])
+
+	def _index(self, key):
+		"""Get the index entry of a chunk."""
+
+		return _ENTRY_CHUNKS + key[0] * self._chunk_columns + key[1]
+
+	def chunk_mobs(self):
+		"""
+		Get how many mobs each chunk has, in Map.chunk_keys order, or None if the save is
+		too old to say.
+		"""
+
+		if self._chunk_mobs is None:
+
+			self._chunk_mobs = self.read_state().get("chunk_mobs")
+
+		return self._chunk_mobs
+
+	def close(self):
+		"""Close the file."""
+
+		self._mmap.close()
+		self._file.close()
+
+	def freeze(self):
+		"""
+		Keep reading the index as it is now, whatever another process sharing the file
+		writes to it; this is for a forked child, which should only read from then on.
+		"""
+
+		entries = _ENTRY_CHUNKS + self._chunk_columns * -(-self.header["size"][0] // self.header["chunk_size"])
+		self._frozen_index = self._mmap[self._index_offset:self._index_offset + entries * _ENTRY.size]
+
+	def read(self, key):
+		"""Read a saved chunk."""
+
+		return self._read(self._index(key))
+
+	def read_blob(self, key):
+		"""Read the JSON of a saved chunk without decoding it."""
+
+		offset, length = self._entry(self._index(key))
+
+		return self._mmap[offset:offset + length]
+
+	def read_prototypes(self):
+		"""Read the saved NonMob templates."""
+
+		prototypes = self._read(_ENTRY_PROTOTYPES)
+		self._prototype_ids = set(prototypes)
+
+		return prototypes
+
+	def read_state(self):
+		"""Read the rest of the saved State, its index stack and message log."""
+
+		return self._read(_ENTRY_STATE)
+
+	def write(self, key, saved_chunk, prototypes):
+		"""
+		Write a saved chunk.
+
+		The templates are written too if there are new ones, so the chunk never refers to a
+		prototype that isn't saved.
+		"""
+
+		if set(prototypes.templates) != self._prototype_ids:
+
+			self._append(_ENTRY_PROTOTYPES, _dumps(prototypes.to_dict()))
+			self._prototype_ids = set(prototypes.templates)
+
+		self._append(self._index(key), _dumps(saved_chunk))
+
+		if self.chunk_mobs() is not None:
+
+			self._chunk_mobs[self._index(key) - _ENTRY_CHUNKS] = _count_mobs(saved_chunk)
+
+# Functions
+def _count_mobs(saved_chunk):
+	"""Count the mobs of a saved chunk, which are only ever in the tiles saved whole."""
+
+	mobs = 0
+
+	for saved_col in saved_chunk["grid"]:
+		for saved_tile in saved_col:
+			if type(saved_tile) == dict:
+				for saved_layer_dict in saved_tile["layers"]:
+					for saved_entity in saved_layer_dict.values():
+						if saved_entity["_type"] == "Mob":
+
+							mobs += 1
+
+	return mobs
+
+def _dumps(value):
+	"""Dump a value as JSON without any whitespace."""
+
+	return json.dumps(value, separators=(",", ":"))
+
+def _read_header(file_):
+	"""Read the header of an indexed save from the start of a file object."""
+
+	if file_.read(len(MAGIC)) != MAGIC:
+
+		raise ValueError("not an indexed save")
+
+	length = _UINT.unpack(file_.read(_UINT.size))[0]
+
+	return Decoder().loads(file_.read(length))
+
+def list_saves(path):
+	"""Get a list of (file name, header) of every indexed save in a directory, by file name."""
+
+	saves = []
+
+	for file_name in sorted(os.listdir(path)):
+		if file_name.endswith(SAVE_EXTENSION):
+
+			saves.append((file_name, read_header(os.path.join(path, file_name))))
+
+	return saves
+
+def load_indexed(path, radius=1):
+	"""
+	Load the State of an indexed save, loading only the chunks within radius chunks of the
+	player; the rest are loaded as the Map uses them.
+	"""
+
+	store = IndexedStore(path)
+	header = store.header
+	saved_state = store.read_state()
+
+	map_ = Map(	prototypes=store.read_prototypes(),
+				size=header["size"],
+				depth=header["depth"],
+				chunk_size=header["chunk_size"],
+				chunk_store=store)
+
+	# The map's clock counts the turns
+	map_._chunk_clock = header["turn"]
+
+	if header["player"] is not None:
+
+		x_key = header["player"][0] // map_.chunk_size
+		y_key = header["player"][1] // map_.chunk_size
+
+		for x_val in range(max(x_key - radius, 0), min(x_key + radius + 1, -(-map_._size[0] // map_.chunk_size))):
+			for y_val in range(max(y_key - radius, 0), min(y_key + radius + 1, -(-map_._size[1] // map_.chunk_size))):
+
+				map_._chunk(x_val * map_.chunk_size, y_val * map_.chunk_size)
+
+	return State(map_, saved_state["index_stack"], saved_state["message_log"])
+
+def read_header(path):
+	"""Read the header of an indexed save, which doesn't depend on how big its map is."""
+
+	with open(path, 'rb') as save_file:
+
+		return _read_header(save_file)
+
+def save_indexed(state, path):
+	"""
+	Save a State as an indexed save, writing one chunk at a time.
+
+	If the State's Map streams from an indexed save, the chunks it hasn't loaded are copied
+	from it; otherwise every chunk gets loaded, so that the header can count the mobs. The
+	save is written to a temporary file which replaces the old save once it's whole.
+	"""
+
+	map_ = state.map
+	keys = map_.chunk_keys()
+	saved_index_stack = state.saved_index_stack()
+
+	store = None
+	stored_mobs = None
+
+	if isinstance(map_._chunk_store, IndexedStore):
+
+		store = map_._chunk_store
+		stored_mobs = store.chunk_mobs()
+
+	if stored_mobs is None:
+		for key in keys:
+
+			bounds = map_._chunk_bounds(key)
+			map_._chunk(bounds[0], bounds[1])
+
+	# Mobs are only ever in loaded chunks
+	loaded_mobs = {}
+
+	for mob_coords in map_.mob_coords:
+
+		key = (mob_coords[0] // map_.chunk_size, mob_coords[1] // map_.chunk_size)
+		loaded_mobs[key] = loaded_mobs.get(key, 0) + 1
+
+	chunk_mobs = []
+
+	for index, key in enumerate(keys):
+
+		chunk_mobs.append(loaded_mobs.get(key, 0) if key in map_._chunks else stored_mobs[index])
+
+	# The player is the mob the map view is following
+	player = None
+
+	for saved_index in saved_index_stack:
+		if saved_index[0] in (VIEW_MAP, VIEW_DC):
+
+			player = list(saved_index[1][0])
+
+	header = _dumps({	"chunk_size": map_.chunk_size,
+						"depth": map_.depth,
+						"mobs": sum(chunk_mobs),
+						"player": player,
+						"size": list(map_._size),
+						"turn": map_._chunk_clock})
+
+	temp_path = path + ".tmp"
+
+	with open(temp_path, 'wb') as save_file:
+
+		save_file.write(MAGIC + _UINT.pack(len(header)) + header)
+
+		# Leave room for the index, which is filled in once the blobs are written
+		index_offset = save_file.tell()
+		save_file.write("\0" * (_ENTRY.size * (_ENTRY_CHUNKS + len(keys))))
+
+		index = []
+
+		def write_blob(text):
+
+			index.append(_ENTRY.pack(save_file.tell(), len(text)))
+			save_file.write(text)
+
+		write_blob(_dumps({	"chunk_mobs": chunk_mobs,
+							"index_stack": saved_index_stack,
+							"message_log": state.message_log}))
+		write_blob(_dumps(map_.prototypes.to_dict()))
+
+		for key in keys:
+
+			if key in map_._chunks:
+
+				write_blob(_dumps(map_.save_chunk(key)))
+
+			else:
+
+				write_blob(store.read_blob(key))
+
+		save_file.seek(index_offset)
+		save_file.write("".join(index))
+
+	os.rename(temp_path, path)
+
+	# A Map streaming from the old file streams from the new one now, which has all its chunks
+	if store is not None and os.path.abspath(store.path) == os.path.abspath(path):
+
+		store.close()
+		map_._chunk_store = IndexedStore(path)
+		map_._dirty_chunks.clear()
@@ -0,0 +1,268 @@
+# Andrew Bogdan
+# Feasible Game 3
+# journal.py
+"""
+	The journal of a game, which saves it as it's played by logging every change to its State.
+
+	A journal is a directory of checkpoints, which are snapshots of the whole State, and logs,
+	which hold one line of JSON for each Game._mod_* call since their checkpoint.
+	checkpoint_<n>.snap goes with journal_<n>.log, and the newest checkpoint is the one that
+	counts. The logs after it are replayed in order too, since a checkpoint's log is started
+	as soon as the checkpoint is, which is before it's written.
+
+	Checkpoints are written by a forked child, like autosaves, so the game doesn't stop for
+	them or load every chunk of a streamed Map itself. A new checkpoint is written in full
+	before the old ones and their logs are removed, so a crash at any point leaves one whole
+	checkpoint and the logs after it to recover from. The log is flushed once a turn, so a
+	crash loses the turn it happened in at most.
+
+	A game that stops cleanly saves, then clears its journal, so a journal is only recovered
+	from if the game playing it crashed or had nowhere to save when it stopped.
+"""
+
+# Imports
+import json
+import os
+import traceback
+
+import snapshot
+
+from decoder import Decoder
+from indexed import IndexedStore
+
+# Constants
+# The start and the end of the file names of checkpoints and logs, around their numbers
+_FILE_NAMES = {	"checkpoint": ("checkpoint_", ".snap"),
+				"journal": ("journal_", ".log")}
+
+# Classes
+class Journal(object):
+	"""
+	An append-only log of the changes made to a State, with periodic checkpoints
+
+	Journal.__init__(self, path, checkpoint_turns=100)
+	Journal._numbers(self, kind)
+	Journal._path(self, kind, number)
+	Journal._reap(self, block=False)
+	Journal._remove_before(self, number)
+	Journal.checkpoint(self, state)
+	Journal.clear(self)
+	Journal.close(self)
+	Journal.end_turn(self, state)
+	Journal.has_checkpoint(self)
+	Journal.record(self, record)
+	Journal.recover(self)
+
+	Journal._log_file
+	Journal._number
+	Journal._pending
+	Journal._pid
+	Journal._turns
+	Journal.checkpoint_turns
+	Journal.path
+	Journal.records
+	"""
+
+	def __init__(self, path, checkpoint_turns=100):
+		"""Initialize the Journal, making its directory if it doesn't exist."""
+
+		self.checkpoint_turns = checkpoint_turns
+		self.path = path
+		self.records = 0
+
+		if not os.path.isdir(path):
+
+			os.makedirs(path)
+
+		self._log_file = None
+		self._number = max([0] + self._numbers("checkpoint") + self._numbers("journal"))
+		self._pending = None
+		self._pid = None
+		self._turns = 0
+
+	def _numbers(self, kind):
+		"""Get the numbers of every checkpoint or every log in the journal, in order."""
+
+		prefix, extension = _FILE_NAMES[kind]
+		numbers = []
+
+		for file_name in os.listdir(self.path):
+			if file_name.startswith(prefix) and file_name.endswith(extension):
+
+				numbers.append(int(file_name[len(prefix):-len(extension)]))
+
+		return sorted(numbers)
+
+	def _path(self, kind, number):
+		"""Get the path of the checkpoint or the log with a number."""
+
+		return os.path.join(self.path, _FILE_NAMES[kind][0] + str(number) + _FILE_NAMES[kind][1])
+
+	def _reap(self, block=False):
+		"""Finish the checkpoint being written if it's done; return whether one is still being written."""
+
+		if self._pid is None:
+
+			return False
+
+		pid, status = os.waitpid(self._pid, 0 if block else os.WNOHANG)
+
+		if pid == 0:
+
+			return True
+
+		# A checkpoint which failed leaves the old ones, and the logs after them, to recover from
+		if status == 0:
+
+			self._remove_before(self._pending)
+
+		self._pending = None
+		self._pid = None
+
+		return False
+
+	def _remove_before(self, number):
+		"""Remove the checkpoints and logs before a checkpoint, which is whole."""
+
+		for kind in ("checkpoint", "journal"):
+			for old_number in self._numbers(kind):
+				if old_number < number:
+
+					os.remove(self._path(kind, old_number))
+
+	def checkpoint(self, state):
+		"""Start writing a checkpoint of state, and start a new log after it."""
+
+		self._reap(block=True)
+
+		number = self._number + 1
+
+		# The new log starts now; until the checkpoint is whole, the old one and its log lead up to it
+		self.close()
+		self._log_file = open(self._path("journal", number), 'a')
+		self._number = number
+		self._turns = 0
+		self.records = 0
+
+		if hasattr(os, "fork"):
+
+			pid = os.fork()
+
+			if pid == 0:
+
+				# The child only writes; os._exit keeps it from running anything of the game's
+				try:
+
+					# The game goes on writing the save the Map streams from
+					if isinstance(state.map._chunk_store, IndexedStore):
+
+						state.map._chunk_store.freeze()
+
+					_write_checkpoint(state, self._path("checkpoint", number))
+
+				except:
+
+					# Even if the traceback can't be written, the child mustn't go on as the game
+					try:
+
+						with open(os.path.join(self.path, "checkpoint_error.txt"), 'w') as error_file:
+
+							traceback.print_exc(file=error_file)
+
+					finally:
+
+						os._exit(1)
+
+				os._exit(0)
+
+			self._pending = number
+			self._pid = pid
+
+		else:
+
+			_write_checkpoint(state, self._path("checkpoint", number))
+			self._remove_before(number)
+
+	def clear(self):
+		"""Remove every checkpoint and log, once the game has stopped cleanly and been saved."""
+
+		self.close()
+
+		for kind in ("checkpoint", "journal"):
+			for number in self._numbers(kind):
+
+				os.remove(self._path(kind, number))
+
+	def close(self):
+		"""Wait for the checkpoint being written, if there is one, and close the log."""
+
+		self._reap(block=True)
+
+		if self._log_file is not None:
+
+			self._log_file.close()
+			self._log_file = None
+
+	def end_turn(self, state):
+		"""Flush the turn's records and count it, writing a checkpoint every checkpoint_turns turns."""
+
+		self._log_file.flush()
+		self._turns += 1
+
+		if not self._reap() and self._turns >= self.checkpoint_turns:
+
+			self.checkpoint(state)
+
+	def has_checkpoint(self):
+		"""Return whether there's a checkpoint to recover from."""
+
+		return len(self._numbers("checkpoint")) != 0
+
+	def record(self, record):
+		"""Append a record, a list of JSON-serializable things, to the log."""
+
+		self._log_file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+		self.records += 1
+
+	def recover(self):
+		"""
+		Load the State of the newest checkpoint and the records logged after it.
+
+		A record cut off by a crash is dropped; the records should be replayed in order.
+		"""
+
+		number = self._numbers("checkpoint")[-1]
+
+		with open(self._path("checkpoint", number), 'rb') as checkpoint_file:
+
+			state = snapshot.loads(checkpoint_file.read())
+
+		decoder = Decoder()
+		records = []
+
+		for log_number in self._numbers("journal"):
+			if log_number >= number:
+				with open(self._path("journal", log_number), 'r') as log_file:
+					for line in log_file:
+
+						if not line.endswith("\n"):
+
+							# The game crashed while writing this record
+							break
+
+						records.append(decoder.loads(line))
+
+		return state, records
+
+# Functions
+def _write_checkpoint(state, path):
+	"""Write a snapshot of state to path by way of a temporary file, so it's never half-written."""
+
+	temp_path = path + ".tmp"
+
+	with open(temp_path, 'wb') as temp_file:
+
+		temp_file.write(snapshot.dumps(state))
+
+	os.rename(temp_path, path)
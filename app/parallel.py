@@ -0,0 +1,148 @@
+# Andrew Bogdan
+# Feasible Game 3
+# parallel.py
+"""
+	Parallel AI, which decides the next turns of many mobs at once in worker processes.
+
+	The workers are forked when the AI phase starts, so each inherits the Map exactly as it
+	is then. The packed terrain, the loaded tiles and the mobs are shared with the game's
+	process page by page until one of them writes to a page, so there's nothing to copy or
+	send; that's the snapshot. The workers only read it, and anything they do change in their
+	copy, like the flow fields they search, is thrown away when they exit.
+
+	Each worker decides a batch of mobs next to each other in turn order and sends back their
+	turns through a pipe, with the actions by ID like the journal logs them. The turns are put
+	back together in the mobs' order, so they come out the same however many workers there
+	are. Where there's no fork, or too few mobs to be worth forking for, the mobs are decided
+	in the game's process instead.
+
+	A worker which fails sends its traceback through the pipe instead of its turns, since it
+	can't print it without scribbling over the screen.
+"""
+
+# Imports
+import cPickle
+import gc
+import multiprocessing
+import os
+import traceback
+
+# Constants
+# The fewest mobs it's worth forking for
+MINIMUM_MOBS = 256
+
+# Classes
+class AIPool(object):
+	"""
+	Decides the next turns of mobs in workers forked for each AI phase
+
+	AIPool.__init__(self, workers=None, minimum=MINIMUM_MOBS)
+	AIPool._fork(self, decide, batch)
+	AIPool.decide(self, decide, mobs)
+
+	AIPool.errors
+	AIPool.failures
+	AIPool.minimum
+	AIPool.workers
+	"""
+
+	def __init__(self, workers=None, minimum=MINIMUM_MOBS):
+		"""Initialize the AIPool, with a worker for each core if workers isn't given."""
+
+		# The tracebacks of the workers which failed, for the game to take
+		self.errors = []
+
+		self.failures = 0
+		self.minimum = minimum
+		self.workers = workers or multiprocessing.cpu_count()
+
+	def _fork(self, decide, batch):
+		"""Start a worker deciding the turns of a batch of mobs; return its pid and its pipe."""
+
+		read_fd, write_fd = os.pipe()
+		pid = os.fork()
+
+		if pid == 0:
+
+			# The worker only decides; os._exit keeps it from running anything of the game's
+			os.close(read_fd)
+
+			# Collecting would touch every object, copying the whole snapshot, for nothing
+			gc.disable()
+
+			status = 0
+
+			try:
+
+				turns = []
+
+				for turn in decide(batch):
+
+					if turn is not None:
+
+						turn = [turn[0].id] + list(turn[1:])
+
+					turns.append(turn)
+
+				data = cPickle.dumps(turns, cPickle.HIGHEST_PROTOCOL)
+
+			except:
+
+				data = traceback.format_exc()
+				status = 1
+
+			with os.fdopen(write_fd, 'wb') as pipe:
+
+				pipe.write(data)
+
+			os._exit(status)
+
+		os.close(write_fd)
+
+		return pid, read_fd
+
+	def decide(self, decide, mobs):
+		"""
+		Get the next turn of each of mobs from decide, which gets the next turns of a list of
+		mobs in the same order as them.
+
+		A worker which fails has its batch decided in the game's process instead, and its
+		traceback is kept in AIPool.errors.
+		"""
+
+		if not hasattr(os, "fork") or self.workers < 2 or len(mobs) < self.minimum:
+
+			return decide(mobs)
+
+		batch_size = -(-len(mobs) // self.workers)
+		batches = [mobs[start:start + batch_size] for start in range(0, len(mobs), batch_size)]
+		workers = [self._fork(decide, batch) for batch in batches]
+
+		turns = []
+
+		for batch, (pid, read_fd) in zip(batches, workers):
+
+			# Read the whole pipe before waiting, or a worker with a lot to say never finishes
+			with os.fdopen(read_fd, 'rb') as pipe:
+
+				data = pipe.read()
+
+			status = os.waitpid(pid, 0)[1]
+
+			if status != 0:
+
+				self.failures += 1
+				self.errors.append(data or "An AI worker exited with status %d\n" % status)
+				turns.extend(decide(batch))
+				continue
+
+			for mob, turn in zip(batch, cPickle.loads(data)):
+
+				# Actions are sent by ID
+				if turn is not None:
+
+					turn = [mob.actions[turn[0]]] + turn[1:]
+
+				turns.append(turn)
+
+		return turns
@@ -0,0 +1,919 @@
+# Andrew Bogdan
+# Feasible Game 3
+# pathfinding.py
+"""
+	Pathfinding, which finds the shortest walk between two tiles of a layer for a mob of some
+	permeability, in steps in any of the eight directions.
+
+	The map is split into square clusters. Where two clusters meet, each open stretch of their
+	border has an entrance, a pair of tiles facing each other across it, and the entrances of
+	a cluster are joined by the walks between them inside it. Clusters are grouped into square
+	superclusters, whose exits are the entrances facing another supercluster; how far each
+	entrance of a supercluster is from each of its exits, and which entrance is next on the
+	way, is worked out once for the whole supercluster.
+
+	Short paths are searched on the tiles themselves, and paths inside a supercluster between
+	its entrances. Longer ones are searched between exits, guided by how far every exit worked
+	out so far is from the goal's supercluster, then put together from the walks the entrances
+	and exits were joined by. Everything is worked out the first time it's needed and kept
+	until the terrain under it changes. Until the superclusters around a path are worked out,
+	how far exits are from the goal's supercluster is only known the long way round, so paths
+	found then can be a little longer.
+
+	Working out a cluster would load its chunk, so clusters whose chunks aren't loaded count
+	as walls until they are; what's been worked out is kept when a chunk is let go of, since
+	its terrain can't change while it isn't loaded. Paths are kept until there are
+	PATH_CACHE_SIZE of them. A path that's been found before comes back in microseconds, but
+	a new one across a big map with a lot of walls in the way still takes milliseconds.
+
+	Mobs aren't counted as in the way, since they move every turn.
+"""
+
+# Imports
+import heapq
+
+from collections import deque
+
+# Constants
+CLUSTER_SIZE = 16
+
+# How many clusters wide and high a supercluster is
+SUPERCLUSTER_SIZE = 8
+
+# The most paths kept before they're forgotten
+PATH_CACHE_SIZE = 4096
+
+# The steps a mob can take, in the order ties between them are broken
+STEPS = ((0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1))
+
+# What a walk tree has for its own start and for the tiles it doesn't reach, instead of a step
+TREE_ROOT = 8
+TREE_UNREACHED = 255
+
+# Classes
+class Pathfinder(object):
+	"""
+	Finds paths through layer z of a Map for a mob of a permeability
+
+	Pathfinder.__init__(self, map_, z, permeability, cluster_size=CLUSTER_SIZE, supercluster_size=SUPERCLUSTER_SIZE)
+	Pathfinder._border(self, key, other_key)
+	Pathfinder._cluster(self, key)
+	Pathfinder._cluster_bounds(self, key)
+	Pathfinder._cluster_nodes(self, key)
+	Pathfinder._cluster_walks(self, key)
+	Pathfinder._find_abstract(self, start, goal)
+	Pathfinder._find_local(self, start, goal, bounds)
+	Pathfinder._find_super(self, start, goal)
+	Pathfinder._forget(self, key)
+	Pathfinder._join(self, tile, key, supercluster)
+	Pathfinder._row(self, super_key)
+	Pathfinder._super_key(self, tile)
+	Pathfinder._supercluster(self, super_key)
+	Pathfinder._tree(self, start, key)
+	Pathfinder._walk_back(self, tree, key, tile)
+	Pathfinder._walk_from(self, start, key, goals, tree=None)
+	Pathfinder._walk_to_exit(self, node, supercluster, exit)
+	Pathfinder._walkable(self, x, y)
+	Pathfinder.changed(self, x, y)
+	Pathfinder.find_path(self, start, goal)
+	Pathfinder.loaded(self, bounds)
+
+	Pathfinder._borders
+	Pathfinder._map
+	Pathfinder._paths
+	Pathfinder._rows
+	Pathfinder._superclusters
+	Pathfinder._trees
+	Pathfinder._unloaded
+	Pathfinder._walks
+	Pathfinder._walkability
+	Pathfinder.cluster_size
+	Pathfinder.permeability
+	Pathfinder.searches
+	Pathfinder.supercluster_size
+	Pathfinder.z
+	"""
+
+	def __init__(self, map_, z, permeability, cluster_size=CLUSTER_SIZE, supercluster_size=SUPERCLUSTER_SIZE):
+		"""Initialize the Pathfinder without working anything out yet."""
+
+		self._map = map_
+		self.cluster_size = cluster_size
+		self.permeability = permeability
+		self.supercluster_size = supercluster_size
+		self.z = z
+
+		# How many paths had to be searched for instead of coming from the cache
+		self.searches = 0
+
+		# The bounds and walkability of each cluster, a bytearray by x then y
+		self._walkability = {}
+
+		# The entrances on the border of each pair of clusters, keyed by both orders
+		self._borders = {}
+
+		# The walks between the entrances of each cluster, and the walk tree from each entrance
+		self._walks = {}
+		self._trees = {}
+
+		# The exits of each supercluster, how to get to them and the edges between them
+		self._superclusters = {}
+
+		# How far each exit worked out so far is from the exits of a supercluster, by supercluster
+		self._rows = {}
+
+		# The paths found so far, by (start, goal)
+		self._paths = {}
+
+		# The clusters which counted as walls because their chunks weren't loaded
+		self._unloaded = set()
+
+	def _border(self, key, other_key):
+		"""Get the entrances between two clusters next to each other, as (tile in key, tile in other_key)."""
+
+		try:
+
+			return self._borders[(key, other_key)]
+
+		except KeyError:
+
+			pass
+
+		bounds = self._cluster_bounds(key)
+		other_bounds = self._cluster_bounds(other_key)
+
+		# The pairs of tiles facing each other across the border
+		if other_key[0] != key[0]:
+
+			x_val = bounds[2] - 1 if other_key[0] > key[0] else bounds[0]
+			other_x = other_bounds[0] if other_key[0] > key[0] else other_bounds[2] - 1
+			pairs = [((x_val, y_val), (other_x, y_val)) for y_val in range(bounds[1], bounds[3])]
+
+		else:
+
+			y_val = bounds[3] - 1 if other_key[1] > key[1] else bounds[1]
+			other_y = other_bounds[1] if other_key[1] > key[1] else other_bounds[3] - 1
+			pairs = [((x_val, y_val), (x_val, other_y)) for x_val in range(bounds[0], bounds[2])]
+
+		# One entrance in the middle of each open stretch
+		entrances = []
+		stretch = []
+
+		for pair in pairs + [None]:
+
+			if pair is not None and self._walkable(*pair[0]) and self._walkable(*pair[1]):
+
+				stretch.append(pair)
+
+			elif stretch:
+
+				entrances.append(stretch[len(stretch) // 2])
+				stretch = []
+
+		self._borders[(key, other_key)] = entrances
+		self._borders[(other_key, key)] = [(pair[1], pair[0]) for pair in entrances]
+
+		return entrances
+
+	def _cluster(self, key):
+		"""Get the bounds of a cluster and its walkability, working it out if it's needed."""
+
+		try:
+
+			return self._walkability[key]
+
+		except KeyError:
+
+			pass
+
+		bounds = self._cluster_bounds(key)
+
+		if not self._map.is_loaded(bounds):
+
+			# Not kept, so it's worked out once the chunk is loaded
+			self._unloaded.add(key)
+
+			return bounds, bytearray((bounds[2] - bounds[0]) * (bounds[3] - bounds[1]))
+
+		self._walkability[key] = (bounds, self._map.walkable(bounds, self.z, self.permeability, flat=True))
+
+		return self._walkability[key]
+
+	def _cluster_bounds(self, key):
+		"""Get the (x, y) of the first tile of a cluster and the (x, y) just past its last."""
+
+		return (key[0] * self.cluster_size,
+				key[1] * self.cluster_size,
+				min((key[0] + 1) * self.cluster_size, self._map._size[0]),
+				min((key[1] + 1) * self.cluster_size, self._map._size[1]))
+
+	def _cluster_nodes(self, key):
+		"""Get every entrance tile in a cluster, each with the tiles across the border from it."""
+
+		nodes = {}
+
+		for step in ((0, -1), (1, 0), (0, 1), (-1, 0)):
+
+			other_key = (key[0] + step[0], key[1] + step[1])
+
+			if 0 <= other_key[0] and 0 <= other_key[1] and other_key[0] * self.cluster_size < self._map._size[0] and other_key[1] * self.cluster_size < self._map._size[1]:
+				for pair in self._border(key, other_key):
+
+					nodes.setdefault(pair[0], []).append(pair[1])
+
+		return nodes
+
+	def _cluster_walks(self, key):
+		"""Get the walks inside a cluster from each of its entrance tiles to the others."""
+
+		try:
+
+			return self._walks[key]
+
+		except KeyError:
+
+			pass
+
+		nodes = self._cluster_nodes(key)
+		walks = {}
+		trees = {}
+
+		for node in nodes:
+
+			trees[node] = self._tree(node, key)
+
+			# The step across the border to the next cluster
+			walks[node] = [(other, 1, [other]) for other in nodes[node]]
+
+			paths = self._walk_from(node, key, [other for other in nodes if other != node], trees[node])
+
+			for other in paths:
+
+				walks[node].append((other, len(paths[other]), paths[other]))
+
+		self._walks[key] = walks
+		self._trees[key] = trees
+
+		return walks
+
+	def _find_abstract(self, start, goal):
+		"""Find a path by searching between entrances first, or None if there isn't one."""
+
+		start_key = (start[0] // self.cluster_size, start[1] // self.cluster_size)
+		goal_key = (goal[0] // self.cluster_size, goal[1] // self.cluster_size)
+
+		# The start and goal are joined to the entrances of their clusters
+		start_nodes = self._cluster_nodes(start_key)
+		start_paths = self._walk_from(start, start_key, [node for node in start_nodes if node != start] + [goal])
+		goal_paths = self._walk_from(goal, goal_key, self._cluster_nodes(goal_key))
+
+		goal_x, goal_y = goal
+		walks = self._walks
+		came_from = {start: None}
+		costs = {start: 0}
+		order = 0
+
+		# Ties go to the node furthest along, then to the first one found
+		open_heap = [(max(abs(start[0] - goal_x), abs(start[1] - goal_y)), 0, order, start)]
+
+		while open_heap:
+
+			cost, node = -open_heap[0][1], heapq.heappop(open_heap)[3]
+
+			if node == goal:
+
+				break
+
+			if cost > costs[node]:
+
+				# A shorter way here was already taken
+				continue
+
+			if node == start:
+
+				edges = [(other, len(start_paths[other]), start_paths[other]) for other in start_nodes if other in start_paths and other != start]
+
+				if start in start_nodes:
+
+					edges.extend(self._cluster_walks(start_key)[start])
+
+				if goal in start_paths:
+
+					edges.append((goal, len(start_paths[goal]), start_paths[goal]))
+
+			else:
+
+				key = (node[0] // self.cluster_size, node[1] // self.cluster_size)
+				edges = (walks[key] if key in walks else self._cluster_walks(key))[node]
+
+				# Walks back from the goal are walks to it, backwards
+				if node in goal_paths and key == goal_key:
+
+					edges = edges + [(goal, len(goal_paths[node]), (goal_paths[node][-2::-1] + [goal]))]
+
+			for other, cost, path in edges:
+
+				new_cost = costs[node] + cost
+
+				if other not in costs or new_cost < costs[other]:
+
+					costs[other] = new_cost
+					came_from[other] = (node, path)
+					order += 1
+
+					# The heuristic is written out, since it's worked out for every edge
+					heapq.heappush(open_heap, (new_cost + max(abs(other[0] - goal_x), abs(other[1] - goal_y)), -new_cost, order, other))
+
+		if goal not in came_from:
+
+			return None
+
+		# Put the walks between the entrances together
+		walks = []
+		node = goal
+
+		while came_from[node] is not None:
+
+			walks.append(came_from[node][1])
+			node = came_from[node][0]
+
+		path = []
+
+		for walk in reversed(walks):
+
+			path.extend(walk)
+
+		return path
+
+	def _find_local(self, start, goal, bounds):
+		"""Find a path with A* on the tiles inside bounds, or None if there isn't one."""
+
+		def heuristic(tile):
+
+			return max(abs(tile[0] - goal[0]), abs(tile[1] - goal[1]))
+
+		came_from = {start: None}
+		costs = {start: 0}
+		order = 0
+		open_heap = [(heuristic(start), 0, order, start)]
+
+		while open_heap:
+
+			cost, tile = -open_heap[0][1], heapq.heappop(open_heap)[3]
+
+			if tile == goal:
+
+				path = []
+
+				while tile != start:
+
+					path.append(tile)
+					tile = came_from[tile]
+
+				path.reverse()
+
+				return path
+
+			if cost > costs[tile]:
+
+				continue
+
+			new_cost = cost + 1
+
+			for step in STEPS:
+
+				other = (tile[0] + step[0], tile[1] + step[1])
+
+				if bounds[0] <= other[0] < bounds[2] and bounds[1] <= other[1] < bounds[3] and (other not in costs or new_cost < costs[other]) and self._walkable(*other):
+
+					costs[other] = new_cost
+					came_from[other] = tile
+					order += 1
+					heapq.heappush(open_heap, (new_cost + heuristic(other), -new_cost, order, other))
+
+		return None
+
+	def _find_super(self, start, goal):
+		"""Find a path from one supercluster to another by searching between exits, or None if there isn't one."""
+
+		start_key = (start[0] // self.cluster_size, start[1] // self.cluster_size)
+		goal_key = (goal[0] // self.cluster_size, goal[1] // self.cluster_size)
+		start_super = self._supercluster(self._super_key(start))
+		goal_super = self._supercluster(self._super_key(goal))
+
+		# The start and goal are joined to the exits of their superclusters
+		start_joins = self._join(start, start_key, start_super)
+		goal_joins = self._join(goal, goal_key, goal_super)
+
+		if not start_joins or not goal_joins:
+
+			return None
+
+		goal_x, goal_y = goal
+		row = self._row(self._super_key(goal))
+		size = self.cluster_size * self.supercluster_size
+		superclusters = self._superclusters
+
+		# Getting to the goal from any exit of its supercluster takes at least this long
+		least = min([join[0] for join in goal_joins.values()])
+
+		came_from = {}
+		costs = {}
+		order = 0
+		open_heap = []
+
+		for exit in start_joins:
+
+			cost = start_joins[exit][0]
+			costs[exit] = cost
+			came_from[exit] = None
+			order += 1
+			open_heap.append((cost + max(abs(exit[0] - goal_x), abs(exit[1] - goal_y), row.get(exit, 0) + least), -cost, order, exit))
+
+		heapq.heapify(open_heap)
+
+		while open_heap:
+
+			cost, node = -open_heap[0][1], heapq.heappop(open_heap)[3]
+
+			if node == goal:
+
+				break
+
+			if cost > costs[node]:
+
+				# A shorter way here was already taken
+				continue
+
+			if node in goal_joins and (goal not in costs or cost + goal_joins[node][0] < costs[goal]):
+
+				costs[goal] = cost + goal_joins[node][0]
+				came_from[goal] = node
+				order += 1
+				heapq.heappush(open_heap, (costs[goal], -costs[goal], order, goal))
+
+			super_key = (node[0] // size, node[1] // size)
+
+			for other, edge_cost in (superclusters[super_key] if super_key in superclusters else self._supercluster(super_key))[2][node]:
+
+				new_cost = cost + edge_cost
+
+				if other not in costs or new_cost < costs[other]:
+
+					costs[other] = new_cost
+					came_from[other] = node
+					order += 1
+
+					# How far it is from the goal's supercluster usually says more than how far it is from the goal
+					heapq.heappush(open_heap, (new_cost + max(abs(other[0] - goal_x), abs(other[1] - goal_y), row.get(other, 0) + least), -new_cost, order, other))
+
+		if goal not in came_from:
+
+			return None
+
+		exits = []
+		node = came_from[goal]
+
+		# A goal which is an exit itself might have been stepped onto from the next supercluster
+		if node not in goal_joins:
+
+			node = goal
+
+		while node is not None:
+
+			exits.append(node)
+			node = came_from[node]
+
+		exits.reverse()
+
+		# From the start to its first exit through the entrance it was joined by
+		path = start_joins[exits[0]][2] + self._walk_to_exit(start_joins[exits[0]][1], start_super, exits[0])
+
+		for node, other in zip(exits, exits[1:]):
+
+			super_key = (node[0] // size, node[1] // size)
+
+			if (other[0] // size, other[1] // size) != super_key:
+
+				# The step across the border to the next supercluster
+				path.append(other)
+
+			else:
+
+				path.extend(self._walk_to_exit(node, superclusters[super_key], other))
+
+		# Walks from the goal's entrance to its last exit and from the goal to that entrance, backwards
+		entrance, walk = goal_joins[exits[-1]][1:]
+		back = self._walk_to_exit(entrance, goal_super, exits[-1])
+
+		if back:
+
+			path.extend(back[-2::-1] + [entrance])
+
+		if walk:
+
+			path.extend(walk[-2::-1] + [goal])
+
+		return path
+
+	def _forget(self, key):
+		"""
+		Forget a cluster's entrances and walks, the walks of the clusters across its borders, the
+		superclusters of all of them, how far exits are from each other, and every path.
+		"""
+
+		for step in ((0, 0), (0, -1), (1, 0), (0, 1), (-1, 0)):
+
+			other_key = (key[0] + step[0], key[1] + step[1])
+
+			self._borders.pop((key, other_key), None)
+			self._borders.pop((other_key, key), None)
+			self._walks.pop(other_key, None)
+			self._trees.pop(other_key, None)
+			self._superclusters.pop((other_key[0] // self.supercluster_size, other_key[1] // self.supercluster_size), None)
+
+		self._rows.clear()
+		self._paths.clear()
+
+	def _join(self, tile, key, supercluster):
+		"""
+		Get the shortest way from tile through an entrance of its cluster, key, to each exit of
+		its supercluster it can reach, as (cost, entrance, walk from tile to the entrance) by exit.
+		"""
+
+		indices, table = supercluster[:2]
+
+		if key not in self._trees:
+
+			self._cluster_walks(key)
+
+		trees = self._trees[key]
+		joins = {}
+
+		for entrance in trees:
+
+			# The walk back to the start of the entrance's tree is the walk there
+			walk = self._walk_back(trees[entrance], key, tile)
+
+			if walk is None or entrance not in table:
+
+				continue
+
+			costs = table[entrance][0]
+
+			for exit, index in indices.iteritems():
+				if costs[index] is not None and (exit not in joins or len(walk) + costs[index] < joins[exit][0]):
+
+					joins[exit] = (len(walk) + costs[index], entrance, walk)
+
+		return joins
+
+	def _row(self, super_key):
+		"""
+		Get how far each exit is from the nearest exit of a supercluster, by exit, through the
+		superclusters worked out so far. It's kept until another one is worked out.
+		"""
+
+		try:
+
+			return self._rows[super_key]
+
+		except KeyError:
+
+			pass
+
+		costs = dict.fromkeys(self._supercluster(super_key)[0], 0)
+		open_heap = [(0, exit) for exit in costs]
+		size = self.cluster_size * self.supercluster_size
+
+		heapq.heapify(open_heap)
+
+		while open_heap:
+
+			cost, node = heapq.heappop(open_heap)
+
+			if cost > costs[node]:
+
+				continue
+
+			other_super = (node[0] // size, node[1] // size)
+
+			if other_super not in self._superclusters:
+
+				# Where its edges go isn't worked out yet
+				continue
+
+			for other, edge_cost in self._superclusters[other_super][2][node]:
+
+				new_cost = cost + edge_cost
+
+				if other not in costs or new_cost < costs[other]:
+
+					costs[other] = new_cost
+					heapq.heappush(open_heap, (new_cost, other))
+
+		self._rows[super_key] = costs
+
+		return costs
+
+	def _super_key(self, tile):
+		"""Get the key of the supercluster tile is in."""
+
+		size = self.cluster_size * self.supercluster_size
+
+		return (tile[0] // size, tile[1] // size)
+
+	def _supercluster(self, super_key):
+		"""
+		Get the exits of a supercluster, each with its index; how far each of its entrances is
+		from each exit and the entrance after it on the way there, by entrance, each as a list by
+		exit index; and the edges from each exit to the other exits and across to the next
+		supercluster. They're worked out if they're needed.
+		"""
+
+		try:
+
+			return self._superclusters[super_key]
+
+		except KeyError:
+
+			pass
+
+		size = self.cluster_size * self.supercluster_size
+		x_keys = range(super_key[0] * self.supercluster_size, min((super_key[0] + 1) * self.supercluster_size, -(-self._map._size[0] // self.cluster_size)))
+		y_keys = range(super_key[1] * self.supercluster_size, min((super_key[1] + 1) * self.supercluster_size, -(-self._map._size[1] // self.cluster_size)))
+
+		# The entrances on the clusters around the edge which face another supercluster
+		across = {}
+
+		for x_key in x_keys:
+			for y_key in y_keys:
+				if x_key in (x_keys[0], x_keys[-1]) or y_key in (y_keys[0], y_keys[-1]):
+					for node, others in self._cluster_nodes((x_key, y_key)).iteritems():
+						for other in others:
+							if (other[0] // size, other[1] // size) != super_key:
+
+								across.setdefault(node, []).append(other)
+
+		indices = dict([(exit, index) for index, exit in enumerate(sorted(across))])
+		table = {}
+
+		# Dijkstra's from each exit to every entrance it can reach without leaving the supercluster
+		for exit, index in indices.iteritems():
+
+			costs = {exit: 0}
+			toward = {exit: None}
+			open_heap = [(0, exit)]
+
+			while open_heap:
+
+				cost, node = heapq.heappop(open_heap)
+
+				if cost > costs[node]:
+
+					continue
+
+				key = (node[0] // self.cluster_size, node[1] // self.cluster_size)
+
+				for other, walk_cost, path in (self._walks[key] if key in self._walks else self._cluster_walks(key))[node]:
+
+					new_cost = cost + walk_cost
+
+					if other[0] // size == super_key[0] and other[1] // size == super_key[1] and (other not in costs or new_cost < costs[other]):
+
+						costs[other] = new_cost
+						toward[other] = node
+						heapq.heappush(open_heap, (new_cost, other))
+
+			for node in costs:
+
+				if node not in table:
+
+					table[node] = ([None] * len(indices), [None] * len(indices))
+
+				table[node][0][index] = costs[node]
+				table[node][1][index] = toward[node]
+
+		edges = {}
+
+		for exit, index in indices.iteritems():
+
+			edges[exit] = [(other, 1) for other in across[exit]]
+			costs = table[exit][0]
+
+			for other, other_index in indices.iteritems():
+				if other != exit and costs[other_index] is not None:
+
+					edges[exit].append((other, costs[other_index]))
+
+		self._superclusters[super_key] = (indices, table, edges)
+
+		# How far exits are from each other might be shorter through it
+		self._rows.clear()
+
+		return self._superclusters[super_key]
+
+	def _tree(self, start, key):
+		"""
+		Get the shortest walks inside a cluster from start to every tile it can reach, as a
+		bytearray by the cluster's indices of the index in STEPS of the step each tile was
+		reached by, TREE_ROOT for start and TREE_UNREACHED for the rest.
+		"""
+
+		bounds, walkability = self._cluster(key)
+		width = bounds[2] - bounds[0]
+		height = bounds[3] - bounds[1]
+
+		tree = bytearray(chr(TREE_UNREACHED) * (width * height))
+		start_index = (start[0] - bounds[0]) * height + start[1] - bounds[1]
+		tree[start_index] = TREE_ROOT
+
+		# A breadth-first search on the cluster's own indices
+		frontier = deque([start_index])
+
+		while frontier:
+
+			index = frontier.popleft()
+			x_val, y_val = divmod(index, height)
+
+			for step_index, step in enumerate(STEPS):
+
+				other_x = x_val + step[0]
+				other_y = y_val + step[1]
+				other = other_x * height + other_y
+
+				if 0 <= other_x < width and 0 <= other_y < height and tree[other] == TREE_UNREACHED and walkability[other]:
+
+					tree[other] = step_index
+					frontier.append(other)
+
+		return tree
+
+	def _walk_back(self, tree, key, tile):
+		"""
+		Get the tiles of the walk from tile back to the start of a walk tree of a cluster, not
+		counting tile, or None if the tree doesn't reach it.
+		"""
+
+		bounds = self._cluster_bounds(key)
+
+		if not (bounds[0] <= tile[0] < bounds[2] and bounds[1] <= tile[1] < bounds[3]):
+
+			return None
+
+		height = bounds[3] - bounds[1]
+		x_val, y_val = tile
+		step_index = tree[(x_val - bounds[0]) * height + y_val - bounds[1]]
+
+		if step_index == TREE_UNREACHED:
+
+			return None
+
+		walk = []
+
+		while step_index != TREE_ROOT:
+
+			x_val -= STEPS[step_index][0]
+			y_val -= STEPS[step_index][1]
+			walk.append((x_val, y_val))
+			step_index = tree[(x_val - bounds[0]) * height + y_val - bounds[1]]
+
+		return walk
+
+	def _walk_from(self, start, key, goals, tree=None):
+		"""
+		Get the shortest walk inside a cluster from start to each of goals it can reach, by goal,
+		using start's walk tree if it's already been made.
+		"""
+
+		if tree is None:
+
+			tree = self._tree(start, key)
+
+		paths = {}
+
+		for goal in goals:
+
+			walk = self._walk_back(tree, key, goal)
+
+			if walk is not None:
+
+				# The walk back ends at start, which isn't part of the path
+				paths[goal] = walk[-2::-1] + [goal] if walk else []
+
+		return paths
+
+	def _walk_to_exit(self, node, supercluster, exit):
+		"""Get the tiles of the walk from an entrance of a supercluster to one of its exits, not counting the entrance."""
+
+		index = supercluster[0][exit]
+		table = supercluster[1]
+		path = []
+
+		while node != exit:
+
+			after = table[node][1][index]
+			key = (node[0] // self.cluster_size, node[1] // self.cluster_size)
+
+			for other, cost, walk in self._cluster_walks(key)[node]:
+				if other == after:
+
+					path.extend(walk)
+					break
+
+			node = after
+
+		return path
+
+	def _walkable(self, x, y):
+		"""Return whether x, y can be walked through."""
+
+		bounds, walkability = self._cluster((x // self.cluster_size, y // self.cluster_size))
+
+		return walkability[(x - bounds[0]) * (bounds[3] - bounds[1]) + y - bounds[1]]
+
+	def changed(self, x, y):
+		"""Work out x, y again, forgetting everything it changes if it's changed."""
+
+		key = (x // self.cluster_size, y // self.cluster_size)
+
+		if key not in self._walkability:
+
+			# Nothing has been worked out there yet
+			return
+
+		bounds, walkability = self._walkability[key]
+		index = (x - bounds[0]) * (bounds[3] - bounds[1]) + y - bounds[1]
+		walkable = self._map.is_walkable(x, y, self.z, self.permeability)
+
+		if walkability[index] == walkable:
+
+			return
+
+		walkability[index] = walkable
+		self._forget(key)
+
+	def find_path(self, start, goal):
+		"""
+		Get the tiles of a shortest path from start, an (x, y), to goal, not counting start,
+		or None if there isn't one. Long paths might be a little longer than the shortest.
+		"""
+
+		start = (start[0], start[1])
+		goal = (goal[0], goal[1])
+
+		try:
+
+			return self._paths[(start, goal)]
+
+		except KeyError:
+
+			pass
+
+		self.searches += 1
+
+		path = None
+
+		if 0 <= goal[0] < self._map._size[0] and 0 <= goal[1] < self._map._size[1] and self._walkable(*goal):
+
+			if max(abs(start[0] - goal[0]), abs(start[1] - goal[1])) <= self.cluster_size * 2:
+
+				# Short paths are searched for near the start and goal
+				bounds = (	max(min(start[0], goal[0]) - self.cluster_size, 0),
+							max(min(start[1], goal[1]) - self.cluster_size, 0),
+							min(max(start[0], goal[0]) + self.cluster_size + 1, self._map._size[0]),
+							min(max(start[1], goal[1]) + self.cluster_size + 1, self._map._size[1]))
+
+				path = self._find_local(start, goal, bounds)
+
+			# The rest are searched between entrances inside a supercluster, or between exits
+			if path is None and self._super_key(start) == self._super_key(goal):
+
+				path = self._find_abstract(start, goal)
+
+			elif path is None:
+
+				path = self._find_super(start, goal)
+
+		if path is not None:
+
+			path = tuple(path)
+
+		if len(self._paths) >= PATH_CACHE_SIZE:
+
+			self._paths.clear()
+
+		self._paths[(start, goal)] = path
+
+		return path
+
+	def loaded(self, bounds):
+		"""Work out the clusters in bounds, a chunk which was just loaded, again if they counted as walls."""
+
+		for x_key in range(bounds[0] // self.cluster_size, -(-bounds[2] // self.cluster_size)):
+			for y_key in range(bounds[1] // self.cluster_size, -(-bounds[3] // self.cluster_size)):
+
+				if (x_key, y_key) in self._unloaded:
+
+					self._unloaded.discard((x_key, y_key))
+					self._forget((x_key, y_key))
@@ -68,9 +68,16 @@ class ConsoleRenderer(Renderer):
 
 			ch = self._character_key[entity_to_render.id][0]
 
+			# Highlight the mobs that the game is still waiting on
+			attr = curses.A_NORMAL
+
+			if entity_to_render in game_map.pending_mobs:
+
+			    attr = curses.A_STANDOUT
+
 			try:
 
-			    map_pad.addch(y_val, x_val, ch)
+			    map_pad.addch(y_val, x_val, ch, attr)
 
 			except curses.error:
 
@@ -0,0 +1,419 @@
+# Andrew Bogdan
+# Feasible Game 3
+# snapshot.py
+"""
+	Binary snapshots, a compact save format for a State which holds the same thing as its
+	JSON save but is much faster to write and read.
+
+	A snapshot is MAGIC, then a table of every string in it, then a table of every "_type" in
+	it, then its body. The body is the State without its map's tiles, the map's shape and
+	templates, the (permeability, prototype id) of each terrain code, the codes of each chunk
+	as packed unsigned shorts, and the tiles which aren't packed. The State and the map are
+	saved values, tagged with one of the VALUE_ constants; strings and types are written as
+	their index in their table.
+
+	The tiles which aren't packed hold the mobs, which are most of what there is to read, so
+	each chunk's are marshalled together as a list of [x, y, saved tile]; reading values one
+	at a time in Python would make loading a snapshot slower than loading JSON.
+
+	Run "python snapshot.py <source> <target>" to convert a save between the formats.
+"""
+
+# Imports
+import marshal
+import struct
+import sys
+
+from decoder import Decoder
+from state import *
+from terrain import TerrainArray
+
+# Constants
+MAGIC = "FG3SNAP\x02"
+
+VALUE_DICT = 'd'
+VALUE_FALSE = 'f'
+VALUE_FLOAT = 'r'
+VALUE_INT = 'i'
+VALUE_LIST = 'l'
+VALUE_NONE = 'n'
+VALUE_STR = 's'
+VALUE_TRUE = 't'
+VALUE_TYPED = 'o'
+
+_DOUBLE = struct.Struct("<d")
+_INT = struct.Struct("<i")
+_LONG = struct.Struct("<q")
+_UINT = struct.Struct("<I")
+
+# Classes
+class SnapshotReader(object):
+	"""
+	Reads the tables and values of a snapshot
+
+	SnapshotReader.__init__(self, data)
+	SnapshotReader.read_bytes(self, length)
+	SnapshotReader.read_int(self)
+	SnapshotReader.read_uint(self)
+	SnapshotReader.read_value(self)
+
+	SnapshotReader._data
+	SnapshotReader._offset
+	SnapshotReader.strings
+	SnapshotReader.types
+	"""
+
+	def __init__(self, data):
+		"""Initialize the SnapshotReader, reading the string and type tables."""
+
+		if data[:len(MAGIC)] != MAGIC:
+
+			raise ValueError("not a snapshot")
+
+		self._data = data
+		self._offset = len(MAGIC)
+
+		self.strings = [self.read_bytes(self.read_uint()) for _ in range(self.read_uint())]
+		self.types = [self.strings[self.read_uint()] for _ in range(self.read_uint())]
+
+	def read_bytes(self, length):
+		"""Read length raw bytes."""
+
+		self._offset += length
+
+		return self._data[self._offset - length:self._offset]
+
+	def read_int(self):
+		"""Read a signed int."""
+
+		self._offset += _INT.size
+
+		return _INT.unpack_from(self._data, self._offset - _INT.size)[0]
+
+	def read_uint(self):
+		"""Read an unsigned int."""
+
+		self._offset += _UINT.size
+
+		return _UINT.unpack_from(self._data, self._offset - _UINT.size)[0]
+
+	def read_value(self):
+		"""Read a saved value."""
+
+		tag = self._data[self._offset]
+		self._offset += 1
+
+		if tag == VALUE_STR:
+
+			return self.strings[self.read_uint()]
+
+		elif tag == VALUE_INT:
+
+			self._offset += _LONG.size
+
+			return _LONG.unpack_from(self._data, self._offset - _LONG.size)[0]
+
+		elif tag == VALUE_DICT or tag == VALUE_TYPED:
+
+			value = {}
+
+			if tag == VALUE_TYPED:
+
+				value["_type"] = self.types[self.read_uint()]
+
+			for _ in range(self.read_uint()):
+
+				key = self.strings[self.read_uint()]
+				value[key] = self.read_value()
+
+			return value
+
+		elif tag == VALUE_LIST:
+
+			return [self.read_value() for _ in range(self.read_uint())]
+
+		elif tag == VALUE_NONE:
+
+			return None
+
+		elif tag == VALUE_TRUE:
+
+			return True
+
+		elif tag == VALUE_FALSE:
+
+			return False
+
+		elif tag == VALUE_FLOAT:
+
+			self._offset += _DOUBLE.size
+
+			return _DOUBLE.unpack_from(self._data, self._offset - _DOUBLE.size)[0]
+
+		raise ValueError("unknown value tag " + repr(tag))
+
+class SnapshotWriter(object):
+	"""
+	Writes the values of a snapshot, building its string and type tables as it goes
+
+	SnapshotWriter.__init__(self)
+	SnapshotWriter.getvalue(self)
+	SnapshotWriter.intern(self, string)
+	SnapshotWriter.write_bytes(self, data)
+	SnapshotWriter.write_int(self, value)
+	SnapshotWriter.write_uint(self, value)
+	SnapshotWriter.write_value(self, value)
+
+	SnapshotWriter._parts
+	SnapshotWriter._string_ids
+	SnapshotWriter._type_ids
+	SnapshotWriter.strings
+	SnapshotWriter.types
+	"""
+
+	def __init__(self):
+		"""Initialize the SnapshotWriter with empty tables."""
+
+		self._parts = []
+		self._string_ids = {}
+		self._type_ids = {}
+
+		self.strings = []
+		self.types = []
+
+	def getvalue(self):
+		"""Get the whole snapshot, with its tables in front of everything written so far."""
+
+		header = [MAGIC, _UINT.pack(len(self.strings))]
+
+		for string in self.strings:
+
+			header.append(_UINT.pack(len(string)))
+			header.append(string)
+
+		header.append(_UINT.pack(len(self.types)))
+
+		for type_ in self.types:
+
+			header.append(_UINT.pack(self.intern(type_)))
+
+		return "".join(header + self._parts)
+
+	def intern(self, string):
+		"""Get the index of a string in the string table, adding it if it isn't there."""
+
+		try:
+
+			return self._string_ids[string]
+
+		except KeyError:
+
+			self._string_ids[string] = len(self.strings)
+			self.strings.append(string)
+
+			return self._string_ids[string]
+
+	def write_bytes(self, data):
+		"""Write raw bytes; the reader has to know how many there are."""
+
+		self._parts.append(data)
+
+	def write_int(self, value):
+		"""Write a signed int."""
+
+		self._parts.append(_INT.pack(value))
+
+	def write_uint(self, value):
+		"""Write an unsigned int."""
+
+		self._parts.append(_UINT.pack(value))
+
+	def write_value(self, value):
+		"""Write a saved value, the same way JSON would save it."""
+
+		if type(value) == unicode:
+
+			value = value.encode('utf-8')
+
+		if type(value) == str:
+
+			self._parts.append(VALUE_STR + _UINT.pack(self.intern(value)))
+
+		elif value is None:
+
+			self._parts.append(VALUE_NONE)
+
+		elif value is True:
+
+			self._parts.append(VALUE_TRUE)
+
+		elif value is False:
+
+			self._parts.append(VALUE_FALSE)
+
+		elif type(value) in (int, long):
+
+			self._parts.append(VALUE_INT + _LONG.pack(value))
+
+		elif type(value) == float:
+
+			self._parts.append(VALUE_FLOAT + _DOUBLE.pack(value))
+
+		elif type(value) in (list, tuple):
+
+			self._parts.append(VALUE_LIST + _UINT.pack(len(value)))
+
+			for item in value:
+
+				self.write_value(item)
+
+		elif type(value) == dict:
+
+			length = len(value)
+
+			if "_type" in value:
+
+				# The type goes in the type table instead of with the other keys
+				try:
+
+					type_id = self._type_ids[value["_type"]]
+
+				except KeyError:
+
+					type_id = self._type_ids[value["_type"]] = len(self.types)
+					self.types.append(value["_type"])
+					self.intern(value["_type"])
+
+				self._parts.append(VALUE_TYPED + _UINT.pack(type_id) + _UINT.pack(length - 1))
+
+			else:
+
+				self._parts.append(VALUE_DICT + _UINT.pack(length))
+
+			for key in value:
+				if key != "_type":
+
+					self._parts.append(_UINT.pack(self.intern(str(key))))
+					self.write_value(value[key])
+
+		else:
+
+			raise TypeError(repr(value) + " can't be saved")
+
+# Functions
+def convert(source_path, target_path):
+	"""Convert a JSON save into a snapshot, or a snapshot into a JSON save."""
+
+	with open(source_path, 'rb') as source_file:
+
+		data = source_file.read()
+
+	if data[:len(MAGIC)] == MAGIC:
+
+		text = str(loads(data))
+
+	else:
+
+		text = dumps(Decoder().loads(data))
+
+	with open(target_path, 'wb') as target_file:
+
+		target_file.write(text)
+
+def dumps(state):
+	"""Make a snapshot of a State; every chunk of its map gets loaded."""
+
+	map_ = state.map
+	writer = SnapshotWriter()
+
+	writer.write_value({"index_stack": state.saved_index_stack(), "message_log": state.message_log})
+
+	# The shape and templates of the map, and what each terrain code stands for
+	writer.write_value({"chunk_size": map_.chunk_size,
+						"depth": map_.depth,
+						"prototypes": map_.prototypes.to_dict(),
+						"size": list(map_._size)})
+
+	writer.write_uint(len(map_._terrain_entries) - 2)
+
+	for entry in map_._terrain_entries[2:]:
+
+		writer.write_int(entry[0])
+		writer.write_uint(writer.intern(entry[1].prototype_id))
+
+	# The chunks, with the tiles which aren't packed after their codes
+	keys = map_.chunk_keys()
+
+	for key in keys:
+
+		bounds = map_._chunk_bounds(key)
+		map_._chunk(bounds[0], bounds[1])
+
+	chunk_tiles = dict([(key, []) for key in keys])
+
+	for tile_coords in map_._tiles:
+
+		chunk_tiles[(tile_coords[0] // map_.chunk_size, tile_coords[1] // map_.chunk_size)].append(tile_coords)
+
+	writer.write_uint(len(keys))
+
+	for key in keys:
+
+		codes = map_._chunks[key].tostring()
+
+		writer.write_int(key[0])
+		writer.write_int(key[1])
+		writer.write_uint(len(codes))
+		writer.write_bytes(codes)
+
+		saved_tiles = marshal.dumps([[tile_coords[0], tile_coords[1], map_._tiles[tile_coords].to_dict()]
+									for tile_coords in chunk_tiles[key]])
+
+		writer.write_uint(len(saved_tiles))
+		writer.write_bytes(saved_tiles)
+
+	return writer.getvalue()
+
+def loads(data):
+	"""Load a State from a snapshot."""
+
+	reader = SnapshotReader(data)
+
+	saved_state = reader.read_value()
+	saved_map = reader.read_value()
+
+	map_ = Map(	prototypes=saved_map["prototypes"],
+				size=saved_map["size"],
+				depth=saved_map["depth"],
+				chunk_size=saved_map["chunk_size"])
+
+	# Registering the entries in order gives them the same codes they were saved with
+	for _ in range(reader.read_uint()):
+
+		permeability = reader.read_int()
+		map_._terrain_code(permeability, map_.prototypes.templates[reader.strings[reader.read_uint()]])
+
+	for _ in range(reader.read_uint()):
+
+		key = (reader.read_int(), reader.read_int())
+		bounds = map_._chunk_bounds(key)
+
+		terrain = TerrainArray((bounds[2] - bounds[0], bounds[3] - bounds[1]), map_.depth)
+		terrain.fromstring(reader.read_bytes(reader.read_uint()))
+
+		saved_tiles = {}
+
+		for x_val, y_val, saved_tile in marshal.loads(reader.read_bytes(reader.read_uint())):
+
+			saved_tiles[(x_val, y_val)] = saved_tile
+
+		map_.load_terrain(key, terrain, saved_tiles)
+
+	# Like a Map loaded from a grid, the game gives every mob its first turn itself
+	map_.fresh_mobs.clear()
+
+	return State(map_, saved_state["index_stack"], saved_state["message_log"])
+
+if __name__ == "__main__":
+
+	convert(*sys.argv[1:3])
@@ -7,12 +7,29 @@
 
 # Imports
 import copy
+import heapq
 import json
 
+from collections import OrderedDict
+
 import coag_funcs
 from constants import *
+from flow import FlowField
+from fov import shadowcast
+from pathfinding import Pathfinder
+from terrain import CODE_EMPTY, CODE_MAX, TerrainArray, numpy
 
 # Constants
+_CONDITIONS = {}
+
+# Shared stand-ins for empty containers and the default method, so small objects don't each allocate them
+_DEFAULT_METHOD = (coag_funcs.co_pass_,)
+_EMPTY = ()
+_NO_IDS = {}
+_SAVE_COUNTS = {"reused": 0, "serialized": 0}
+
+CHUNK_SIZE = 64
+
 DIR_NORTH = 0
 DIR_NORTHEAST = 1
 DIR_EAST = 2
@@ -41,6 +58,9 @@ VIEW_PAUSE = 2
 VIEW_PROMPT_NULL = 10
 VIEW_PROMPT_DIR = 11
 
+# How many fields of view Map.visible keeps before starting over
+VISIBLE_CACHE_SIZE = 4096
+
 # Classes
 class State(object):
 	"""
@@ -49,6 +69,8 @@ class State(object):
 	State.__init__(self, map_, index_stack, message_log=[])
 	State.__repr__(self)
 	State.__str__(self)
+	State.load_index_stack(self, index_stack)
+	State.saved_index_stack(self)
 	State.to_dict(self)
 
 	State.index_stack
@@ -66,6 +88,26 @@ class State(object):
 		self.message_log = message_log
 
 		# Construct index
+		self.load_index_stack(index_stack)
+
+		self.pause_coag = Coagulate(name="Paused",
+									tree=[	Coagulate(name="Quit", method=[coag_funcs.co_quit]),
+											Coagulate(name="Resume", method=[coag_funcs.co_resume])],
+									is_root=True)
+
+	def __repr__(self):
+		"""Return a syntactically correct string representation of the State based off of to_dict."""
+
+		return repr(self.to_dict())
+
+	def __str__(self):
+		"""Return a string representation of the State based off of to_dict."""
+
+		return json.dumps(self.to_dict(), indent=4, separators=(",", ": "), sort_keys=True)
+
+	def load_index_stack(self, index_stack):
+		"""Replace the index stack with a saved one, like the one from State.saved_index_stack."""
+
 		self.index_stack = index_stack
 
 		for index in self.index_stack:
@@ -83,38 +125,32 @@ class State(object):
 
 				index[1] = mob
 
-		self.pause_coag = Coagulate(name="Paused",
-									tree=[	Coagulate(name="Quit", method=[coag_funcs.co_quit]),
-											Coagulate(name="Resume", method=[coag_funcs.co_resume])],
-									is_root=True)
+	def saved_index_stack(self):
+		"""
+		Create a JSON-serializable copy of the index stack, referring to mobs by where they are.
 
-	def __repr__(self):
-		"""Return a syntactically correct string representation of the State based off of to_dict."""
+		Prompts hold functions, so they're left out; a loaded game is back where they started.
+		"""
 
-		return repr(self.to_dict())
+		# Fix index[1] if necessary, without touching the live indices
+		saved_index_stack = [copy.copy(index) for index in self.index_stack if index[0] not in (VIEW_PROMPT_NULL, VIEW_PROMPT_DIR)]
 
-	def __str__(self):
-		"""Return a string representation of the State based off of to_dict."""
+		for saved_index in saved_index_stack:
 
-		return json.dumps(self.to_dict(), indent=4, separators=(",", ": "), sort_keys=True)
+			if type(saved_index[1]) == Mob:
+
+				saved_index[1] = [saved_index[1].coords, int(saved_index[1].quanta["default:quanta:_permeability"])]
+
+		return saved_index_stack
 
 	def to_dict(self):
 		"""Create a JSON-serializable dict representation of the State."""
 
 		state = {}
 
-		# Fix index[1] if necessary
-		saved_index_stack = copy.copy(self.index_stack)
-
-		for saved_index in saved_index_stack:
-
-			if type(saved_index[1]) == Mob:
-
-				saved_index[1] = [saved_index[1].coords, int(saved_index[1].quanta["default:quanta:_permeability"])]
-
 		# Construct state
 		state["_type"] = "State"
-		state["index_stack"] = saved_index_stack
+		state["index_stack"] = self.saved_index_stack()
 		state["map_"] = self.map.to_dict()
 		state["message_log"] = self.message_log
 
@@ -125,14 +161,81 @@ class Map(object):
 	"""
 	The class which contains a grid of tiles
 
-	Map.__init__(self, grid=[])
+	Tiles which only hold prototype NonMobs with nothing of their own are packed into per-chunk TerrainArrays and read
+	through lightweight TileViews; a real Tile is only made for a tile once something changes it.
+
+	When the Map has a chunk store, chunks are loaded from it the first time they're used, and
+	Map.update_chunks writes idle chunks with no mobs nearby back to it and forgets them.
+
+	A saved Map has a palette, the saved dict of every packed tile it has, and its columns are
+	runs of them: a palette index and how many tiles down the column use it, with the saved
+	dict of any tile which isn't packed in between.
+
+	Map.__init__(self, grid=[], prototypes={}, size=None, depth=1, chunk_size=CHUNK_SIZE, chunk_store=None, palette=None)
 	Map.__repr__(self)
 	Map.__str__(self)
+	Map._chunk(self, x, y)
+	Map._chunk_bounds(self, key)
+	Map._decode(self, x, y)
+	Map._encode_saved_tile(self, saved_tile)
+	Map._encode_tile(self, tile)
+	Map._evict_chunk(self, key)
+	Map._fill_runs(self, x, y, grid, palette)
+	Map._load_chunk(self, key, saved_chunk=None)
+	Map._load_runs(self, grid, palette)
+	Map._load_tile(self, x, y, saved_tile)
+	Map._materialize(self, x, y)
+	Map._register_tile(self, tile)
+	Map._saved_codes(self, codes)
+	Map._saved_tile(self, x, y)
+	Map._terrain_code(self, permeability, template)
+	Map._unregister_tile(self, tile)
+	Map.chunk_keys(self)
+	Map.compact(self)
+	Map.find_entities(self, id_, z=None)
+	Map.flow_field(self, target_id, z, permeability, radius)
+	Map.forget_flow_fields(self, entity)
+	Map.get_mob(self, coords)
 	Map.get_mobs(self)
+	Map.is_loaded(self, bounds)
+	Map.is_walkable(self, x, y, z, permeability)
+	Map.load_terrain(self, key, terrain, saved_tiles={})
+	Map.nearest_entity(self, id_, coords)
+	Map.pathfinder(self, z, permeability)
+	Map.save_chunk(self, key)
+	Map.save_palette(self, palette)
+	Map.save_runs(self, x, palette, y_start=0, y_end=None)
+	Map.terrain_changed(self, x, y)
+	Map.tile_changed(self, x, y)
 	Map.to_dict(self)
+	Map.unshare(self, coords, permeability, attr)
+	Map.update_chunks(self, keep_radius=1, idle_turns=8)
+	Map.visible(self, x, y, z, permeability, radius)
+	Map.walkable(self, bounds, z, permeability, flat=False)
 	Map.yield_mobs(self)
 
+	Map._chunk_clock
+	Map._chunk_store
+	Map._chunk_used
+	Map._chunks
+	Map._dirty_chunks
+	Map._flow_fields
+	Map._pathfinders
+	Map._visible
+	Map._saved_tiles
+	Map._size
+	Map._terrain_codes
+	Map._terrain_entries
+	Map._tiles
+	Map.chunk_size
+	Map.depth
+	Map.entities
+	Map.fresh_mobs
 	Map.grid
+	Map.mob_coords
+	Map.mobs
+	Map.pending_mobs
+	Map.prototypes
 	Map.size
 	"""
 
@@ -148,23 +251,83 @@ class Map(object):
 
 			super(Action, self).__getattr__(attr)
 
-	def __init__(self, grid=[]):
-		"""Initialize the Map."""
+	def __init__(self, grid=[], prototypes={}, size=None, depth=1, chunk_size=CHUNK_SIZE, chunk_store=None, palette=None):
+		"""
+		Initialize the Map.
+
+		Either grid holds every saved tile, or size and depth (the most layers a tile can have
+		and still be packed) describe them and chunk_store holds them. Without a chunk store
+		or a grid, every chunk has to be put in with Map.load_terrain. With a palette, grid's
+		columns are runs like Map.save_runs makes, and size and depth have to be given.
+		"""
+
+		# Load the terrain templates before the tiles which share them
+		self.prototypes = Prototypes(prototypes)
+
+		# Construct the mob registry; Game._mod_move keeps it in sync from here on
+		self.mob_coords = {}
+		self.mobs = OrderedDict()
+
+		# The coords of every loaded entity by ID; entities packed into the terrain aren't loaded
+		self.entities = {}
+
+		# Mobs still waiting for a next turn; Game._mod_set_next_turn keeps it in sync
+		self.pending_mobs = OrderedDict()
+
+		# Mobs which were loaded with a chunk and haven't been given to their AI yet
+		self.fresh_mobs = OrderedDict()
+
+		# The flow fields AIs share, until their targets or the terrain move
+		self._flow_fields = {}
+
+		# The Pathfinder of each layer and permeability; Map.terrain_changed keeps them in sync
+		self._pathfinders = {}
+
+		# What can be seen from where, until the terrain in sight changes
+		self._visible = {}
+
+		# Construct the terrain, which is as deep as the deepest saved tile
+		if size is None:
+
+			size = (len(grid), len(grid[0])) if len(grid) else (0, 0)
+
+			for saved_col in grid:
+				for saved_tile in saved_col:
+					if type(saved_tile) == dict:
+
+						depth = max(depth, len(saved_tile["layers"]))
 
-		# Construct grid
-		self.grid = []
+		self._size = tuple(size)
+		self.chunk_size = chunk_size
+		self.depth = depth
 
-		for x_val in range(len(grid)):
+		self._terrain_codes = {}
+		self._terrain_entries = [None, None]
 
-			saved_col = grid[x_val]
-			col = []
+		# The saved dicts of packed tiles, which are the same for every tile with the same codes
+		self._saved_tiles = {}
 
-			for y_val in range(len(saved_col)):
+		# Construct the chunks, only loading the tiles which can't be packed into the terrain
+		self._chunk_clock = 0
+		self._chunk_store = chunk_store
+		self._chunk_used = {}
+		self._chunks = {}
+		self._dirty_chunks = set()
+		self._tiles = {}
 
-				saved_tile = grid[x_val][y_val]
-				col.append(load_if_dict(saved_tile, coords=[x_val, y_val]))
+		if palette is not None:
 
-			self.grid.append(col)
+			self._load_runs(grid, palette)
+
+		elif len(grid):
+			for key in self.chunk_keys():
+
+				bounds = self._chunk_bounds(key)
+				self._load_chunk(key, [saved_col[bounds[1]:bounds[3]] for saved_col in grid[bounds[0]:bounds[2]]])
+
+		self.fresh_mobs.clear()
+
+		self.grid = Grid(self)
 
 	def __repr__(self):
 		"""Return a syntactically correct string representation of the Map based off of to_dict."""
@@ -176,237 +339,1427 @@ class Map(object):
 
 		return json.dumps(self.to_dict(), indent=4, separators=(",", ": "), sort_keys=True)
 
-	def get_mobs(self):
-		"""Return all the mobs in the Map."""
+	def _chunk(self, x, y):
+		"""Get the TerrainArray of the chunk holding x, y, loading the chunk if needed."""
 
-		mob_list = []
+		key = (x // self.chunk_size, y // self.chunk_size)
+		self._chunk_used[key] = self._chunk_clock
 
-		for col in self.grid:
-			for tile in col:
+		try:
 
-				mob_list.extend(tile.get_mobs())
+			return self._chunks[key]
 
-		return mob_list
+		except KeyError:
 
-	def to_dict(self):
-		"""Create a JSON-serializable dict representation of the Map."""
+			self._load_chunk(key)
+			return self._chunks[key]
 
-		state = {}
+	def _chunk_bounds(self, key):
+		"""Get the (x, y) of the first tile of a chunk and the (x, y) just past its last."""
 
-		# Fix grid
-		saved_grid = []
+		return (key[0] * self.chunk_size,
+				key[1] * self.chunk_size,
+				min((key[0] + 1) * self.chunk_size, self._size[0]),
+				min((key[1] + 1) * self.chunk_size, self._size[1]))
 
-		for col in self.grid:
+	def _decode(self, x, y):
+		"""Get the (permeability, template) of each packed layer at x, y, with None for empty layers."""
 
-			saved_col = []
+		terrain = self._chunk(x, y)
 
-			for tile in col:
+		return [self._terrain_entries[code] for code in terrain.get(x % self.chunk_size, y % self.chunk_size)]
 
-				saved_col.append(tile.to_dict())
+	def _encode_saved_tile(self, saved_tile):
+		"""Get the terrain codes of a saved Tile, or None if it can't be packed."""
 
-			saved_grid.append(saved_col)
+		if len(saved_tile["layers"]) > self.depth:
 
-		# Construct state
-		state["_type"] = "Map"
-		state["grid"] = saved_grid
-		state["size"] = self._size
+			return None
 
-		# Return state
-		return state
+		codes = []
 
-	def yield_mobs(self):
-		"""Yield all of the mobs in order of initiative and if they have a next turn defined."""
+		for saved_layer_dict in saved_tile["layers"]:
 
-		# Initialize to True to get the while loop started
-		more_mobs = True
+			if len(saved_layer_dict) == 0:
 
-		while more_mobs:
+				codes.append(CODE_EMPTY)
+				continue
 
-			fastest_mob = None
-			for mob in self.get_mobs():
-				if mob.next_turn == None:
+			elif len(saved_layer_dict) > 1:
 
-					# That mob has already moved
-					pass
+				return None
 
-				elif fastest_mob == None:
+			perm_str, saved_entity = saved_layer_dict.items()[0]
 
-					# First one is automatically the fastest until deposed
-					fastest_mob = mob
+			if type(saved_entity) != dict or saved_entity["_type"] != "NonMob":
 
-				elif (	mob.quanta["default:quanta:_initiative"] + mob.next_turn[0].quanta["default:quanta:_initiative"] > 
-						fastest_mob.quanta["default:quanta:_initiative"] + fastest_mob.next_turn[0].quanta["default:quanta:_initiative"]):
+				return None
 
-					fastest_mob = mob
+			template, overrides = self.prototypes.split(saved_entity)
 
-			if fastest_mob == None:
+			# NonMobs with anything of their own can't be packed
+			if overrides is not None:
 
-				more_mobs = False
+				return None
 
-			else:
+			codes.append(self._terrain_code(int(perm_str), template))
 
-				yield fastest_mob
+			if codes[-1] is None:
 
-class Tile(object):
-	"""
-	A tile on the map, potentially containing many entities
+				return None
 
-	Tile.__init__(self, coords=(-1, -1), layers=[])
-	Tile.__repr__(self)
-	Tile.__str__(self)
-	Tile.get_mobs(self)
-	Tile.to_dict(self)
+		return codes
 
-	Tile.coords
-	Tile.layers
-	"""
+	def _encode_tile(self, tile):
+		"""Get the terrain codes of a loaded Tile, or None if it can't be packed."""
 
-	def __init__(self, coords=(-1, -1), layers=[]):
-		"""Initialize the Tile."""
+		if len(tile.layers) > self.depth:
 
-		# Construct layers
-		self.layers = []
+			return None
 
-		for saved_layer_dict in layers:
+		codes = []
 
-			layer = {}
+		for layer in tile.layers:
 
-			for perm_str in saved_layer_dict:
+			if len(layer) == 0:
 
-				permeability = int(perm_str)
+				codes.append(CODE_EMPTY)
+				continue
 
-				entity_coords = copy.copy(coords)
-				entity_coords.append(permeability)
+			elif len(layer) > 1:
 
-				layer[permeability] = load_if_dict(saved_layer_dict[perm_str], coords=entity_coords)
+				return None
 
-			self.layers.append(layer)
+			permeability, entity = layer.items()[0]
 
-		self.coords = coords
+			if type(entity) != NonMob or entity.prototype is None or entity.overrides is not None:
 
-	def __repr__(self):
-		"""Return a syntactically correct string representation of the Tile based off of to_dict."""
+				return None
 
-		return repr(self.to_dict())
+			codes.append(self._terrain_code(permeability, entity.prototype))
 
-	def __str__(self):
-		"""Return a string representation of the Tile based off of to_dict."""
+			if codes[-1] is None:
 
-		return json.dumps(self.to_dict(), indent=4, separators=(",", ": "), sort_keys=True)
+				return None
 
-	def get_mobs(self):
-		"""Get all the mobs in the tile"""
+		return codes
 
-		mob_list = []
+	def _evict_chunk(self, key):
+		"""Write a chunk back to the chunk store if it might have changed, then forget it."""
 
-		for layer in self.layers:
-			for permeability in layer.keys():
-				if type(layer[permeability]) == Mob:
+		if key in self._dirty_chunks:
 
-					mob_list.append(layer[permeability])
+			self._chunk_store.write(key, self.save_chunk(key), self.prototypes)
+			self._dirty_chunks.discard(key)
 
-		return mob_list
+		bounds = self._chunk_bounds(key)
 
-	def to_dict(self):
+		for x_val in range(bounds[0], bounds[2]):
+			for y_val in range(bounds[1], bounds[3]):
+
+				if (x_val, y_val) in self._tiles:
+
+					self._unregister_tile(self._tiles.pop((x_val, y_val)))
+
+		del self._chunks[key]
+		del self._chunk_used[key]
+
+	def _fill_runs(self, x, y, grid, palette):
+		"""
+		Fill the tiles from x, y on from columns of runs of the palette's tiles, filling each
+		run at once; the chunks they're in have to be there already.
 		"""
-		Create a JSON-serializable dict representation of the Tile.
 
-		self.coords is not saved because it is a soft reference.
+		# Each tile of the palette is encoded once, however many runs of it there are
+		palette_codes = [self._encode_saved_tile(saved_tile) for saved_tile in palette]
+
+		for x_val, saved_col in enumerate(grid, x):
+
+			index = 0
+			y_val = y
+
+			while index < len(saved_col):
+
+				if type(saved_col[index]) == dict:
+
+					self._load_tile(x_val, y_val, saved_col[index])
+
+					index += 1
+					y_val += 1
+					continue
+
+				codes = palette_codes[saved_col[index]]
+				end = y_val + saved_col[index + 1]
+
+				if codes is None:
+
+					# The terrain codes ran out, so these tiles have to be loaded as Tiles
+					for run_y in range(y_val, end):
+
+						self._load_tile(x_val, run_y, palette[saved_col[index]])
+
+				else:
+
+					# A run can go on into the next chunk down
+					while y_val < end:
+
+						length = min(end, (y_val // self.chunk_size + 1) * self.chunk_size) - y_val
+						self._chunks[(x_val // self.chunk_size, y_val // self.chunk_size)].fill(x_val % self.chunk_size, y_val % self.chunk_size, length, codes)
+
+						y_val += length
+
+				index += 2
+				y_val = end
+
+	def _load_chunk(self, key, saved_chunk=None):
+		"""
+		Load a chunk from saved_chunk, or else from the chunk store. A saved chunk is either
+		what Map.save_chunk makes or, in older saves, its columns of saved tiles.
 		"""
 
-		state = {}
+		if saved_chunk is None:
+
+			saved_chunk = self._chunk_store.read(key)
+
+		bounds = self._chunk_bounds(key)
+		self._chunks[key] = TerrainArray((bounds[2] - bounds[0], bounds[3] - bounds[1]), self.depth)
+		self._chunk_used[key] = self._chunk_clock
+
+		if type(saved_chunk) == dict:
+
+			self._fill_runs(bounds[0], bounds[1], saved_chunk["grid"], saved_chunk["palette"])
+
+		else:
+
+			for x_val in range(bounds[0], bounds[2]):
+				for y_val in range(bounds[1], bounds[3]):
+
+					self._load_tile(x_val, y_val, saved_chunk[x_val - bounds[0]][y_val - bounds[1]])
+
+		# The pathfinders took it for a wall while it wasn't loaded
+		for pathfinder in self._pathfinders.values():
+
+			pathfinder.loaded(bounds)
+
+	def _load_runs(self, grid, palette):
+		"""Load every chunk from columns of runs of the palette's tiles."""
+
+		for key in self.chunk_keys():
+
+			bounds = self._chunk_bounds(key)
+			self._chunks[key] = TerrainArray((bounds[2] - bounds[0], bounds[3] - bounds[1]), self.depth)
+			self._chunk_used[key] = self._chunk_clock
+
+		self._fill_runs(0, 0, grid, palette)
+
+	def _load_tile(self, x, y, saved_tile):
+		"""Pack a saved tile into its chunk, or load it as a Tile and register its mobs."""
+
+		codes = None
+
+		if type(saved_tile) == dict:
+
+			codes = self._encode_saved_tile(saved_tile)
+
+		if codes is not None:
+
+			self._chunks[(x // self.chunk_size, y // self.chunk_size)].set(x % self.chunk_size, y % self.chunk_size, codes)
+			return
+
+		tile = load_if_dict(saved_tile, coords=[x, y], prototypes=self.prototypes)
+		self._tiles[(x, y)] = tile
+		self._register_tile(tile)
+
+		for mob in tile.get_mobs():
+
+			self.forget_flow_fields(mob)
+
+			self.mob_coords[tuple(mob.coords)] = mob
+			self.mobs[mob] = None
+			self.fresh_mobs[mob] = None
+
+			if mob.next_turn == None:
+
+				self.pending_mobs[mob] = None
+
+	def _materialize(self, x, y):
+		"""Get the real Tile at x, y, unpacking it from the terrain if it's only packed."""
+
+		terrain = self._chunk(x, y)
+
+		try:
+
+			return self._tiles[(x, y)]
+
+		except KeyError:
+
+			pass
+
+		tile = Tile(coords=[x, y])
+
+		for code in terrain.get(x % self.chunk_size, y % self.chunk_size):
+
+			layer = {}
+
+			if self._terrain_entries[code] is not None:
+
+				permeability, template = self._terrain_entries[code]
+				layer[permeability] = NonMob(prototype=template, coords=[x, y, permeability])
+
+			tile.layers.append(layer)
+
+		self._tiles[(x, y)] = tile
+		self._register_tile(tile)
+		self.tile_changed(x, y)
+
+		return tile
+
+	def _register_tile(self, tile):
+		"""Put the entities of a Tile which was just loaded into Map.entities."""
+
+		for layer in tile.layers:
+			for entity in layer.values():
+
+				self.entities.setdefault(entity.id, {})[tuple(entity.coords)] = entity
+
+	def _saved_codes(self, codes):
+		"""Get the saved dict of a packed tile from its codes, shared by every tile with them."""
+
+		try:
+
+			saved_tile = self._saved_tiles[codes]
+			_SAVE_COUNTS["reused"] += 1
+
+			return saved_tile
+
+		except KeyError:
+
+			pass
 
 		# Fix layers
 		saved_layers = []
 
-		for layer in self.layers:
+		for code in codes:
 
 			saved_layer_dict = {}
 
-			for key in layer:
-				
-				saved_layer_dict[str(key)] = layer[key].to_dict()
+			if self._terrain_entries[code] is not None:
+
+				permeability, template = self._terrain_entries[code]
+				saved_layer_dict[str(permeability)] = {"_type": "NonMob", "prototype": template.prototype_id}
 
 			saved_layers.append(saved_layer_dict)
 
-		# Construct state
-		state["_type"] = "Tile"
-		state["layers"] = saved_layers
+		self._saved_tiles[codes] = {"_type": "Tile", "layers": saved_layers}
+		_SAVE_COUNTS["serialized"] += 1
 
-		# Return state
-		return state
+		return self._saved_tiles[codes]
 
-class Entity(object):
-	"""
-	An entity, what is occupying a tile
+	def _saved_tile(self, x, y):
+		"""
+		Get the saved dict of the tile at x, y without making a view of it; packed tiles share
+		one with every tile packed the same way.
+		"""
 
-	Higher permeability means it's more similar to a vaccuum.
+		codes = tuple(self._chunk(x, y).get(x % self.chunk_size, y % self.chunk_size))
 
-	Entity.__getattr__(self, attr)
-	Entity.__init__(self, inventory, knowledge, status, coords=(-1, -1, -1), id_="")
-	Entity.__repr__(self)
-	Entity.__str__(self)
-	Entity._find_qualita(self)
-	Entity._find_quanta(self)
-	Entity.to_dict(self)
+		try:
 
-	Entity.characteristics*
-	Entity.coords
-	Entity.dif_coag*
-	Entity.id
-	Entity.inventory
-	Entity.knowledge
-	Entity.qualita*
-	Entity.quanta*
-	Entity.status
-	"""
+			return self._tiles[(x, y)].to_dict()
 
-	def __getattr__(self, attr):
-		"""Get an attribute, but do a special behavior with dif_coag."""
+		except KeyError:
 
-		if attr == "qualita":
+			return self._saved_codes(codes)
 
-			return Coagulate(name="Qualita", tree=self._find_qualita())
+	def _terrain_code(self, permeability, template):
+		"""Get the terrain code of a template at a permeability, or None if the codes ran out."""
 
-		elif attr == "quanta":
+		try:
 
-			return Coagulate(name="Quanta", tree=self._find_quanta())
+			return self._terrain_codes[(permeability, template)]
 
-		elif attr == "characteristics":
+		except KeyError:
 
-			return Coagulate(name="Characteristics", tree=[self.qualita, self.quanta])
+			pass
 
-		elif attr == "dif_coag":
+		if len(self._terrain_entries) > CODE_MAX:
 
-			return Coagulate(	name="Dif. Coagulate",
-								tree=[	self.inventory,
-										self.status,
-										self.knowledge,
-										self.characteristics],
-								is_root=True)
+			return None
 
-		else:
+		self._terrain_codes[(permeability, template)] = len(self._terrain_entries)
+		self._terrain_entries.append((permeability, template))
 
-			return super(Entity, self).__getattr__(attr)
+		return self._terrain_codes[(permeability, template)]
 
-	def __init__(self, inventory, knowledge, status, coords=(-1, -1, -1), id_=""):
-		"""Initialize the Entity."""
+	def _unregister_tile(self, tile):
+		"""Take the entities of a Tile which is being let go of out of Map.entities."""
 
-		self.coords = coords
-		self.id = id_
-		self.inventory = load_if_dict(inventory)
-		self.knowledge = load_if_dict(knowledge)
-		self.status = load_if_dict(status)
+		for layer in tile.layers:
+			for entity in layer.values():
 
-	def __repr__(self):
-		"""Return a syntactically correct string representation of the Entity based off of to_dict."""
+				coords = self.entities.get(entity.id, {})
 
-		return repr(self.to_dict())
+				if coords.get(tuple(entity.coords)) is entity:
 
-	def __str__(self):
-		"""Return a string representation of the Entity based off of to_dict."""
+					del coords[tuple(entity.coords)]
+
+				if not coords:
+
+					self.entities.pop(entity.id, None)
+
+	def chunk_keys(self):
+		"""Get the keys of every chunk in the Map, loaded or not."""
+
+		keys = []
+
+		for x_key in range(-(-self._size[0] // self.chunk_size)):
+			for y_key in range(-(-self._size[1] // self.chunk_size)):
+
+				keys.append((x_key, y_key))
+
+		return keys
+
+	def compact(self):
+		"""Pack the loaded tiles which only hold prototype NonMobs back into the terrain."""
+
+		for tile_coords in list(self._tiles):
+
+			codes = self._encode_tile(self._tiles[tile_coords])
+
+			if codes is not None:
+
+				x_val, y_val = tile_coords
+				self._chunks[(x_val // self.chunk_size, y_val // self.chunk_size)].set(x_val % self.chunk_size, y_val % self.chunk_size, codes)
+				self._unregister_tile(self._tiles.pop(tile_coords))
+
+	def flow_field(self, target_id, z, permeability, radius):
+		"""
+		Get the FlowField of the tiles at layer z within radius steps of every mob with the ID
+		target_id, for a mob of a permeability; it's only searched again once it's forgotten.
+		"""
+
+		key = (target_id, z, permeability, radius)
+
+		try:
+
+			return self._flow_fields[key]
+
+		except KeyError:
+
+			pass
+
+		targets = [(coords[0], coords[1]) for coords, entity in self.find_entities(target_id, z)]
+
+		if len(targets):
+
+			bounds = (	max(min([target[0] for target in targets]) - radius, 0),
+						max(min([target[1] for target in targets]) - radius, 0),
+						min(max([target[0] for target in targets]) + radius + 1, self._size[0]),
+						min(max([target[1] for target in targets]) + radius + 1, self._size[1]))
+
+		else:
+
+			bounds = (0, 0, 0, 0)
+
+		self._flow_fields[key] = FlowField(self.walkable(bounds, z, permeability), bounds, targets, radius)
+
+		return self._flow_fields[key]
+
+	def find_entities(self, id_, z=None):
+		"""
+		Get a list of (coords, entity) of every loaded entity with an ID, only at layer z if
+		it's given.
+
+		Entities packed into the terrain aren't in Map.entities, so they're found by their
+		codes in the loaded chunks. Each comes back as the NonMob unpacking its tile would
+		make, which isn't on the Map; use Map._materialize on its tile to change it.
+		"""
+
+		found = []
+
+		for coords, entity in self.entities.get(id_, {}).items():
+			if z is None or coords[2] == z:
+
+				found.append((coords, entity))
+
+		codes = set()
+
+		for code, entry in enumerate(self._terrain_entries):
+			if entry is not None and entry[1].id == id_ and (z is None or entry[0] == z):
+
+				codes.add(code)
+
+		if codes:
+			for key, terrain in self._chunks.items():
+
+				bounds = self._chunk_bounds(key)
+
+				for layer_z in range(self.depth):
+					for x_val, y_val, code in terrain.find(layer_z, codes):
+
+						coords = (bounds[0] + x_val, bounds[1] + y_val, self._terrain_entries[code][0])
+
+						# A Tile that's been unpacked is in Map.entities instead
+						if coords[:2] not in self._tiles:
+
+							found.append((coords, NonMob(prototype=self._terrain_entries[code][1], coords=list(coords))))
+
+		# The same order every time, whatever order the entities were loaded in
+		found.sort()
+
+		return found
+
+	def forget_flow_fields(self, entity):
+		"""Forget the flow fields that entity moving would change: every one if it isn't a mob."""
+
+		if type(entity) != Mob:
+
+			self._flow_fields.clear()
+			return
+
+		for key in list(self._flow_fields):
+			if key[0] == entity.id:
+
+				del self._flow_fields[key]
+
+	def get_mob(self, coords):
+		"""Return the mob at coords, or None if there isn't one."""
+
+		return self.mob_coords.get(tuple(coords))
+
+	def get_mobs(self):
+		"""Return all the mobs in the Map."""
+
+		return list(self.mobs)
+
+	def is_loaded(self, bounds):
+		"""Return whether every chunk with a tile in bounds, like Map.walkable takes them, is loaded."""
+
+		for x_key in range(bounds[0] // self.chunk_size, -(-bounds[2] // self.chunk_size)):
+			for y_key in range(bounds[1] // self.chunk_size, -(-bounds[3] // self.chunk_size)):
+
+				if (x_key, y_key) not in self._chunks:
+
+					return False
+
+		return True
+
+	def is_walkable(self, x, y, z, permeability):
+		"""Return whether a mob of a permeability could walk through layer z of x, y if no mobs were there."""
+
+		try:
+
+			tile = self._tiles[(x, y)]
+
+		except KeyError:
+
+			codes = self._chunk(x, y).get(x % self.chunk_size, y % self.chunk_size)
+
+			if z >= len(codes) or self._terrain_entries[codes[z]] is None:
+
+				return True
+
+			return self._terrain_entries[codes[z]][0] > permeability
+
+		if z >= len(tile.layers):
+
+			return True
+
+		for entity_permeability, entity in tile.layers[z].items():
+			if type(entity) != Mob and entity_permeability <= permeability:
+
+				return False
+
+		return True
+
+	def load_terrain(self, key, terrain, saved_tiles={}):
+		"""
+		Put in a chunk from a TerrainArray of this Map's terrain codes and the saved tiles,
+		keyed by (x, y), which aren't packed in it.
+		"""
+
+		self._chunks[key] = terrain
+		self._chunk_used[key] = self._chunk_clock
+
+		for tile_coords in saved_tiles:
+
+			self._load_tile(tile_coords[0], tile_coords[1], saved_tiles[tile_coords])
+
+	def nearest_entity(self, id_, coords):
+		"""
+		Get the (coords, entity) of the loaded entity with an ID at coords' layer which takes
+		the fewest steps to reach if nothing is in the way, or None if there isn't one.
+		"""
+
+		nearest = None
+		nearest_steps = None
+
+		for found in self.find_entities(id_, coords[2]):
+
+			steps = max(abs(found[0][0] - coords[0]), abs(found[0][1] - coords[1]))
+
+			if nearest is None or steps < nearest_steps:
+
+				nearest = found
+				nearest_steps = steps
+
+		return nearest
+
+	def pathfinder(self, z, permeability):
+		"""Get the Pathfinder through layer z for mobs of a permeability."""
+
+		try:
+
+			return self._pathfinders[(z, permeability)]
+
+		except KeyError:
+
+			self._pathfinders[(z, permeability)] = Pathfinder(self, z, permeability)
+
+			return self._pathfinders[(z, permeability)]
+
+	def save_chunk(self, key):
+		"""Create the JSON-serializable dict of a chunk: its columns of runs and their palette."""
+
+		bounds = self._chunk_bounds(key)
+		palette = {}
+		saved_grid = []
+
+		for x_val in range(bounds[0], bounds[2]):
+
+			saved_grid.append(self.save_runs(x_val, palette, bounds[1], bounds[3]))
+
+		return {"grid": saved_grid, "palette": self.save_palette(palette)}
+
+	def save_palette(self, palette):
+		"""Create the saved palette of the codes Map.save_runs put in palette."""
+
+		saved_palette = [None] * len(palette)
+
+		for codes in palette:
+
+			saved_palette[palette[codes]] = self._saved_codes(codes)
+
+		return saved_palette
+
+	def save_runs(self, x, palette, y_start=0, y_end=None):
+		"""
+		Create the JSON-serializable column of runs of saved tiles at x, from y_start to just
+		before y_end or the bottom, adding the codes of packed tiles which aren't in palette, a
+		dict of codes to palette index, to it.
+		"""
+
+		saved_col = []
+		run_codes = None
+
+		for y_val in range(y_start, self._size[1] if y_end is None else y_end):
+
+			terrain = self._chunk(x, y_val)
+
+			if (x, y_val) in self._tiles:
+
+				# A Tile which could be packed is saved like it is, so it doesn't break up a run
+				codes = self._encode_tile(self._tiles[(x, y_val)])
+
+				if codes is None:
+
+					saved_col.append(self._tiles[(x, y_val)].to_dict())
+					run_codes = None
+					continue
+
+				codes = tuple(codes)
+
+			else:
+
+				codes = tuple(terrain.get(x % self.chunk_size, y_val % self.chunk_size))
+
+			if codes == run_codes:
+
+				saved_col[-1] += 1
+				continue
+
+			if codes not in palette:
+
+				palette[codes] = len(palette)
+
+			saved_col.append(palette[codes])
+			saved_col.append(1)
+			run_codes = codes
+
+		return saved_col
+
+	def terrain_changed(self, x, y):
+		"""Tell the pathfinders and the fields of view something other than a mob came to or left x, y."""
+
+		for pathfinder in self._pathfinders.values():
+
+			pathfinder.changed(x, y)
+
+		# Only the fields of view x, y is inside could have changed
+		for key in list(self._visible):
+			if abs(key[0] - x) <= key[4] and abs(key[1] - y) <= key[4]:
+
+				del self._visible[key]
+
+	def tile_changed(self, x, y):
+		"""Tell the Map the tile at x, y changed, so its chunk is written back when it's saved or let go of."""
+
+		self._dirty_chunks.add((x // self.chunk_size, y // self.chunk_size))
+
+	def to_dict(self):
+		"""
+		Create a JSON-serializable dict representation of the Map.
+
+		This loads every chunk, so save chunked Maps with chunks.save_chunked instead.
+		"""
+
+		state = {}
+
+		# Fix grid
+		palette = {}
+		saved_grid = []
+
+		for x_val in range(self._size[0]):
+
+			saved_grid.append(self.save_runs(x_val, palette))
+
+		# Construct state
+		state["_type"] = "Map"
+		state["depth"] = self.depth
+		state["grid"] = saved_grid
+		state["palette"] = self.save_palette(palette)
+		state["prototypes"] = self.prototypes.to_dict()
+		state["size"] = list(self._size)
+
+		# Return state
+		return state
+
+	def unshare(self, coords, permeability, attr):
+		"""
+		Give the NonMob with permeability at coords its own copy of its template's inventory,
+		knowledge or status, and return it. Its tile is unpacked first, so the copy is kept.
+		"""
+
+		for layer in self._materialize(coords[0], coords[1]).layers:
+
+			entity = layer.get(permeability)
+
+			if type(entity) == NonMob and list(entity.coords) == list(coords):
+
+				break
+
+		else:
+
+			raise KeyError("no NonMob at " + str(coords) + " with permeability " + str(permeability))
+
+		if entity.prototype is None or attr in (entity.overrides or ()):
+
+			return getattr(entity, attr)
+
+		coag = entity.unshare(attr)
+
+		# The tile's saved dict and its chunk's saved copy don't have the copy yet
+		self._tiles[(coords[0], coords[1])]._dirty()
+		self.tile_changed(coords[0], coords[1])
+
+		return coag
+
+	def update_chunks(self, keep_radius=1, idle_turns=8):
+		"""
+		Evict the chunks which haven't been used for idle_turns calls and are more than
+		keep_radius chunks away from every mob; mobs are never evicted, so neither is their chunk.
+		"""
+
+		self._chunk_clock += 1
+
+		if self._chunk_store is None:
+
+			return
+
+		# Find the chunks near mobs
+		kept_keys = set()
+
+		for mob_coords in self.mob_coords:
+
+			x_key = mob_coords[0] // self.chunk_size
+			y_key = mob_coords[1] // self.chunk_size
+
+			for x_dif in range(-keep_radius, keep_radius + 1):
+				for y_dif in range(-keep_radius, keep_radius + 1):
+
+					kept_keys.add((x_key + x_dif, y_key + y_dif))
+
+		for key in list(self._chunks):
+			if key not in kept_keys and self._chunk_clock - self._chunk_used[key] > idle_turns:
+
+				self._evict_chunk(key)
+
+	def visible(self, x, y, z, permeability, radius):
+		"""
+		Get the set of (x, y) a mob of a permeability at x, y, z can see within radius; what it
+		couldn't walk through, it can't see through.
+		"""
+
+		key = (x, y, z, permeability, radius)
+
+		try:
+
+			return self._visible[key]
+
+		except KeyError:
+
+			pass
+
+		if len(self._visible) >= VISIBLE_CACHE_SIZE:
+
+			self._visible.clear()
+
+		bounds = (	max(x - radius, 0),
+					max(y - radius, 0),
+					min(x + radius + 1, self._size[0]),
+					min(y + radius + 1, self._size[1]))
+
+		self._visible[key] = frozenset(shadowcast(self.walkable(bounds, z, permeability, flat=True), bounds, (x, y), radius))
+
+		return self._visible[key]
+
+	def walkable(self, bounds, z, permeability, flat=False):
+		"""
+		Get whether each tile in bounds, the (x, y) of the first tile and the (x, y) just past
+		the last, is walkable like Map.is_walkable says: as a NumPy array of bools by x and y
+		if NumPy is available and flat isn't set, or a flat bytearray by x then y if not.
+		"""
+
+		width = bounds[2] - bounds[0]
+		height = bounds[3] - bounds[1]
+
+		# Look up whether each code blocks, so packed tiles don't have to be decoded
+		blocking = [entry is not None and entry[0] <= permeability for entry in self._terrain_entries]
+
+		if numpy is not None:
+
+			blocking = numpy.array(blocking, dtype=bool)
+			walkable = numpy.ones((width, height), dtype=bool)
+
+		else:
+
+			walkable = bytearray("\x01" * (width * height))
+
+		if z < self.depth:
+			for x_key in range(bounds[0] // self.chunk_size, -(-bounds[2] // self.chunk_size)):
+				for y_key in range(bounds[1] // self.chunk_size, -(-bounds[3] // self.chunk_size)):
+
+					chunk_bounds = self._chunk_bounds((x_key, y_key))
+					codes = self._chunk(chunk_bounds[0], chunk_bounds[1]).layer(z)
+
+					x_start = max(bounds[0], chunk_bounds[0])
+					x_end = min(bounds[2], chunk_bounds[2])
+					y_start = max(bounds[1], chunk_bounds[1])
+					y_end = min(bounds[3], chunk_bounds[3])
+
+					if numpy is not None:
+
+						# The whole chunk at once
+						walkable[x_start - bounds[0]:x_end - bounds[0], y_start - bounds[1]:y_end - bounds[1]] = ~blocking[codes[	x_start - chunk_bounds[0]:x_end - chunk_bounds[0],
+																																	y_start - chunk_bounds[1]:y_end - chunk_bounds[1]]]
+						continue
+
+					chunk_height = chunk_bounds[3] - chunk_bounds[1]
+
+					for x_val in range(x_start, x_end):
+
+						offset = (x_val - chunk_bounds[0]) * chunk_height - chunk_bounds[1]
+						index = (x_val - bounds[0]) * height - bounds[1]
+
+						for y_val in range(y_start, y_end):
+							if blocking[codes[offset + y_val]]:
+
+								walkable[index + y_val] = 0
+
+		# Loaded Tiles aren't in the terrain; look through whichever of them and bounds is smaller
+		if width * height < len(self._tiles):
+
+			tiles = [(x_val, y_val) for x_val in range(bounds[0], bounds[2]) for y_val in range(bounds[1], bounds[3]) if (x_val, y_val) in self._tiles]
+
+		else:
+
+			tiles = self._tiles
+
+		for tile_coords in tiles:
+			if bounds[0] <= tile_coords[0] < bounds[2] and bounds[1] <= tile_coords[1] < bounds[3]:
+
+				walkable_tile = self.is_walkable(tile_coords[0], tile_coords[1], z, permeability)
+
+				if numpy is not None:
+
+					walkable[tile_coords[0] - bounds[0], tile_coords[1] - bounds[1]] = walkable_tile
+
+				else:
+
+					walkable[(tile_coords[0] - bounds[0]) * height + tile_coords[1] - bounds[1]] = walkable_tile
+
+		if flat and numpy is not None:
+
+			return bytearray(walkable.astype(numpy.uint8).tostring())
+
+		return walkable
+
+	def yield_mobs(self):
+		"""
+		Yield all of the mobs in order of initiative and if they have a next turn defined.
+
+		The order is decided once with a heap when the turn starts. Ties go to the first
+		mob in grid order, and mobs that lose their next turn before they're reached are skipped.
+		"""
+
+		# Build the turn order
+		turn_heap = []
+
+		for order, mob in enumerate(self.mobs):
+			if mob.next_turn != None:	# This uses "!= None" because __nonzero__ isn't implemented for Action
+
+				initiative = mob.quanta["default:quanta:_initiative"] + mob.next_turn[0].quanta["default:quanta:_initiative"]
+				turn_heap.append((-initiative, tuple(mob.coords), order, mob))
+
+		heapq.heapify(turn_heap)
+
+		# Yield the mobs from fastest to slowest
+		while turn_heap:
+
+			mob = heapq.heappop(turn_heap)[-1]
+
+			if mob.next_turn == None or mob not in self.mobs:
+
+				# That mob has already moved or has left the map
+				continue
+
+			yield mob
+
+class Tile(object):
+	"""
+	A tile on the map, potentially containing many entities
+
+	Tile.__init__(self, coords=(-1, -1), layers=[], prototypes=None)
+	Tile.__repr__(self)
+	Tile.__str__(self)
+	Tile._dirty(self)
+	Tile._to_dict(self)
+	Tile.get_mobs(self)
+	Tile.to_dict(self)
+
+	Tile._saved
+	Tile.coords
+	Tile.layers
+	"""
+
+	__slots__ = ("_saved", "coords", "layers")
+
+	def __init__(self, coords=(-1, -1), layers=[], prototypes=None):
+		"""
+		Initialize the Tile.
+
+		NonMobs share a template from prototypes when it's given. Entities which are already
+		loaded, like the Mobs from a Decoder, just get their coords.
+		"""
+
+		# Construct layers
+		self.layers = []
+
+		for saved_layer_dict in layers:
+
+			layer = {}
+
+			for perm_str in saved_layer_dict:
+
+				permeability = int(perm_str)
+				entity_coords = [coords[0], coords[1], permeability]
+
+				saved_entity = saved_layer_dict[perm_str]
+
+				if isinstance(saved_entity, Entity):
+
+					saved_entity.coords = entity_coords
+					layer[permeability] = saved_entity
+
+				elif prototypes is not None and saved_entity["_type"] == "NonMob":
+
+					layer[permeability] = prototypes.instance(saved_entity, entity_coords)
+
+				else:
+
+					layer[permeability] = load_if_dict(saved_entity, coords=entity_coords)
+
+			self.layers.append(layer)
+
+		self._saved = None
+		self.coords = coords
+
+	def __repr__(self):
+		"""Return a syntactically correct string representation of the Tile based off of to_dict."""
+
+		return repr(self.to_dict())
+
+	def __str__(self):
+		"""Return a string representation of the Tile based off of to_dict."""
+
+		return json.dumps(self.to_dict(), indent=4, separators=(",", ": "), sort_keys=True)
+
+	def _dirty(self):
+		"""Forget the saved dict because the layers changed."""
+
+		self._saved = None
+
+	def _to_dict(self):
+		"""
+		Create a JSON-serializable dict representation of the Tile.
+
+		self.coords is not saved because it is a soft reference.
+		"""
+
+		state = {}
+
+		# Fix layers
+		saved_layers = []
+
+		for layer in self.layers:
+
+			saved_layer_dict = {}
+
+			for key in layer:
+				
+				saved_layer_dict[str(key)] = layer[key].to_dict()
+
+			saved_layers.append(saved_layer_dict)
+
+		# Construct state
+		state["_type"] = "Tile"
+		state["layers"] = saved_layers
+
+		# Return state
+		return state
+
+	def get_mobs(self):
+		"""Get all the mobs in the tile"""
+
+		mob_list = []
+
+		for layer in self.layers:
+			for permeability in layer.keys():
+				if type(layer[permeability]) == Mob:
+
+					mob_list.append(layer[permeability])
+
+		return mob_list
+
+	def to_dict(self):
+		"""
+		Get the JSON-serializable dict representation of the Tile, which is kept until the Tile
+		or an entity in it changes. It's shared, so don't change it.
+		"""
+
+		if self._saved is not None:
+
+			# An entity which changed has forgotten the saved dict that's in this one
+			saved_layers = self._saved["layers"]
+
+			for z_val, layer in enumerate(self.layers):
+				for permeability in layer:
+					if layer[permeability]._saved is not saved_layers[z_val][str(permeability)]:
+
+						self._saved = None
+
+		return _saved_dict(self)
+
+class TileView(Tile):
+	"""
+	A Tile which is only packed in Map.terrain, read through Map.grid
+
+	Reading it makes no Tile, but changing its layers unpacks it into a real Tile first
+	(see Map._materialize) and then changes that as well as the view.
+
+	TileView.__init__(self, map_, coords)
+	TileView.get_mobs(self)
+	TileView.to_dict(self)
+
+	TileView._map
+	TileView.coords
+	TileView.layers*
+	"""
+
+	__slots__ = ("_map",)
+
+	def __init__(self, map_, coords):
+		"""Initialize the TileView."""
+
+		self._map = map_
+		self.coords = coords
+
+	@property
+	def layers(self):
+		"""Build the layers of the packed tile."""
+
+		layers = []
+
+		for z_val, entry in enumerate(self._map._decode(self.coords[0], self.coords[1])):
+
+			layer = {}
+
+			if entry is not None:
+
+				permeability, template = entry
+				layer[permeability] = NonMob(prototype=template, coords=[self.coords[0], self.coords[1], permeability])
+
+			layers.append(LayerView(self._map, self.coords, z_val, layer))
+
+		return LayersView(self._map, self.coords, layers)
+
+	def get_mobs(self):
+		"""Get all the mobs in the tile, which is none since it's packed."""
+
+		return []
+
+	def to_dict(self):
+		"""Get the JSON-serializable dict representation of the packed tile without building it."""
+
+		return self._map._saved_tile(self.coords[0], self.coords[1])
+
+class LayersView(list):
+	"""
+	TileView.layers, which unpacks the tile when it's changed
+
+	LayersView.__delitem__(self, index)
+	LayersView.__init__(self, map_, coords, layers)
+	LayersView.__setitem__(self, index, layer)
+	LayersView._original(self)
+	LayersView.append(self, layer)
+	LayersView.extend(self, layers)
+	LayersView.insert(self, index, layer)
+	LayersView.pop(self, index=-1)
+
+	LayersView._coords
+	LayersView._map
+	"""
+
+	__slots__ = ("_coords", "_map")
+
+	def __delitem__(self, index):
+		"""Delete a layer from the view and the real Tile."""
+
+		del self._original()[index]
+		super(LayersView, self).__delitem__(index)
+
+	def __init__(self, map_, coords, layers):
+		"""Initialize the LayersView."""
+
+		super(LayersView, self).__init__(layers)
+
+		self._coords = coords
+		self._map = map_
+
+	def __setitem__(self, index, layer):
+		"""Set a layer of the view and the real Tile."""
+
+		self._original()[index] = layer
+		super(LayersView, self).__setitem__(index, layer)
+
+	def _original(self):
+		"""Get the layers of the real Tile, unpacking it if needed."""
+
+		return self._map._materialize(self._coords[0], self._coords[1]).layers
+
+	def append(self, layer):
+		"""Add a layer to the view and the real Tile."""
+
+		self._original().append(layer)
+		super(LayersView, self).append(layer)
+
+	def extend(self, layers):
+		"""Add layers to the view and the real Tile."""
+
+		layers = list(layers)
+
+		self._original().extend(layers)
+		super(LayersView, self).extend(layers)
+
+	def insert(self, index, layer):
+		"""Insert a layer into the view and the real Tile."""
+
+		self._original().insert(index, layer)
+		super(LayersView, self).insert(index, layer)
+
+	def pop(self, index=-1):
+		"""Remove a layer from the view and the real Tile, returning the view's."""
+
+		self._original().pop(index)
+		return super(LayersView, self).pop(index)
+
+class LayerView(dict):
+	"""
+	A layer of TileView.layers, which unpacks the tile when it's changed
+
+	LayerView.__delitem__(self, permeability)
+	LayerView.__init__(self, map_, coords, z_val, layer)
+	LayerView.__setitem__(self, permeability, entity)
+	LayerView._original(self)
+	LayerView.clear(self)
+	LayerView.pop(self, permeability, *default)
+	LayerView.setdefault(self, permeability, entity=None)
+	LayerView.update(self, *args, **argsd)
+
+	LayerView._coords
+	LayerView._map
+	LayerView._z_val
+	"""
+
+	__slots__ = ("_coords", "_map", "_z_val")
+
+	def __delitem__(self, permeability):
+		"""Remove an entity from the view and the real Tile."""
+
+		del self._original()[permeability]
+		super(LayerView, self).__delitem__(permeability)
+
+	def __init__(self, map_, coords, z_val, layer):
+		"""Initialize the LayerView."""
+
+		super(LayerView, self).__init__(layer)
+
+		self._coords = coords
+		self._map = map_
+		self._z_val = z_val
+
+	def __setitem__(self, permeability, entity):
+		"""Put an entity into the view and the real Tile."""
+
+		self._original()[permeability] = entity
+		super(LayerView, self).__setitem__(permeability, entity)
+
+	def _original(self):
+		"""Get this layer of the real Tile, unpacking it if needed."""
+
+		return self._map._materialize(self._coords[0], self._coords[1]).layers[self._z_val]
+
+	def clear(self):
+		"""Empty the view and the real Tile's layer."""
+
+		self._original().clear()
+		super(LayerView, self).clear()
+
+	def pop(self, permeability, *default):
+		"""Remove an entity from the view and the real Tile, returning the view's."""
+
+		self._original().pop(permeability, *default)
+		return super(LayerView, self).pop(permeability, *default)
+
+	def setdefault(self, permeability, entity=None):
+		"""Put an entity into the view and the real Tile if there isn't one there."""
+
+		self._original().setdefault(permeability, entity)
+		return super(LayerView, self).setdefault(permeability, entity)
+
+	def update(self, *args, **argsd):
+		"""Update the view and the real Tile's layer."""
+
+		self._original().update(*args, **argsd)
+		super(LayerView, self).update(*args, **argsd)
+
+class Grid(object):
+	"""
+	Map.grid, the tiles of a Map indexed by x and then y
+
+	Packed tiles come out as TileViews and the rest as the Map's Tiles.
+	Negative indices count from the end, like they did when the grid was a list.
+
+	Grid.__getitem__(self, x)
+	Grid.__init__(self, map_)
+	Grid.__iter__(self)
+	Grid.__len__(self)
+
+	Grid._map
+	"""
+
+	__slots__ = ("_map",)
+
+	def __getitem__(self, x):
+		"""Get the column at x."""
+
+		return GridColumn(self._map, _wrap_index(x, self._map._size[0]))
+
+	def __init__(self, map_):
+		"""Initialize the Grid."""
+
+		self._map = map_
+
+	def __iter__(self):
+		"""Iterate over the columns."""
+
+		for x_val in range(len(self)):
+
+			yield GridColumn(self._map, x_val)
+
+	def __len__(self):
+		"""Get the width of the Map."""
+
+		return self._map._size[0]
+
+class GridColumn(object):
+	"""
+	A column of Map.grid
+
+	GridColumn.__getitem__(self, y)
+	GridColumn.__init__(self, map_, x)
+	GridColumn.__iter__(self)
+	GridColumn.__len__(self)
+
+	GridColumn._map
+	GridColumn._x
+	"""
+
+	__slots__ = ("_map", "_x")
+
+	def __getitem__(self, y):
+		"""Get the Tile, or the TileView if it's packed, at y."""
+
+		y = _wrap_index(y, self._map._size[1])
+
+		# Make sure the chunk is loaded before looking for its tiles
+		self._map._chunk(self._x, y)
+
+		try:
+
+			return self._map._tiles[(self._x, y)]
+
+		except KeyError:
+
+			return TileView(self._map, [self._x, y])
+
+	def __init__(self, map_, x):
+		"""Initialize the GridColumn."""
+
+		self._map = map_
+		self._x = x
+
+	def __iter__(self):
+		"""Iterate over the tiles."""
+
+		for y_val in range(len(self)):
+
+			yield self[y_val]
+
+	def __len__(self):
+		"""Get the height of the Map."""
+
+		return self._map._size[1]
+
+class Entity(object):
+	"""
+	An entity, what is occupying a tile
+
+	Higher permeability means it's more similar to a vaccuum.
+
+	Derived attributes (marked with *) are built once and cached in their slots until the
+	inventory, status or knowledge changes; Entity.version counts those changes.
+
+	Entity.__getattr__(self, attr)
+	Entity.__init__(self, inventory, knowledge, status, coords=(-1, -1, -1), id_="")
+	Entity.__repr__(self)
+	Entity.__str__(self)
+	Entity._derive(self, attr)
+	Entity._dirty(self)
+	Entity._find_qualita(self)
+	Entity._find_quanta(self)
+	Entity._to_dict(self)
+	Entity._touch(self)
+	Entity.to_dict(self)
+
+	Entity._derived_attrs
+	Entity._saved
+	Entity.characteristics*
+	Entity.coords
+	Entity.dif_coag*
+	Entity.id
+	Entity.inventory
+	Entity.knowledge
+	Entity.qualita*
+	Entity.quanta*
+	Entity.status
+	Entity.version
+	"""
+
+	__slots__ = ("_saved", "characteristics", "coords", "dif_coag", "id", "inventory", "knowledge", "qualita", "quanta", "status", "version")
+
+	_derived_attrs = ("qualita", "quanta", "characteristics", "dif_coag")
+
+	def __getattr__(self, attr):
+		"""Get an attribute, but derive and cache the characteristics and dif_coag."""
+
+		if attr in self._derived_attrs:
+
+			# Caching it in its slot means this isn't called again until Entity._touch clears it
+			value = self._derive(attr)
+			setattr(self, attr, value)
+
+			return value
+
+		else:
+
+			return super(Entity, self).__getattr__(attr)
+
+	def __init__(self, inventory, knowledge, status, coords=(-1, -1, -1), id_=""):
+		"""Initialize the Entity."""
+
+		self.coords = coords
+		self.id = id_
+		self.inventory = load_if_dict(inventory)
+		self.knowledge = load_if_dict(knowledge)
+		self.status = load_if_dict(status)
+
+		# Take ownership of the coagulates so changes to them reach Entity._touch
+		for coag in (self.inventory, self.knowledge, self.status):
+
+			coag._parent = self
+
+		self._saved = None
+		self.version = 0
+
+	def __repr__(self):
+		"""Return a syntactically correct string representation of the Entity based off of to_dict."""
+
+		return repr(self.to_dict())
+
+	def __str__(self):
+		"""Return a string representation of the Entity based off of to_dict."""
+
+		return json.dumps(self.to_dict(), indent=4, separators=(",", ": "), sort_keys=True)
+
+	def _derive(self, attr):
+		"""Build a derived attribute from scratch."""
+
+		if attr == "qualita":
+
+			return Coagulate(name="Qualita", tree=self._find_qualita())
+
+		elif attr == "quanta":
+
+			return Coagulate(name="Quanta", tree=self._find_quanta())
+
+		elif attr == "characteristics":
+
+			return Coagulate(name="Characteristics", tree=[self.qualita, self.quanta])
+
+		elif attr == "dif_coag":
+
+			return Coagulate(	name="Dif. Coagulate",
+								tree=[	self.inventory,
+										self.status,
+										self.knowledge,
+										self.characteristics],
+								is_root=True)
 
-		return json.dumps(self.to_dict(), indent=4, separators=(",", ": "), sort_keys=True)
+	def _dirty(self):
+		"""Forget the saved dict because something saved about the Entity changed."""
+
+		self._saved = None
 
 	def _find_qualita(self):
 		"""Find and return the Entity's qualita."""
@@ -415,19 +1768,28 @@ class Entity(object):
 
 		for item in self.inventory:
 			for inherit_group in item.qualita_inherited:
-				if eval(inherit_group[1]):
+
+				condition = compile_condition(inherit_group[1])
+
+				if condition is True or (condition is not False and eval(condition)):
 
 					qualita_list.append(inherit_group[0])
 
 		for status in self.status:
 			for inherit_group in status.qualita_inherited:
-				if eval(inherit_group[1]):
+
+				condition = compile_condition(inherit_group[1])
+
+				if condition is True or (condition is not False and eval(condition)):
 
 					qualita_list.append(inherit_group[0])
 
 		for concept in self.knowledge:
 			for inherit_group in concept.qualita_inherited:
-				if eval(inherit_group[1]):
+
+				condition = compile_condition(inherit_group[1])
+
+				if condition is True or (condition is not False and eval(condition)):
 
 					qualita_list.append(inherit_group[0])
 
@@ -441,25 +1803,33 @@ class Entity(object):
 		for item in self.inventory:
 			for inherit_group in item.quanta_inherited:
 
-				if eval(inherit_group[1]):
+				condition = compile_condition(inherit_group[1])
+
+				if condition is True or (condition is not False and eval(condition)):
 
 					quanta_list.append(inherit_group[0])
 
 		for status in self.status:
 			for inherit_group in status.quanta_inherited:
-				if eval(inherit_group[1]):
+
+				condition = compile_condition(inherit_group[1])
+
+				if condition is True or (condition is not False and eval(condition)):
 
 					quanta_list.append(inherit_group[0])
 
 		for concept in self.knowledge:
 			for inherit_group in concept.quanta_inherited:
-				if eval(inherit_group[1]):
+
+				condition = compile_condition(inherit_group[1])
+
+				if condition is True or (condition is not False and eval(condition)):
 
 					quanta_list.append(inherit_group[0])
 
 		return quanta_list
 
-	def to_dict(self):
+	def _to_dict(self):
 		"""
 		Create a JSON-serializable dict representation of the Entity.
 
@@ -478,25 +1848,121 @@ class Entity(object):
 		# Return state
 		return state
 
+	def _touch(self):
+		"""Forget the derived attributes because the inventory, status or knowledge changed."""
+
+		self._dirty()
+		self.version += 1
+
+		for attr in self._derived_attrs:
+			try:
+
+				delattr(self, attr)
+
+			except AttributeError:
+
+				# It hasn't been derived since the last change
+				pass
+
+	def to_dict(self):
+		"""
+		Get the JSON-serializable dict representation of the Entity, which is kept until the
+		Entity changes. It's shared, so don't change it.
+		"""
+
+		return _saved_dict(self)
+
 class NonMob(Entity):
 	"""
 	An entity wihout an AI
 
-	NonMob.__init__(self, **argsd)
-	NonMob.to_dict(self)
+	A NonMob made from a prototype shares its template's inventory, knowledge and status
+	until NonMob.unshare gives it its own copy of one of them. Its own copies are kept in
+	NonMob.overrides and saved next to the prototype id. Templates refuse to change, so
+	whatever changes such a NonMob has to unshare what it changes first.
+
+	NonMob.__getattr__(self, attr)
+	NonMob.__init__(self, prototype=None, **argsd)
+	NonMob._to_dict(self)
+	NonMob._touch(self)
+	NonMob.unshare(self, attr)
+
+	NonMob._overridable
+	NonMob.overrides
+	NonMob.prototype
+	NonMob.prototype_id
 
 	Also includes some member variables from Entity
 	"""
 
-	def __init__(self, **argsd):
-		"""Initialize the NonMob."""
+	__slots__ = ("overrides", "prototype", "prototype_id")
 
-		super(NonMob, self).__init__(**argsd)
+	_overridable = ("inventory", "knowledge", "status")
 
-	def to_dict(self):
+	def __getattr__(self, attr):
+		"""Get an attribute, reading it from the overrides or else the prototype if there is one."""
+
+		if attr in ("overrides", "prototype") or self.prototype is None:
+
+			return super(NonMob, self).__getattr__(attr)
+
+		if self.overrides is not None:
+
+			if attr in self.overrides:
+
+				return self.overrides[attr]
+
+			# What's derived from its own copies is its own too
+			elif attr in self._derived_attrs:
+
+				return super(NonMob, self).__getattr__(attr)
+
+		return getattr(self.prototype, attr)
+
+	def __init__(self, prototype=None, **argsd):
+		"""
+		Initialize the NonMob, either on its own or as an instance of the template prototype
+		with its own copies of whichever of inventory, knowledge and status are given.
+		"""
+
+		self.overrides = None
+		self.prototype = prototype
+
+		if prototype is None:
+
+			super(NonMob, self).__init__(**argsd)
+
+		else:
+
+			self._saved = None
+			self.coords = argsd.get("coords", (-1, -1, -1))
+			self.version = 0
+
+			for attr in self._overridable:
+				if attr in argsd:
+
+					if self.overrides is None:
+
+						self.overrides = {}
+
+					self.overrides[attr] = load_if_dict(argsd[attr])
+					self.overrides[attr]._parent = self
+
+	def _to_dict(self):
 		"""Create a JSON-serializable dict representation of the NonMob."""
 
-		state = super(NonMob, self).to_dict()
+		# Instances only refer to their template, along with whatever they have of their own
+		if self.prototype is not None:
+
+			state = {"_type": "NonMob", "prototype": self.prototype.prototype_id}
+
+			for attr in self.overrides or ():
+
+				state[attr] = self.overrides[attr].to_dict()
+
+			return state
+
+		state = super(NonMob, self)._to_dict()
 
 		# Construct state
 		state["_type"] = "NonMob"
@@ -504,14 +1970,149 @@ class NonMob(Entity):
 		# Return state
 		return state
 
+	def _touch(self):
+		"""Forget the derived attributes, unless this is a template, which every instance shares."""
+
+		if self.prototype is None and getattr(self, "prototype_id", None) is not None:
+
+			raise TypeError("NonMob template '" + self.prototype_id + "' is shared; unshare the instance before changing it")
+
+		super(NonMob, self)._touch()
+
+	def unshare(self, attr):
+		"""
+		Get the NonMob's own inventory, knowledge or status, copying it from the template first
+		if it's still shared.
+		"""
+
+		if self.prototype is None or attr in (self.overrides or ()):
+
+			return getattr(self, attr)
+
+		if self.overrides is None:
+
+			self.overrides = {}
+
+		# The template's saved dict is shared, but loading it makes new coagulates
+		self.overrides[attr] = load_if_dict(getattr(self.prototype, attr).to_dict())
+		self.overrides[attr]._parent = self
+		self._touch()
+
+		return self.overrides[attr]
+
+class Prototypes(object):
+	"""
+	The NonMob templates of a Map, so that identical terrain is only loaded once
+
+	Saved NonMobs which refer to a prototype share its template, along with whatever they
+	have of their own. Full saved NonMobs are matched by content; ones which only differ
+	from the template with their id in their inventory, knowledge or status share it and
+	keep the differences as overrides, and the rest become new templates.
+
+	Prototypes.__init__(self, templates={})
+	Prototypes._add(self, prototype_id, saved_state, key)
+	Prototypes.instance(self, saved_state, coords)
+	Prototypes.split(self, saved_state)
+	Prototypes.to_dict(self)
+
+	Prototypes._keys
+	Prototypes.templates
+	"""
+
+	def __init__(self, templates={}):
+		"""Initialize the Prototypes from a dict of prototype ids to saved NonMobs."""
+
+		self._keys = {}
+		self.templates = {}
+
+		for prototype_id in sorted(templates):
+
+			saved_state = templates[prototype_id]
+			self._add(prototype_id, saved_state, _content_key(saved_state))
+
+	def _add(self, prototype_id, saved_state, key):
+		"""Load a template and register it by id and by content."""
+
+		template = load_if_dict(saved_state)
+		template.prototype_id = prototype_id
+
+		self.templates[prototype_id] = template
+		self._keys[key] = template
+
+		return template
+
+	def instance(self, saved_state, coords):
+		"""Make a NonMob at coords which shares the template of saved_state."""
+
+		template, overrides = self.split(saved_state)
+
+		return NonMob(prototype=template, coords=coords, **(overrides or {}))
+
+	def split(self, saved_state):
+		"""
+		Get the template of a saved NonMob and a dict of the saved inventory, knowledge or
+		status it has instead of the template's, or None if it has nothing of its own. A new
+		template is made if nothing matches.
+		"""
+
+		if "prototype" in saved_state:
+
+			overrides = dict([(attr, saved_state[attr]) for attr in NonMob._overridable if attr in saved_state])
+
+			return self.templates[saved_state["prototype"]], overrides or None
+
+		key = _content_key(saved_state)
+
+		try:
+
+			return self._keys[key], None
+
+		except KeyError:
+
+			pass
+
+		# The first template with an id is named after it
+		template = self.templates.get(saved_state.get("id_", ""))
+
+		if template is not None:
+
+			saved_template = template.to_dict()
+			differences = [attr for attr in saved_state if saved_state[attr] != saved_template.get(attr)]
+
+			if set(saved_state) == set(saved_template) and set(differences) <= set(NonMob._overridable):
+
+				return template, dict([(attr, saved_state[attr]) for attr in differences])
+
+		# Name it after its id, numbering it if a different template already took that name
+		prototype_id = saved_state.get("id_", "")
+		number = 1
+
+		while prototype_id in self.templates:
+
+			prototype_id = saved_state.get("id_", "") + '#' + str(number)
+			number += 1
+
+		return self._add(prototype_id, saved_state, key), None
+
+	def to_dict(self):
+		"""Create a JSON-serializable dict of the templates, keyed by prototype id."""
+
+		state = {}
+
+		for prototype_id in self.templates:
+
+			state[prototype_id] = self.templates[prototype_id].to_dict()
+
+		return state
+
 class Mob(Entity):
 	"""
 	An entity with an AI
 
-	Mob.__getattr__(self, attr)
 	Mob.__init__(self, ai="", next_turn=None, **argsd)
+	Mob._derive(self, attr)
 	Mob._find_actions(self)
-	Mob.to_dict(self)
+	Mob._to_dict(self)
 
 	Mob.actions*
 	Mob.ai
@@ -520,8 +2121,25 @@ class Mob(Entity):
 	Also includes some member variables from Entity
 	"""
 
-	def __getattr__(self, attr):
-		"""Get an attribute, but do a special behavior with dif_coag."""
+	__slots__ = ("actions", "ai", "next_turn")
+
+	_derived_attrs = Entity._derived_attrs + ("actions",)
+
+	def __init__(self, ai="", next_turn=None, **argsd):
+		"""Initialize the Mob."""
+
+		super(Mob, self).__init__(**argsd)
+
+		# Saved next turns refer to their action by id
+		if next_turn is not None and type(next_turn[0]) == str:
+
+			next_turn = [self.actions[next_turn[0]]] + list(next_turn[1:])
+
+		self.ai = ai
+		self.next_turn = next_turn
+
+	def _derive(self, attr):
+		"""Build a derived attribute from scratch, including actions."""
 
 		if attr == "actions":
 
@@ -539,15 +2157,7 @@ class Mob(Entity):
 
 		else:
 
-			return super(Mob, self).__getattr__(attr)
-
-	def __init__(self, ai="", next_turn=None, **argsd):
-		"""Initialize the Mob."""
-
-		super(Mob, self).__init__(**argsd)
-
-		self.ai = ai
-		self.next_turn = next_turn
+			return super(Mob, self)._derive(attr)
 
 	def _find_actions(self):
 		"""Find and return the Mob's actions."""
@@ -557,33 +2167,46 @@ class Mob(Entity):
 		for item in self.inventory:
 			for inherit_group in item.actions:
 
-				if eval(inherit_group[1]):
+				condition = compile_condition(inherit_group[1])
+
+				if condition is True or (condition is not False and eval(condition)):
 
 					action_list.append(inherit_group[0])
 
 		for status in self.status:
 			for inherit_group in status.actions:
-				if eval(inherit_group[1]):
+
+				condition = compile_condition(inherit_group[1])
+
+				if condition is True or (condition is not False and eval(condition)):
 
 					action_list.append(inherit_group[0])
 
 		for concept in self.knowledge:
 			for inherit_group in concept.actions:
-				if eval(inherit_group[1]):
+
+				condition = compile_condition(inherit_group[1])
+
+				if condition is True or (condition is not False and eval(condition)):
 
 					action_list.append(inherit_group[0])
 
 		return action_list
 
-	def to_dict(self):
+	def _to_dict(self):
 		"""Create a JSON-serializable dict representation of the Mob."""
 
-		state = super(Mob, self).to_dict()
+		state = super(Mob, self)._to_dict()
 
 		# Construct state
 		state["_type"] = "Mob"
 		state["ai"] = self.ai
-		state["next_turn"] = self.next_turn
+		state["next_turn"] = None
+
+		# Refer to the action by id, since it's part of the Mob anyway
+		if self.next_turn is not None:
+
+			state["next_turn"] = [self.next_turn[0].id] + list(self.next_turn[1:])
 
 		# Return state
 		return state
@@ -599,29 +2222,35 @@ class Coagulate(object):
 	Coagulate.__len__(self)
 	Coagulate.__repr__(self)
 	Coagulate.__str__(self)
+	Coagulate._adopt(self, coag)
+	Coagulate._index(self, coag)
+	Coagulate._to_dict(self)
+	Coagulate._touch(self)
 	Coagulate.append(self, coag)
 	Coagulate.to_dict(self)
 
+	Coagulate._ids
+	Coagulate._parent
+	Coagulate._saved
 	Coagulate._tree
 	Coagulate.is_root
 	Coagulate.method
 	Coagulate.name
 	"""
 
+	__slots__ = ("_ids", "_parent", "_saved", "_tree", "is_root", "method", "name")
+
 	def __contains__(self, item):
 		"""Check if the Contains an item with that id."""
 
-		for coag in self._tree:
-			try:
-				if item == coag.id:
+		try:
 
-					return True
-
-			except AttributeError:
+			return item in self._ids
 
-				pass
+		except TypeError:
 
-		return False
+			# Unhashable things can't be ids
+			return False
 
 	def __getitem__(self, index):
 		"""Get the item from Coagulate._tree at index or by id."""
@@ -631,17 +2260,8 @@ class Coagulate(object):
 			return self._tree[index]
 
 		elif type(index) == str:
-			for coag in self._tree:
-				try:
-					if index == coag.id:
-
-						return coag
-
-				except AttributeError:
 
-					pass
-
-			raise KeyError(index)
+			return self._ids[index]
 
 		else:
 
@@ -650,28 +2270,44 @@ class Coagulate(object):
 	def __init__(self, name="", tree=[], method=[coag_funcs.co_pass_], is_root=False):
 		"""Initialize the Coagulate."""
 
+		self._parent = None
+		self._saved = None
 		self.is_root = is_root
 		self.name = name
 
-		# Construct tree
-		self._tree = []
+		# Construct tree and the index of its ids; empty ones stay shared until something's appended
+		self._tree = _EMPTY
+		self._ids = _NO_IDS
+
+		if len(tree):
 
-		for coag in tree:
+			self._tree = [self._adopt(load_if_dict(coag)) for coag in tree]
+
+			for coag in self._tree:
 
-			self._tree.append(load_if_dict(coag))
+				self._index(coag)
 
 		# Construct method
-		self.method = []
+		method_list = []
 
 		for arg in method:
 			if type(arg) == str:
 				if arg.find('$') != -1:
 
-					self.method.append(coag_funcs.__dict__[arg[arg.index('$') + 1:]])
+					method_list.append(coag_funcs.__dict__[arg[arg.index('$') + 1:]])
 
 			else:
 
-				self.method.append(arg)
+				method_list.append(arg)
+
+		# Share the default method instead of making a list of it every time
+		if method_list == list(_DEFAULT_METHOD):
+
+			self.method = _DEFAULT_METHOD
+
+		else:
+
+			self.method = method_list
 			
 
 	def __len__(self):
@@ -689,12 +2325,38 @@ class Coagulate(object):
 
 		return json.dumps(self.to_dict(), indent=4, separators=(",", ": "), sort_keys=True)
 
-	def append(self, coag):
-		"""Add something to the Coagualte."""
+	def _adopt(self, coag):
+		"""
+		Become the parent of coag if it doesn't have one yet, then return it.
 
-		self._tree.append(coag)
+		Views like Entity.quanta hold coagulates which already have parents, so they don't steal them.
+		"""
 
-	def to_dict(self):
+		if isinstance(coag, Coagulate) and coag._parent is None:
+
+			coag._parent = self
+
+		return coag
+
+	def _index(self, coag):
+		"""Remember coag by its id, unless something earlier in the tree already has that id."""
+
+		try:
+
+			id_ = coag.id
+
+		except AttributeError:
+
+			# Plain Coagulates don't have ids
+			return
+
+		if self._ids is _NO_IDS:
+
+			self._ids = {}
+
+		self._ids.setdefault(id_, coag)
+
+	def _to_dict(self):
 		"""
 		Create a JSON-serializable dict representation of the Coagulate.
 
@@ -732,18 +2394,50 @@ class Coagulate(object):
 		# Return state
 		return state
 
+	def _touch(self):
+		"""Forget the saved dict and tell whatever owns this Coagulate that it changed."""
+
+		self._saved = None
+
+		if self._parent is not None:
+
+			self._parent._touch()
+
+	def append(self, coag):
+		"""Add something to the Coagualte."""
+
+		# Touch first, so a shared NonMob template refuses the change before it's made
+		self._touch()
+
+		if self._tree is _EMPTY:
+
+			self._tree = []
+
+		self._tree.append(self._adopt(coag))
+		self._index(coag)
+
+	def to_dict(self):
+		"""
+		Get the JSON-serializable dict representation of the Coagulate, which is kept until it
+		or something in it changes. It's shared, so don't change it.
+		"""
+
+		return _saved_dict(self)
+
 class Differentia(Coagulate):
 	"""
 	Any game element goes inside of a coagulate.
 	
 	__init__(self, id_="", **argsd)
-	Differentia.to_dict(self)
+	Differentia._to_dict(self)
 
 	Differentia.id
 
 	Also includes some member variables from Coagulate.
 	"""
 
+	__slots__ = ("id",)
+
 	def __init__(self, id_="", **argsd):
 		"""Initialize the Differentia."""
 
@@ -756,10 +2450,10 @@ class Differentia(Coagulate):
 
 		self.id = id_
 
-	def to_dict(self):
+	def _to_dict(self):
 		"""Create a JSON-serializable dict representation of the Differentia."""
 
-		state = super(Differentia, self).to_dict()
+		state = super(Differentia, self)._to_dict()
 
 		# Construct state
 		state["_type"] = "Differentia"
@@ -775,7 +2469,7 @@ class Figment(Differentia):
 	Figment.__getattr__(self, attr)
 	Figment.__init__(	self, actions=[], qualita_inate=[], qualita_inherited=[], 
 						quanta_inate=[], quanta_inherited=[], **argsd)
-	Figment.to_dict(self)
+	Figment._to_dict(self)
 
 	Figment.actions
 	Figment.qualita_inate*
@@ -784,6 +2478,8 @@ class Figment(Differentia):
 	Figment.quanta_inherited
 	"""
 
+	__slots__ = ("actions", "qualita_inherited", "quanta_inherited")
+
 	def __getattr__(self, attr):
 		"""Get an attribute, but do a special behavior with inate characteristics."""
 
@@ -817,39 +2513,39 @@ class Figment(Differentia):
 		for saved_action in actions:
 
 			action = []
-			action.append(load_if_dict(saved_action[0]))
+			action.append(self._adopt(load_if_dict(saved_action[0])))
 			action.extend(saved_action[1:])
 			self.actions.append(action)
 
 		for saved_qualita in qualita_inherited:
 
 			qualita = []
-			qualita.append(load_if_dict(saved_qualita[0]))
+			qualita.append(self._adopt(load_if_dict(saved_qualita[0])))
 			qualita.extend(saved_qualita[1:])
 			self.qualita_inherited.append(qualita)
 
 		for saved_quanta in quanta_inherited:
 
 			quanta = []
-			quanta.append(load_if_dict(saved_quanta[0]))
+			quanta.append(self._adopt(load_if_dict(saved_quanta[0])))
 			quanta.extend(saved_quanta[1:])
 			self.quanta_inherited.append(quanta)
 		
 		# Override the data in tree
 		if qualita_inate is not None and quanta_inate is not None:
 
-			self._tree[0] = (Coagulate(	name="Qualita",
-										tree=qualita_inate,
-										is_root=False))
+			self._tree[0] = self._adopt(Coagulate(	name="Qualita",
+													tree=qualita_inate,
+													is_root=False))
 
-			self._tree[1] =	(Coagulate(	name="Quanta",
-										tree=quanta_inate,
-										is_root=False))
+			self._tree[1] =	self._adopt(Coagulate(	name="Quanta",
+													tree=quanta_inate,
+													is_root=False))
 
-	def to_dict(self):
+	def _to_dict(self):
 		"""Create a JSON-serializable dict representation of the Figment."""
 
-		state = super(Figment, self).to_dict()
+		state = super(Figment, self)._to_dict()
 
 		# Fix inherit lists
 		saved_actions = []
@@ -891,18 +2587,20 @@ class Item(Figment):
 	An item, something which can be picked up and dropped
 
 	Item.__init__(self, **argsd)
-	Item.to_dict(self)
+	Item._to_dict(self)
 	"""
 
+	__slots__ = ()
+
 	def __init__(self, **argsd):
 		"""Initialze the Item."""
 
 		super(Item, self).__init__(**argsd)
 
-	def to_dict(self):
+	def _to_dict(self):
 		"""Create a JSON-serializable dict representation of the Item."""
 
-		state = super(Item, self).to_dict()
+		state = super(Item, self)._to_dict()
 
 		# Construct state
 		state["_type"] = "Item"
@@ -915,18 +2613,20 @@ class Status(Figment):
 	A physical descriptor of an entity
 
 	Status.__init__(self, **argsd)
-	Status.to_dict(self)
+	Status._to_dict(self)
 	"""
 
+	__slots__ = ()
+
 	def __init__(self, **argsd):
 		"""Initialze the Status."""
 
 		super(Status, self).__init__(**argsd)
 
-	def to_dict(self):
+	def _to_dict(self):
 		"""Create a JSON-serializable dict representation of the Status."""
 
-		state = super(Status, self).to_dict()
+		state = super(Status, self)._to_dict()
 
 		# Construct state
 		state["_type"] = "Status"
@@ -939,18 +2639,20 @@ class Concept(Figment):
 	A non-physical descriptor of an entity.
 
 	Concept.__init__(self, **argsd)
-	Concept.to_dict(self)
+	Concept._to_dict(self)
 	"""
 
+	__slots__ = ()
+
 	def __init__(self, **argsd):
 		"""Initialze the Concept."""
 
 		super(Concept, self).__init__(**argsd)
 
-	def to_dict(self):
+	def _to_dict(self):
 		"""Create a JSON-serializable dict representation of the Concept."""
 
-		state = super(Concept, self).to_dict()
+		state = super(Concept, self)._to_dict()
 
 		# Construct state
 		state["_type"] = "Concept"
@@ -963,11 +2665,13 @@ class Characteristic(Differentia):
 	A single characteristic granted by a Figment
 
 	Characteristic.__init__(self, value=None, **argsd)
-	Characteristic.to_dict(self)
+	Characteristic._to_dict(self)
 
 	Characteristic._value
 	"""
 
+	__slots__ = ("_value",)
+
 	def __init__(self, value=None, **argsd):
 		"""Initialze the Characteristic."""
 
@@ -978,10 +2682,10 @@ class Characteristic(Differentia):
 
 		self._value = value
 
-	def to_dict(self):
+	def _to_dict(self):
 		"""Create a JSON-serializable dict representation of the Characteristic."""
 
-		state = super(Characteristic, self).to_dict()
+		state = super(Characteristic, self)._to_dict()
 
 		# Construct state
 		state["_type"] = "Characteristic"
@@ -995,18 +2699,20 @@ class Qualita(Characteristic):
 	A qualitative Characteristic, with a bool or str value
 
 	Qualita.__init__(self, value=True, **argsd)
-	Qualita.to_dict(self)
+	Qualita._to_dict(self)
 	"""
 
+	__slots__ = ()
+
 	def __init__(self, value=True, **argsd):
 		"""Initialze the Qualita."""
 
 		super(Qualita, self).__init__(value=value, **argsd)
 
-	def to_dict(self):
+	def _to_dict(self):
 		"""Create a JSON-serializable dict representation of the Qualita."""
 
-		state = super(Qualita, self).to_dict()
+		state = super(Qualita, self)._to_dict()
 
 		# Construct state
 		state["_type"] = "Qualita"
@@ -1036,9 +2742,11 @@ class Quanta(Characteristic):
 	Quanta.__rpow__(self, other)
 	Quanta.__rsub__(self, other)
 	Quanta.__sub__(self, other)
-	Quanta.to_dict(self)
+	Quanta._to_dict(self)
 	"""
 
+	__slots__ = ()
+
 	def __add__(self, other):
 		"""Add a Quanta and another Quanta or an int, returning an int."""
 
@@ -1289,10 +2997,10 @@ class Quanta(Characteristic):
 
 			raise TypeError("unsupported operand type(s) for -: 'Quanta' and '" + str(type(other)) + "'")
 
-	def to_dict(self):
+	def _to_dict(self):
 		"""Create a JSON-serializable dict representation of the Quanta."""
 
-		state = super(Quanta, self).to_dict()
+		state = super(Quanta, self)._to_dict()
 
 		# Construct state
 		state["_type"] = "Quanta"
@@ -1306,12 +3014,14 @@ class Action(Differentia):
 
 	Action.__getattr__(self, attr)
 	Action.__init__(self, qualita=[], quanta=[], **argsd)
-	Action.to_dict(self)
+	Action._to_dict(self)
 
 	Action.qualita*
 	Action.quanta*
 	"""
 
+	__slots__ = ()
+
 	def __getattr__(self, attr):
 		"""Get an attribute, but do a special behavior with characteristics."""
 
@@ -1338,17 +3048,18 @@ class Action(Differentia):
 
 		if qualita is not None and quanta is not None:
 
-			self._tree.append(Coagulate(name="Qualita",
-										tree=qualita,
-										is_root=False))
-			self._tree.append(Coagulate(name="Quanta",
-										tree=quanta,
-										is_root=False))
+			self._tree = list(self._tree)
+			self._tree.append(self._adopt(Coagulate(name="Qualita",
+													tree=qualita,
+													is_root=False)))
+			self._tree.append(self._adopt(Coagulate(name="Quanta",
+													tree=quanta,
+													is_root=False)))
 
-	def to_dict(self):
+	def _to_dict(self):
 		"""Create a JSON-serializable dict representation of the Action."""
 
-		state = super(Action, self).to_dict()
+		state = super(Action, self)._to_dict()
 
 		# Construct state
 		state["_type"] = "Action"
@@ -1357,6 +3068,80 @@ class Action(Differentia):
 		return state
 
 # Functions
+def compile_condition(condition):
+	"""
+	Compile an inherit condition string for eval, sharing one code object between identical strings.
+
+	Conditions are looked up here each time they're checked, so an inherit list changed after
+	its Figment is made never has its conditions out of step with it.
+
+	Conditions which don't look anything up, like "True" or "1 == 1", are folded into True or False.
+	"""
+
+	try:
+
+		return _CONDITIONS[condition]
+
+	except KeyError:
+
+		pass
+
+	compiled = compile(condition, "<condition>", "eval")
+
+	if set(compiled.co_names) <= set(("True", "False", "None")):
+		try:
+
+			compiled = bool(eval(compiled, {}))
+
+		except Exception:
+
+			# Leave it to fail the same way when it's actually evaluated
+			pass
+
+	_CONDITIONS[condition] = compiled
+
+	return compiled
+
+def _content_key(saved_state):
+	"""Get a hashable key of a saved state which is the same for any saved state with the same content."""
+
+	if type(saved_state) == dict:
+
+		return tuple(sorted([(key, _content_key(value)) for key, value in saved_state.iteritems()]))
+
+	elif type(saved_state) == list:
+
+		return tuple([_content_key(value) for value in saved_state])
+
+	return saved_state
+
+def _saved_dict(saveable):
+	"""Get the saved dict of a Tile, Entity or Coagulate, only making it again if it was forgotten."""
+
+	if saveable._saved is None:
+
+		saveable._saved = saveable._to_dict()
+		_SAVE_COUNTS["serialized"] += 1
+
+	else:
+
+		_SAVE_COUNTS["reused"] += 1
+
+	return saveable._saved
+
+def _wrap_index(index, length):
+	"""Check a grid index, counting negative indices from the end like a list does."""
+
+	if index < 0:
+
+		index += length
+
+	if not 0 <= index < length:
+
+		raise IndexError("grid index out of range")
+
+	return index
+
 def load_if_dict(saved_state, **argsd):
 	"""
 	Load an instance from a dict with the "_type" key.
@@ -1371,4 +3156,19 @@ def load_if_dict(saved_state, **argsd):
 	type_ = ss_copy.pop("_type")
 	ss_copy.update(argsd)
 
-	return globals()[type_](**ss_copy)
\ No newline at end of file
+	return globals()[type_](**ss_copy)
+
+def save_counts(reset=False):
+	"""
+	Get how many saved dicts to_dict has reused and how many it has had to serialize,
+	optionally starting the counts over.
+	"""
+
+	counts = dict(_SAVE_COUNTS)
+
+	if reset:
+
+		_SAVE_COUNTS["reused"] = 0
+		_SAVE_COUNTS["serialized"] = 0
+
+	return counts
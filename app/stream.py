@@ -0,0 +1,139 @@
+# Andrew Bogdan
+# Feasible Game 3
+# stream.py
+"""
+	Streamed saves, which write a State to a file a column of its map at a time so that saving
+	never holds the whole saved State in memory.
+
+	A streamed save is the same JSON as str(state), only without the indentation and with the
+	map's palette written after its grid, once every run is known. It can also
+	be compressed, in which case it's COMPRESSED_MAGIC and then the JSON in frames, each a
+	length and a zlib-compressed chunk of columns, so every chunk is compressed on its own.
+"""
+
+# Imports
+import json
+import struct
+import zlib
+
+from decoder import Decoder
+from state import *
+
+# Constants
+COMPRESSED_MAGIC = "FG3Z\x01"
+
+_FRAME_LENGTH = struct.Struct("<I")
+
+# Classes
+class ChunkWriter(object):
+	"""
+	Writes text to a file object a chunk at a time, compressing each chunk if it's asked to
+
+	ChunkWriter.__init__(self, file_, compress_level=None)
+	ChunkWriter.end_chunk(self)
+	ChunkWriter.write(self, text)
+
+	ChunkWriter._file
+	ChunkWriter._parts
+	ChunkWriter.compress_level
+	ChunkWriter.written
+	"""
+
+	def __init__(self, file_, compress_level=None):
+		"""Initialize the ChunkWriter, marking the file as compressed if it will be."""
+
+		self._file = file_
+		self._parts = []
+
+		self.compress_level = compress_level
+		self.written = 0
+
+		if compress_level is not None:
+
+			self._file.write(COMPRESSED_MAGIC)
+			self.written += len(COMPRESSED_MAGIC)
+
+	def end_chunk(self):
+		"""Write out everything since the last chunk ended."""
+
+		text = "".join(self._parts)
+		self._parts = []
+
+		if self.compress_level is not None:
+
+			text = zlib.compress(text, self.compress_level)
+			self._file.write(_FRAME_LENGTH.pack(len(text)))
+			self.written += _FRAME_LENGTH.size
+
+		self._file.write(text)
+		self.written += len(text)
+
+	def write(self, text):
+		"""Add text to the current chunk."""
+
+		self._parts.append(text)
+
+# Functions
+def _dumps(value):
+	"""Dump a value as JSON without any whitespace."""
+
+	return json.dumps(value, separators=(",", ":"))
+
+def load_streamed(file_):
+	"""Load a State from a streamed save, compressed or not."""
+
+	data = file_.read()
+
+	if data.startswith(COMPRESSED_MAGIC):
+
+		frames = []
+		offset = len(COMPRESSED_MAGIC)
+
+		while offset < len(data):
+
+			length = _FRAME_LENGTH.unpack_from(data, offset)[0]
+			offset += _FRAME_LENGTH.size
+
+			frames.append(zlib.decompress(data[offset:offset + length]))
+			offset += length
+
+		data = "".join(frames)
+
+	return Decoder().loads(data)
+
+def save_streamed(state, file_, compress_level=None):
+	"""
+	Save a State to a file object column by column, compressing each chunk of columns with
+	zlib at compress_level if it's given. Returns how many bytes were written.
+
+	Every chunk gets loaded, so save Maps with a chunk store with chunks.save_chunked instead.
+	"""
+
+	map_ = state.map
+	palette = {}
+	writer = ChunkWriter(file_, compress_level)
+
+	# Everything but the grid, with the templates first so they come before the tiles using them
+	writer.write('{"_type":"State","index_stack":' + _dumps(state.saved_index_stack()))
+	writer.write(',"message_log":' + _dumps(state.message_log))
+	writer.write(',"map_":{"_type":"Map","prototypes":' + _dumps(map_.prototypes.to_dict()))
+	writer.write(',"grid":[')
+	writer.end_chunk()
+
+	for x_val in range(map_._size[0]):
+
+		if x_val != 0:
+
+			writer.write(",")
+
+		writer.write(_dumps(map_.save_runs(x_val, palette)))
+
+		if (x_val + 1) % map_.chunk_size == 0:
+
+			writer.end_chunk()
+
+	writer.write('],"palette":' + _dumps(map_.save_palette(palette)))
+	writer.write(',"depth":' + _dumps(map_.depth) + ',"size":' + _dumps(list(map_._size)) + "}}")
+	writer.end_chunk()
+
+	return writer.written
@@ -0,0 +1,175 @@
+# Andrew Bogdan
+# Feasible Game 3
+# terrain.py
+"""
+	Dense storage for the static terrain of a Map, one small integer code per (x, y, layer).
+"""
+
+# Imports
+import sys
+
+from array import array
+
+try:
+
+	import numpy
+
+except ImportError:
+
+	numpy = None
+
+# Constants
+CODE_NONE = 0
+CODE_EMPTY = 1
+CODE_MAX = 65535
+
+# Classes
+class TerrainArray(object):
+	"""
+	A grid of terrain codes, NumPy-backed when NumPy is available
+
+	A tile's codes run from layer 0 up to the first CODE_NONE; CODE_EMPTY is a layer with
+	nothing in it and every other code is whatever the owner decides.
+
+	TerrainArray.__init__(self, size, depth)
+	TerrainArray.fill(self, x, y, length, codes)
+	TerrainArray.find(self, z, codes)
+	TerrainArray.fromstring(self, data)
+	TerrainArray.get(self, x, y)
+	TerrainArray.layer(self, z)
+	TerrainArray.set(self, x, y, codes)
+	TerrainArray.tostring(self)
+
+	TerrainArray._codes
+	TerrainArray.depth
+	TerrainArray.size
+	"""
+
+	def __init__(self, size, depth):
+		"""Initialize the TerrainArray with every layer of every tile set to CODE_NONE."""
+
+		self.depth = depth
+		self.size = size
+
+		if numpy is not None:
+
+			self._codes = numpy.zeros((size[0], size[1], depth), dtype=numpy.uint16)
+
+		else:
+
+			self._codes = array('H', [CODE_NONE]) * (size[0] * size[1] * depth)
+
+	def fill(self, x, y, length, codes):
+		"""Set the codes of length tiles down the column at x, starting at y."""
+
+		if len(codes) > self.depth:
+
+			raise ValueError("a tile with " + str(len(codes)) + " layers doesn't fit a depth of " + str(self.depth))
+
+		tile_codes = list(codes) + [CODE_NONE] * (self.depth - len(codes))
+
+		if numpy is not None:
+
+			self._codes[x, y:y + length] = tile_codes
+
+		else:
+
+			# The tiles of a column are next to each other, so the run is one slice
+			start = (x * self.size[1] + y) * self.depth
+			self._codes[start:start + length * self.depth] = array('H', tile_codes) * length
+
+	def find(self, z, codes):
+		"""Get the (x, y, code) of every tile whose layer z has one of a set of codes, by x then y."""
+
+		if numpy is not None:
+
+			layer = self._codes[:, :, z]
+			found = numpy.argwhere(numpy.in1d(layer, list(codes)).reshape(layer.shape))
+
+			return [(x_val, y_val, int(layer[x_val, y_val])) for x_val, y_val in found.tolist()]
+
+		height = self.size[1]
+
+		return [(index // height, index % height, code) for index, code in enumerate(self._codes[z::self.depth]) if code in codes]
+
+	def fromstring(self, data):
+		"""Replace every code with the little-endian codes in data, as made by TerrainArray.tostring."""
+
+		if numpy is not None:
+
+			self._codes = numpy.frombuffer(data, dtype='<u2').astype(numpy.uint16).reshape(self._codes.shape)
+
+		else:
+
+			self._codes = array('H')
+			self._codes.fromstring(data)
+
+			if sys.byteorder != 'little':
+
+				self._codes.byteswap()
+
+	def get(self, x, y):
+		"""Get the codes of the tile at x, y, up to the first CODE_NONE."""
+
+		if numpy is not None:
+
+			tile_codes = self._codes[x, y].tolist()
+
+		else:
+
+			start = (x * self.size[1] + y) * self.depth
+			tile_codes = self._codes[start:start + self.depth].tolist()
+
+		try:
+
+			return tile_codes[:tile_codes.index(CODE_NONE)]
+
+		except ValueError:
+
+			return tile_codes
+
+	def layer(self, z):
+		"""
+		Get the code of layer z of every tile, as a NumPy array by x and y if NumPy is available
+		or an array by x then y if not.
+		"""
+
+		if numpy is not None:
+
+			return self._codes[:, :, z]
+
+		return self._codes[z::self.depth]
+
+	def set(self, x, y, codes):
+		"""Set the codes of the tile at x, y, clearing any layers above them."""
+
+		if len(codes) > self.depth:
+
+			raise ValueError("a tile with " + str(len(codes)) + " layers doesn't fit a depth of " + str(self.depth))
+
+		tile_codes = list(codes) + [CODE_NONE] * (self.depth - len(codes))
+
+		if numpy is not None:
+
+			self._codes[x, y] = tile_codes
+
+		else:
+
+			start = (x * self.size[1] + y) * self.depth
+			self._codes[start:start + self.depth] = array('H', tile_codes)
+
+	def tostring(self):
+		"""Get every code as a string of little-endian unsigned shorts, column by column."""
+
+		if numpy is not None:
+
+			return self._codes.astype('<u2').tostring()
+
+		elif sys.byteorder != 'little':
+
+			codes = array('H', self._codes)
+			codes.byteswap()
+
+			return codes.tostring()
+
+		return self._codes.tostring()
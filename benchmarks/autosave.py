@@ -0,0 +1,66 @@
+# Andrew Bogdan
+# Feasible Game 3
+# autosave.py
+"""
+	Measures how long autosaving stops the game for, next to how long saving in the game's
+	process takes, and checks that the autosave holds the State as it was when it started.
+
+	Run it from the repository root with "python benchmarks/autosave.py [size] [mobs] [saves]".
+"""
+
+# Imports
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from app import indexed
+from app.autosave import Autosave
+from app.decoder import Decoder
+from load import saved_state
+
+# Functions
+def main(size=400, mobs=100, saves=5):
+	"""Autosave a State a few times while changing it, then compare with a plain save."""
+
+	directory = tempfile.mkdtemp()
+
+	try:
+
+		state = Decoder().loads(json.dumps(saved_state(size, mobs)))
+		autosave = Autosave(os.path.join(directory, "autosave" + indexed.SAVE_EXTENSION), 0)
+
+		for _ in range(saves):
+
+			autosave.tick(state)
+			saved = Decoder().loads(json.dumps(state.to_dict())).to_dict()
+
+			# Change the State while the save is going, like the next turns would
+			state.message_log.append("a turn went by")
+
+			autosave.finish()
+
+			if indexed.load_indexed(autosave.path).to_dict() != saved:
+
+				print "The autosave doesn't hold the State it started with!"
+
+		start = time.time()
+		indexed.save_indexed(state, os.path.join(directory, "save" + indexed.SAVE_EXTENSION))
+		seconds = time.time() - start
+
+		print "%dx%d map, %d mobs" % (size, size, mobs)
+		print "save in the game's process: %.1f ms" % (seconds * 1000)
+		print "autosave pauses:            %s ms" % ", ".join(["%.1f" % (pause * 1000) for pause in autosave.pauses])
+		print "saves %d, failures %d" % (autosave.saves, autosave.failures)
+
+	finally:
+
+		shutil.rmtree(directory)
+
+if __name__ == "__main__":
+
+	main(*[int(arg) for arg in sys.argv[1:]])
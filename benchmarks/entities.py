@@ -0,0 +1,79 @@
+# Andrew Bogdan
+# Feasible Game 3
+# entities.py
+"""
+	Measures how long a crowd of zombies takes to find the nearest player through the Map's
+	entity index, next to looking through every tile around each of them.
+
+	Run it from the repository root with "python benchmarks/entities.py [zombies] [size]".
+"""
+
+# Imports
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from app.decoder import Decoder
+from load import saved_nonmob
+from memory import saved_mob
+
+# Constants
+# How far around itself each zombie looks when it looks through the tiles
+RADIUS = 12
+
+# Functions
+def main(zombies=2000, size=200):
+	"""Find the nearest player for every zombie, from the index and then tile by tile."""
+
+	random.seed(1)
+
+	grid = [[{"_type": "Tile", "layers": [{"0": saved_nonmob("default:nonmob:grass")}]} for _ in range(size)] for _ in range(size)]
+	spots = random.sample([(x_val, y_val) for x_val in range(size) for y_val in range(size)], zombies + 4)
+
+	for spot in spots[:4]:
+
+		player = saved_mob()
+		player["id_"] = "default:mob:player"
+		grid[spot[0]][spot[1]]["layers"].append({"1": player})
+
+	for spot in spots[4:]:
+
+		grid[spot[0]][spot[1]]["layers"].append({"1": saved_mob()})
+
+	map_ = Decoder().loads(json.dumps({"_type": "Map", "grid": grid}))
+	mobs = [mob for mob in map_.get_mobs() if mob.id == "default:mob:zombie"]
+
+	start = time.time()
+
+	for mob in mobs:
+
+		map_.nearest_entity("default:mob:player", mob.coords)
+
+	indexed = time.time() - start
+
+	start = time.time()
+
+	for mob in mobs:
+
+		for x_val in range(max(mob.coords[0] - RADIUS, 0), min(mob.coords[0] + RADIUS + 1, size)):
+			for y_val in range(max(mob.coords[1] - RADIUS, 0), min(mob.coords[1] + RADIUS + 1, size)):
+
+				found = map_.get_mob((x_val, y_val, mob.coords[2]))
+
+				if found is not None and found.id == "default:mob:player":
+
+					break
+
+	scanned = time.time() - start
+
+	print "%d zombies and 4 players on a %dx%d map" % (len(mobs), size, size)
+	print "from the index:              %.3f s" % indexed
+	print "tile by tile within %d steps: %.3f s" % (RADIUS, scanned)
+
+if __name__ == "__main__":
+
+	main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,72 @@
+# Andrew Bogdan
+# Feasible Game 3
+# flow.py
+"""
+	Measures how long a crowd of zombies around a player takes to decide their turns when
+	they share one flow field, next to searching a field for each of them.
+
+	Run it from the repository root with "python benchmarks/flow.py [zombies] [size]".
+"""
+
+# Imports
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from app.decoder import Decoder
+from app.default.ai import zombie
+from load import saved_nonmob
+from memory import saved_mob
+
+# Functions
+def main(zombies=2000, size=200):
+	"""Decide every zombie's turn with the field shared, then with it searched every time."""
+
+	random.seed(1)
+
+	grid = [[{"_type": "Tile", "layers": [{"0": saved_nonmob("default:nonmob:grass")}]} for _ in range(size)] for _ in range(size)]
+	center = size // 2
+
+	player = saved_mob()
+	player["id_"] = "default:mob:player"
+	grid[center][center]["layers"].append({"1": player})
+
+	# The zombies crowd around the player, close enough to find them, as many as fit on the map
+	crowd = range(max(center - 40, 0), min(center + 41, size))
+	spots = [(x_val, y_val) for x_val in crowd for y_val in crowd if (x_val, y_val) != (center, center)]
+
+	for spot in random.sample(spots, min(zombies, len(spots))):
+
+		grid[spot[0]][spot[1]]["layers"].append({"1": saved_mob()})
+
+	map_ = Decoder().loads(json.dumps({"_type": "Map", "grid": grid}))
+	mobs = [mob for mob in map_.get_mobs() if mob.id == "default:mob:zombie"]
+
+	start = time.time()
+
+	for mob in mobs:
+
+		zombie.DefAI.get_next_turn(map_, mob)
+
+	shared = time.time() - start
+
+	start = time.time()
+
+	for mob in mobs:
+
+		map_.forget_flow_fields(map_.get_mob((center, center, 1)))
+		zombie.DefAI.get_next_turn(map_, mob)
+
+	searched = time.time() - start
+
+	print "%d zombies on a %dx%d map" % (len(mobs), size, size)
+	print "one shared field:  %.3f s" % shared
+	print "a field per zombie: %.3f s" % searched
+
+if __name__ == "__main__":
+
+	main(*[int(arg) for arg in sys.argv[1:]])
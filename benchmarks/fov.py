@@ -0,0 +1,83 @@
+# Andrew Bogdan
+# Feasible Game 3
+# fov.py
+"""
+	Measures how long a crowd of zombies among walls takes to work out what each can see,
+	shadowcasting every time next to asking the Map, which keeps the fields of view until
+	the terrain around them changes.
+
+	Run it from the repository root with "python benchmarks/fov.py [zombies] [size]".
+"""
+
+# Imports
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from app.decoder import Decoder
+from app.default.ai import zombie
+from app.fov import shadowcast
+from load import saved_nonmob
+from memory import saved_mob
+
+# Functions
+def main(zombies=2000, size=200):
+	"""Work out every zombie's field of view for a few turns, cast every time, then cached."""
+
+	random.seed(1)
+
+	grid = [[{"_type": "Tile", "layers": [{"0": saved_nonmob("default:nonmob:grass")}]} for _ in range(size)] for _ in range(size)]
+
+	# A wall on one tile in ten
+	for x_val in range(size):
+		for y_val in range(size):
+			if random.random() < 0.1:
+
+				grid[x_val][y_val]["layers"].append({"0": saved_nonmob("default:nonmob:stone")})
+
+	spots = [(x_val, y_val) for x_val in range(size) for y_val in range(size) if len(grid[x_val][y_val]["layers"]) == 1]
+
+	for spot in random.sample(spots, zombies):
+
+		grid[spot[0]][spot[1]]["layers"].append({"1": saved_mob()})
+
+	map_ = Decoder().loads(json.dumps({"_type": "Map", "grid": grid}))
+	mobs = [mob for mob in map_.get_mobs() if mob.id == "default:mob:zombie"]
+	permeability = int(mobs[0].quanta["default:quanta:_permeability"])
+	radius = zombie.VIEW_DISTANCE
+	turns = 5
+
+	start = time.time()
+
+	for turn in range(turns):
+		for mob in mobs:
+
+			bounds = (	max(mob.coords[0] - radius, 0),
+						max(mob.coords[1] - radius, 0),
+						min(mob.coords[0] + radius + 1, size),
+						min(mob.coords[1] + radius + 1, size))
+
+			shadowcast(map_.walkable(bounds, 1, permeability, flat=True), bounds, mob.coords, radius)
+
+	cast = time.time() - start
+
+	start = time.time()
+
+	for turn in range(turns):
+		for mob in mobs:
+
+			map_.visible(mob.coords[0], mob.coords[1], 1, permeability, radius)
+
+	cached = time.time() - start
+
+	print "%d zombies on a %dx%d map, %d turns" % (len(mobs), size, size, turns)
+	print "cast every time: %.3f s" % cast
+	print "asking the map:  %.3f s" % cached
+
+if __name__ == "__main__":
+
+	main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,106 @@
+# Andrew Bogdan
+# Feasible Game 3
+# indexed.py
+"""
+	Measures how long listing a save, loading the State of a save and saving it again take,
+	for a JSON save and for an indexed save, as the map grows.
+
+	Run it from the repository root with "python benchmarks/indexed.py [mobs]". The mobs go
+	along the diagonal, so with fewer than a few hundred they all sit in the chunks around the
+	one being followed, and the indexed save loads every one of them like the JSON save does.
+"""
+
+# Imports
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from app import indexed
+from app.decoder import Decoder
+from app.state import VIEW_MAP
+from load import saved_state
+
+# Constants
+SIZES = (60, 100, 200, 400)
+
+# Functions
+def main(mobs=400):
+	"""Save States of every size both ways, then time listing and loading them."""
+
+	directory = tempfile.mkdtemp()
+
+	try:
+
+		print "%d mobs" % mobs
+		print "%-8s %-10s %-10s %-10s %-10s %-10s %-10s" % ("size", "json list", "json load",
+			"json save", "idx list", "idx load", "idx save")
+
+		for size in SIZES:
+
+			state = Decoder().loads(json.dumps(saved_state(size, mobs)))
+
+			# Follow a mob, so the indexed save loads the chunks around it
+			state.index_stack = [[VIEW_MAP, state.map.get_mobs()[0]]]
+			json_path = os.path.join(directory, "save.json")
+			indexed_path = os.path.join(directory, "save" + indexed.SAVE_EXTENSION)
+
+			with open(json_path, 'w') as json_file:
+
+				json_file.write(str(state))
+
+			indexed.save_indexed(state, indexed_path)
+
+			# Listing a JSON save means reading all of it to find its size
+			start = time.time()
+
+			with open(json_path, 'r') as json_file:
+
+				len(json.load(json_file)["map_"]["grid"])
+
+			json_list = time.time() - start
+
+			start = time.time()
+
+			with open(json_path, 'r') as json_file:
+
+				loaded = Decoder().load(json_file)
+
+			json_load = time.time() - start
+
+			start = time.time()
+
+			with open(json_path, 'w') as json_file:
+
+				json_file.write(str(loaded))
+
+			json_save = time.time() - start
+
+			start = time.time()
+			indexed.read_header(indexed_path)
+			indexed_list = time.time() - start
+
+			start = time.time()
+			loaded = indexed.load_indexed(indexed_path)
+			indexed_load = time.time() - start
+
+			# Saving over the file it streams from copies the chunks that aren't loaded
+			start = time.time()
+			indexed.save_indexed(loaded, indexed_path)
+			indexed_save = time.time() - start
+			loaded.map._chunk_store.close()
+
+			print "%-8s %-10.4f %-10.4f %-10.4f %-10.4f %-10.4f %-10.4f" % ("%dx%d" % (size, size),
+				json_list, json_load, json_save, indexed_list, indexed_load, indexed_save)
+
+	finally:
+
+		shutil.rmtree(directory)
+
+if __name__ == "__main__":
+
+	main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,98 @@
+# Andrew Bogdan
+# Feasible Game 3
+# load.py
+"""
+	Measures how fast saves load, in megabytes of JSON a second, with the old two-pass
+	loading and with the Decoder.
+
+	Run it from the repository root with "python benchmarks/load.py [size] [mobs]".
+"""
+
+# Imports
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from app.decoder import Decoder
+from app.mirec_miskuf_json import json_loads_str
+from app.state import load_if_dict
+from memory import saved_mob
+
+# Constants
+MEGABYTE = 1024.0 * 1024.0
+
+# Functions
+def saved_nonmob(id_):
+	"""Make a saved NonMob with a body that makes it impermeable."""
+
+	return {"_type": "NonMob", "id_": id_,
+			"inventory": {"_type": "Coagulate", "name": "Inventory", "tree": []},
+			"knowledge": {"_type": "Coagulate", "name": "Knowledge", "tree": []},
+			"status": {"_type": "Coagulate", "name": "Status", "tree": []}}
+
+def saved_state(size, mobs):
+	"""Make a saved State of a size by size map of grass with mobs zombies along the diagonal."""
+
+	grid = []
+
+	for x_val in range(size):
+
+		grid.append([])
+
+		for y_val in range(size):
+
+			layers = [{"0": saved_nonmob("default:nonmob:grass")}]
+
+			if x_val == y_val and x_val < mobs:
+
+				layers.append({"1": saved_mob()})
+
+			grid[-1].append({"_type": "Tile", "layers": layers})
+
+	return {"_type": "State",
+			"index_stack": [],
+			"map_": {"_type": "Map", "grid": grid},
+			"message_log": []}
+
+def two_pass_load(text):
+	"""Load a save the way it was loaded before the Decoder."""
+
+	return load_if_dict(json_loads_str(text))
+
+def measure(name, load, text):
+	"""Print how fast load loads text, taking the best of a few runs."""
+
+	best = None
+
+	for _ in range(3):
+
+		start = time.time()
+		load(text)
+		seconds = time.time() - start
+
+		if best is None or seconds < best:
+
+			best = seconds
+
+	print "%s: %.2f MB/s" % (name, len(text) / MEGABYTE / best)
+
+def main(size=200, mobs=100):
+	"""Save a State in the full and the compact format and measure loading both."""
+
+	full_text = json.dumps(saved_state(size, mobs))
+	compact_text = json.dumps(Decoder().loads(full_text).to_dict())
+
+	print "%dx%d map, %d mobs" % (size, size, mobs)
+
+	for format_name, text in (("full", full_text), ("compact", compact_text)):
+
+		print "%s save, %.1f MB" % (format_name, len(text) / MEGABYTE)
+		measure("  two-pass", two_pass_load, text)
+		measure("  decoder", Decoder().loads, text)
+
+if __name__ == "__main__":
+
+	main(*[int(arg) for arg in sys.argv[1:]])
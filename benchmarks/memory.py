@@ -0,0 +1,109 @@
+# Andrew Bogdan
+# Feasible Game 3
+# memory.py
+"""
+	Measures how much memory loaded entities take, by walking everything each one holds.
+
+	Run it from the repository root with "python benchmarks/memory.py [count]".
+"""
+
+# Imports
+import gc
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from app.state import load_if_dict
+
+# Constants
+SKIPPED_TYPES = (type, types.BuiltinFunctionType, types.CodeType, types.FunctionType, types.ModuleType)
+
+# Functions
+def deep_size(obj, seen):
+	"""Get the size of obj and everything it refers to which isn't in seen yet."""
+
+	if id(obj) in seen or isinstance(obj, SKIPPED_TYPES):
+
+		return 0
+
+	seen.add(id(obj))
+	size = sys.getsizeof(obj)
+
+	if isinstance(obj, dict):
+
+		for key, value in obj.items():
+
+			size += deep_size(key, seen) + deep_size(value, seen)
+
+	elif isinstance(obj, (list, tuple, set, frozenset)):
+
+		for item in obj:
+
+			size += deep_size(item, seen)
+
+	if hasattr(obj, "__dict__"):
+
+		size += deep_size(obj.__dict__, seen)
+
+	for cls in type(obj).__mro__:
+		for slot in vars(cls).get("__slots__", ()):
+
+			try:
+
+				size += deep_size(object.__getattribute__(obj, slot), seen)
+
+			except AttributeError:
+
+				pass
+
+	return size
+
+def saved_quanta(id_, value):
+	"""Make a saved Quanta."""
+
+	return {"_type": "Quanta", "id_": id_, "name": id_.split(':')[-1], "value": value,
+			"tree": [], "method": ["$co_pass_"], "is_root": False}
+
+def saved_action(id_):
+	"""Make a saved Action with an initiative."""
+
+	return {"_type": "Action", "id_": id_, "name": id_.split(':')[-1],
+			"qualita": [], "quanta": [saved_quanta("default:quanta:_initiative", 0)]}
+
+def saved_mob():
+	"""Make a saved zombie with a body that grants its permeability, initiative and actions."""
+
+	body = {"_type": "Status", "id_": "default:status:body", "name": "Body", "tree": [None, None],
+			"qualita_inate": [], "quanta_inate": [],
+			"qualita_inherited": [],
+			"quanta_inherited": [	[saved_quanta("default:quanta:_permeability", 1), "True"],
+									[saved_quanta("default:quanta:_initiative", 1), "True"]],
+			"actions": [[saved_action(id_), "True"] for id_ in (	"default:action:walk",
+																	"default:action:wait",
+																	"default:action:zombie_bite")]}
+
+	return {"_type": "Mob", "id_": "default:mob:zombie", "ai": "default:ai:zombie", "next_turn": None,
+			"inventory": {"_type": "Coagulate", "name": "Inventory", "tree": []},
+			"knowledge": {"_type": "Coagulate", "name": "Knowledge", "tree": []},
+			"status": {"_type": "Coagulate", "name": "Status", "tree": [body]}}
+
+def main(count=1000):
+	"""Load count zombies and print how many bytes each one takes."""
+
+	gc.collect()
+
+	mobs = [load_if_dict(saved_mob(), coords=[0, 0, 1]) for _ in range(count)]
+
+	# Derive the characteristics, since the game always does
+	for mob in mobs:
+
+		mob.quanta
+		mob.actions
+
+	print "%d mobs, %.0f bytes per mob" % (count, deep_size(mobs, set()) / float(count))
+
+if __name__ == "__main__":
+
+	main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,90 @@
+# Andrew Bogdan
+# Feasible Game 3
+# parallel.py
+"""
+	Measures how long a big crowd of zombies takes to decide their turns one after another,
+	next to deciding them in one batch and in an AIPool with more and more workers, and
+	checks that every way decides the same turns.
+
+	The workers only make it faster with a core each to run on.
+
+	Run it from the repository root with "python benchmarks/parallel.py [zombies] [size]".
+"""
+
+# Imports
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from app.decoder import Decoder
+from app.default.ai import zombie
+from app.parallel import AIPool
+from load import saved_nonmob
+from memory import saved_mob
+
+# Functions
+def main(zombies=10000, size=300):
+	"""Decide every zombie's turn one at a time, in one batch, then with 1, 2, 4 and 8 workers."""
+
+	random.seed(1)
+
+	grid = [[{"_type": "Tile", "layers": [{"0": saved_nonmob("default:nonmob:grass")}]} for _ in range(size)] for _ in range(size)]
+	spots = random.sample([(x_val, y_val) for x_val in range(size) for y_val in range(size)], zombies + 16)
+
+	for spot in spots[:16]:
+
+		player = saved_mob()
+		player["id_"] = "default:mob:player"
+		grid[spot[0]][spot[1]]["layers"].append({"1": player})
+
+	for spot in spots[16:]:
+
+		grid[spot[0]][spot[1]]["layers"].append({"1": saved_mob()})
+
+	map_ = Decoder().loads(json.dumps({"_type": "Map", "grid": grid}))
+	mobs = [mob for mob in map_.get_mobs() if mob.id == "default:mob:zombie"]
+
+	def decide(batch):
+
+		return zombie.DefAI.get_next_turns(map_, batch)
+
+	def decide_in(pool):
+
+		# Like Game._decide, the shared fields are worked out before forking
+		zombie.DefAI.prepare_turns(map_, mobs)
+
+		return pool.decide(decide, mobs)
+
+	def run(decide_all):
+
+		# Every way starts without the shared fields, like the AI phase of a turn does
+		map_._flow_fields.clear()
+		map_._visible.clear()
+
+		start = time.time()
+		turns = decide_all()
+
+		return time.time() - start, [[turn[0].id] + turn[1:] for turn in turns]
+
+	serial, serial_turns = run(lambda: [zombie.DefAI.get_next_turn(map_, mob) for mob in mobs])
+	batched, batched_turns = run(lambda: decide(mobs))
+
+	print "%d zombies on a %dx%d map, %d cores" % (len(mobs), size, size, multiprocessing.cpu_count())
+	print "one after another: %.3f s" % serial
+	print "in one batch:      %.3f s, same turns: %s" % (batched, batched_turns == serial_turns)
+
+	for workers in (1, 2, 4, 8):
+
+		pool = AIPool(workers, minimum=0)
+		elapsed, turns = run(lambda: decide_in(pool))
+
+		print "%d workers:         %.3f s, same turns: %s" % (workers, elapsed, turns == serial_turns)
+
+if __name__ == "__main__":
+
+	main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,185 @@
+# Andrew Bogdan
+# Feasible Game 3
+# pathfinding.py
+"""
+	Measures how long paths across a big map with walls take to find: on a new map, on one
+	whose clusters are worked out, on one where new paths have been searched twice over, and
+	once they're cached. A few are checked against a plain breadth-first search.
+
+	Run it from the repository root with "python benchmarks/pathfinding.py [size] [queries]".
+"""
+
+# Imports
+import json
+import os
+import random
+import sys
+import time
+
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from app.decoder import Decoder
+from app.pathfinding import STEPS
+from load import saved_nonmob
+
+# Functions
+def saved_walled_map(size, walls):
+	"""Make a saved Map of grass with walls of stone on the layer above it, as runs of a palette."""
+
+	stone = saved_nonmob("default:nonmob:stone")
+	palette = [	{"_type": "Tile", "layers": [{"0": {"_type": "NonMob", "prototype": "grass"}}, {}]},
+				{"_type": "Tile", "layers": [{"0": {"_type": "NonMob", "prototype": "grass"}}, {"0": {"_type": "NonMob", "prototype": "stone"}}]}]
+
+	columns = [[] for _ in range(size)]
+	wall_columns = {}
+
+	# Each wall runs down a column, with gaps to get through
+	for _ in range(walls):
+
+		x_val = random.randrange(size)
+		y_start = random.randrange(size)
+		wall_columns.setdefault(x_val, []).append((y_start, min(y_start + random.randrange(10, 200), size)))
+
+	for x_val in range(size):
+
+		blocked = bytearray(size)
+
+		for y_start, y_end in wall_columns.get(x_val, []):
+
+			blocked[y_start:y_end] = "\x01" * (y_end - y_start)
+
+		y_val = 0
+
+		while y_val < size:
+
+			end = y_val
+
+			while end < size and blocked[end] == blocked[y_val]:
+
+				end += 1
+
+			columns[x_val].extend([blocked[y_val], end - y_val])
+			y_val = end
+
+	return {"_type": "Map", "depth": 2, "grid": columns, "palette": palette,
+			"prototypes": {"grass": saved_nonmob("default:nonmob:grass"), "stone": stone},
+			"size": [size, size]}
+
+def shortest_length(map_, start, goal):
+	"""Get the length of the shortest path with a plain breadth-first search."""
+
+	distances = {start: 0}
+	frontier = deque([start])
+
+	while frontier:
+
+		tile = frontier.popleft()
+
+		if tile == goal:
+
+			return distances[tile]
+
+		for step in STEPS:
+
+			other = (tile[0] + step[0], tile[1] + step[1])
+
+			if other not in distances and 0 <= other[0] < map_._size[0] and 0 <= other[1] < map_._size[1] and map_.is_walkable(other[0], other[1], 1, 1):
+
+				distances[other] = distances[tile] + 1
+				frontier.append(other)
+
+	return None
+
+def main(size=1000, queries=200):
+	"""Find random paths, check a few, then find them all again from the cache."""
+
+	random.seed(1)
+
+	map_ = Decoder().loads(json.dumps(saved_walled_map(size, size // 2)))
+	pathfinder = map_.pathfinder(1, 1)
+
+	tiles = []
+
+	while len(tiles) < queries * 6:
+
+		tile = (random.randrange(size), random.randrange(size))
+
+		if map_.is_walkable(tile[0], tile[1], 1, 1):
+
+			tiles.append(tile)
+
+	pairs = zip(tiles[:queries * 2:2], tiles[1:queries * 2:2])
+	new_pairs = zip(tiles[queries * 2:queries * 4:2], tiles[queries * 2 + 1:queries * 4:2])
+	later_pairs = zip(tiles[queries * 4::2], tiles[queries * 4 + 1::2])
+
+	start = time.time()
+	paths = [pathfinder.find_path(*pair) for pair in pairs]
+	first = time.time() - start
+
+	# New paths once the clusters they cross are worked out
+	start = time.time()
+
+	for pair in new_pairs:
+
+		pathfinder.find_path(*pair)
+
+	warm = time.time() - start
+
+	# And once the superclusters and how far their exits are from each other are worked out too
+	start = time.time()
+
+	for pair in later_pairs:
+
+		pathfinder.find_path(*pair)
+
+	later = time.time() - start
+
+	start = time.time()
+
+	for pair in pairs:
+
+		pathfinder.find_path(*pair)
+
+	cached = time.time() - start
+
+	# Every path has to be walkable steps ending at the goal, and close to the shortest
+	longer = []
+
+	for pair, path in zip(pairs, paths)[:10]:
+
+		shortest = shortest_length(map_, pair[0], pair[1])
+
+		if (path is None) != (shortest is None):
+
+			print "A path was missed or made up between", pair
+
+		elif path is not None:
+
+			tile = pair[0]
+
+			for other in path:
+
+				if max(abs(other[0] - tile[0]), abs(other[1] - tile[1])) != 1 or not map_.is_walkable(other[0], other[1], 1, 1):
+
+					print "A path takes a step it can't between", pair
+
+				tile = other
+
+			if tile != pair[1]:
+
+				print "A path doesn't end at its goal between", pair
+
+			longer.append(float(len(path)) / max(shortest, 1))
+
+	print "%dx%d map, %d queries" % (size, size, queries)
+	print "first time: %.3f ms a path" % (first * 1000 / queries)
+	print "warmed up:  %.3f ms a path" % (warm * 1000 / queries)
+	print "later:      %.3f ms a path" % (later * 1000 / queries)
+	print "cached:     %.4f ms a path" % (cached * 1000 / queries)
+	print "checked paths are %.1f%% longer than the shortest at most" % ((max(longer) - 1) * 100)
+
+if __name__ == "__main__":
+
+	main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,68 @@
+# Andrew Bogdan
+# Feasible Game 3
+# runs.py
+"""
+	Measures how big a save is and how long it takes to load with a saved tile for every
+	cell of the map, like saves were before palettes, and with runs of a palette's tiles.
+
+	Run it from the repository root with "python benchmarks/runs.py [size] [mobs]".
+"""
+
+# Imports
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from app.decoder import Decoder
+from load import saved_state
+
+# Functions
+def best_time(function, argument):
+	"""Get the fewest seconds function(argument) took in a few runs."""
+
+	best = None
+
+	for _ in range(3):
+
+		start = time.time()
+		function(argument)
+		seconds = time.time() - start
+
+		if best is None or seconds < best:
+
+			best = seconds
+
+	return best
+
+def main(size=400, mobs=100):
+	"""Save a mostly grass State both ways and load both saves."""
+
+	state = Decoder().loads(json.dumps(saved_state(size, mobs)))
+	map_ = state.map
+
+	saved_cells = state.to_dict()
+	saved_cells["map_"] = {	"_type": "Map",
+							"grid": [[map_._saved_tile(x_val, y_val) for y_val in range(map_._size[1])] for x_val in range(map_._size[0])],
+							"prototypes": map_.prototypes.to_dict()}
+
+	cells_text = json.dumps(saved_cells, separators=(",", ":"))
+	runs_text = json.dumps(state.to_dict(), separators=(",", ":"))
+
+	if Decoder().loads(cells_text).to_dict() != Decoder().loads(runs_text).to_dict():
+
+		print "The saves don't hold the same State!"
+
+	cells_load = best_time(Decoder().loads, cells_text)
+	runs_load = best_time(Decoder().loads, runs_text)
+
+	print "%dx%d map, %d mobs" % (size, size, mobs)
+	print "cells: %9d bytes, load %.3f s" % (len(cells_text), cells_load)
+	print "runs:  %9d bytes, load %.3f s" % (len(runs_text), runs_load)
+	print "smaller %.1fx, faster %.1fx" % (float(len(cells_text)) / len(runs_text), cells_load / runs_load)
+
+if __name__ == "__main__":
+
+	main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,98 @@
+# Andrew Bogdan
+# Feasible Game 3
+# save.py
+"""
+	Measures how much memory and time saving a State takes, with str(state) and with a
+	streamed save. Each way is measured in a process of its own, with a thread watching how
+	far its resident memory (from /proc, so only on Linux) goes above where it started.
+
+	Run it from the repository root with "python benchmarks/save.py [size] [mobs]".
+"""
+
+# Imports
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from app import stream
+from app.decoder import Decoder
+from load import saved_state
+
+# Constants
+WAYS = ("json", "streamed", "compressed")
+
+# Functions
+def current_memory():
+	"""Get the resident memory of this process in KB."""
+
+	with open("/proc/self/status", 'r') as status_file:
+		for line in status_file:
+			if line.startswith("VmRSS:"):
+
+				return int(line.split()[1])
+
+def main(size=200, mobs=100):
+	"""Measure every way of saving in its own process."""
+
+	print "%dx%d map, %d mobs" % (size, size, mobs)
+
+	for way in WAYS:
+
+		subprocess.check_call([sys.executable, os.path.abspath(__file__), str(size), str(mobs), way])
+
+def measure(size, mobs, way):
+	"""Save a State one way and print how long it took and how much memory it added."""
+
+	state = Decoder().loads(json.dumps(saved_state(size, mobs)))
+	state.to_dict()
+
+	# Watch the memory while saving
+	before = current_memory()
+	peak = [before]
+	saving = [True]
+
+	def watch():
+
+		while saving[0]:
+
+			peak[0] = max(peak[0], current_memory())
+			time.sleep(0.001)
+
+	watcher = threading.Thread(target=watch)
+	watcher.start()
+
+	with tempfile.TemporaryFile() as save_file:
+
+		start = time.time()
+
+		if way == "json":
+
+			save_file.write(str(state))
+
+		else:
+
+			stream.save_streamed(state, save_file, 6 if way == "compressed" else None)
+
+		seconds = time.time() - start
+		length = save_file.tell()
+
+	saving[0] = False
+	watcher.join()
+
+	print "%-10s %9d bytes, %.3f s, peak memory +%d KB" % (way, length, seconds, peak[0] - before)
+
+if __name__ == "__main__":
+
+	if len(sys.argv) > 3:
+
+		measure(int(sys.argv[1]), int(sys.argv[2]), sys.argv[3])
+
+	else:
+
+		main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,61 @@
+# Andrew Bogdan
+# Feasible Game 3
+# snapshot.py
+"""
+	Measures how long a State takes to save and load as JSON and as a snapshot.
+
+	Run it from the repository root with "python benchmarks/snapshot.py [size] [mobs]".
+"""
+
+# Imports
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from app import snapshot
+from app.decoder import Decoder
+from load import saved_state
+
+# Functions
+def best_time(function, argument):
+	"""Get the result of function(argument) and the fewest seconds it took in a few runs."""
+
+	best = None
+
+	for _ in range(3):
+
+		start = time.time()
+		result = function(argument)
+		seconds = time.time() - start
+
+		if best is None or seconds < best:
+
+			best = seconds
+
+	return result, best
+
+def main(size=200, mobs=100):
+	"""Save and load a State both ways, checking that they hold the same thing."""
+
+	state = Decoder().loads(json.dumps(saved_state(size, mobs)))
+
+	text, json_save = best_time(str, state)
+	data, snapshot_save = best_time(snapshot.dumps, state)
+	json_state, json_load = best_time(Decoder().loads, text)
+	snapshot_state, snapshot_load = best_time(snapshot.loads, data)
+
+	if json_state.to_dict() != snapshot_state.to_dict():
+
+		print "The snapshot doesn't hold the same State as the JSON save!"
+
+	print "%dx%d map, %d mobs" % (size, size, mobs)
+	print "JSON:     %8d bytes, save %.3f s, load %.3f s" % (len(text), json_save, json_load)
+	print "snapshot: %8d bytes, save %.3f s, load %.3f s" % (len(data), snapshot_save, snapshot_load)
+	print "speedup:  save %.1fx, load %.1fx" % (json_save / snapshot_save, json_load / snapshot_load)
+
+if __name__ == "__main__":
+
+	main(*[int(arg) for arg in sys.argv[1:]])